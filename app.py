@@ -10,13 +10,25 @@ from cli import (
     cli_sync_permissions,
     cli_seed_portal_roles,
     cli_seed_test_students,
+    cli_create_schema,
+    cli_profile_startup,
+    cli_session_cleanup,
+    cli_library_import,
+    cli_rebuild_instrumentation_cache,
+    cli_benchmark_player_order,
+    cli_recompute_hours,
+    cli_takeover_teachers,
+    cli_rebuild_student_status,
+    cli_db_index_report,
+    cli_archive_semester,
+    cli_restore_semester,
+    cli_snapshot_semester,
 )
 from flask import Flask, url_for, request, redirect, render_template, session
 from config import ProductionConfig, DevelopmentConfig
 from logging_setup import configure_logging
 from models import db, User
 import os
-import oracledb
 from utils.session_helpers import get_or_set_current_semester, get_or_set_current_semester_id
 from extensions import login_manager, oauth, migrate, csrf
 from modules.library import library_bp
@@ -37,6 +49,9 @@ from modules.teacher_portal import teacher_portal_bp
 from modules.chamber_enrollment_requests import chamber_enrollment_requests_bp
 from collections import defaultdict
 from utils.error_handlers import register_error_handlers
+from utils.oracle_helpers import oracle_configured, init_oracle_client, install_lazy_oracle_init
+from utils.server_session import init_session_backend
+from utils.fragment_cache import init_fragment_cache
 from sqlalchemy.orm import selectinload
 from sqlalchemy import func, select, exists, case  # <-- needed
 from models import AcademicYear, Semester
@@ -47,29 +62,6 @@ from models import (
 )
 
 
-def _init_oracle_optional(app) -> bool:
-    """Try to enable python-oracledb Thick mode. If it fails, keep app running."""
-    try:
-        import oracledb
-
-        lib_dir = os.environ.get("ORACLE_DRIVER")  # path to Instant Client dir
-        if not lib_dir:
-            app.logger.warning("Oracle disabled: ORACLE_DRIVER not set (thin mode only).")
-            return False
-
-        if not os.path.isdir(lib_dir):
-            app.logger.warning("Oracle disabled: ORACLE_DRIVER is not a directory: %s", lib_dir)
-            return False
-
-        oracledb.init_oracle_client(lib_dir=lib_dir)
-        app.logger.info("Oracle enabled (thick mode). lib_dir=%s", lib_dir)
-        return True
-
-    except Exception as e:
-        app.logger.warning("Oracle disabled: init_oracle_client failed: %s", e)
-        return False
-
-
 def create_app():
     app = Flask(__name__)
 
@@ -80,10 +72,18 @@ def create_app():
     configure_logging(app)
 
     db.init_app(app)
-    oracle_enabled = _init_oracle_optional(app)
+    if app.config.get("FAST_STARTUP"):
+        # Instant Client is loaded on the first Oracle connection, not on every worker boot
+        oracle_enabled = oracle_configured(app)
+        if oracle_enabled:
+            install_lazy_oracle_init(app)
+    else:
+        oracle_enabled = init_oracle_client(app)
     app.config["ORACLE_ENABLED"] = oracle_enabled
     migrate.init_app(app, db)
     oauth.init_app(app)
+    init_session_backend(app)
+    init_fragment_cache(app)
 
     csrf.init_app(app)
     login_manager.init_app(app)
@@ -114,6 +114,19 @@ def create_app():
     app.cli.add_command(cli_sync_permissions)
     app.cli.add_command(cli_seed_portal_roles)
     app.cli.add_command(cli_seed_test_students)
+    app.cli.add_command(cli_create_schema)
+    app.cli.add_command(cli_profile_startup)
+    app.cli.add_command(cli_session_cleanup)
+    app.cli.add_command(cli_library_import)
+    app.cli.add_command(cli_rebuild_instrumentation_cache)
+    app.cli.add_command(cli_benchmark_player_order)
+    app.cli.add_command(cli_recompute_hours)
+    app.cli.add_command(cli_takeover_teachers)
+    app.cli.add_command(cli_rebuild_student_status)
+    app.cli.add_command(cli_db_index_report)
+    app.cli.add_command(cli_archive_semester)
+    app.cli.add_command(cli_restore_semester)
+    app.cli.add_command(cli_snapshot_semester)
 
     # Oracle-only CLI
     if oracle_enabled:
@@ -124,15 +137,18 @@ def create_app():
     else:
         app.logger.warning("Oracle CLI commands not registered (Oracle disabled).")
 
-    with app.app_context():
-        db.create_all(bind_key=None)
-        # seed_instruments()
-        # seed_chamber_application_statuses()
-        # seed_roles_and_admin()
-        # seed_composers()
-        # seed_basic_compositions()
-        # seed_mock_notification()
-        register_error_handlers(app)
+    # In fast-startup mode the schema is created explicitly via `flask create-schema`
+    if not app.config.get("FAST_STARTUP"):
+        with app.app_context():
+            db.create_all(bind_key=None)
+            # seed_instruments()
+            # seed_chamber_application_statuses()
+            # seed_roles_and_admin()
+            # seed_composers()
+            # seed_basic_compositions()
+            # seed_mock_notification()
+
+    register_error_handlers(app)
 
     def is_allowed(link):
         if not hasattr(link, "_nav_roles") or link._nav_roles is None:
@@ -146,6 +162,7 @@ def create_app():
     from flask_login import current_user
 
     SESSION_TIMEOUT_MINUTES = 60  # 1 hour inactivity timeout
+    LAST_ACTIVITY_WRITE_SECONDS = 60  # refresh last_activity at most once a minute
 
     # -----------------------------------------------------
     # 0. Redirect portal-only role users away from management
@@ -204,8 +221,9 @@ def create_app():
                 last_activity = datetime.fromisoformat(last_activity)
             except ValueError:
                 # corrupted or old format
-                last_activity = now
+                last_activity = None
 
+        if last_activity:
             if now - last_activity > timedelta(minutes=SESSION_TIMEOUT_MINUTES):
                 app.logger.info(
                     f"Session expired for user {current_user.get_id() if current_user.is_authenticated else 'anonymous'}"
@@ -213,11 +231,12 @@ def create_app():
                 session.clear()
                 return redirect(url_for("auth.logout"))
 
-        # Update last activity timestamp
-        session["last_activity"] = now.isoformat()
+        # Update last activity timestamp — throttled, so most requests leave the
+        # session unmodified and no Set-Cookie / store write happens
+        if not last_activity or now - last_activity >= timedelta(seconds=LAST_ACTIVITY_WRITE_SECONDS):
+            session["last_activity"] = now.isoformat()
 
-    @app.context_processor
-    def inject_nav_links():
+    def build_nav_links():
         groups = defaultdict(list)
         flat_links = []
 
@@ -263,9 +282,16 @@ def create_app():
 
         # --- Flat links ---
         nav_links += flat_links
-        nav_links = sorted(nav_links, key=lambda x: x["weight"])
+        return sorted(nav_links, key=lambda x: x["weight"])
 
-        return {"nav_links": nav_links}
+    @app.context_processor
+    def inject_nav_links():
+        # the nav depends on the role only (permissions come from it) and is rendered through
+        # cache_fragment, so the links are built on a cache miss alone
+        return {
+            "nav_links": build_nav_links,
+            "nav_role_id": current_user.role_id if current_user.is_authenticated else None,
+        }
 
     TENANT = os.environ["OAUTH_TENANT_ID"]
     SCOPES = os.environ.get("OAUTH_SCOPES", "openid profile email")
@@ -281,17 +307,19 @@ def create_app():
     def inject_semester_context():
         current = get_or_set_current_semester()
 
-        years = (
-            AcademicYear.query
-            .options(selectinload(AcademicYear.semesters))
-            .order_by(AcademicYear.start_date.desc())
-            .all()
-        )
+        def load_academic_years():
+            # called from the cached semester dropdown only
+            return (
+                AcademicYear.query
+                .options(selectinload(AcademicYear.semesters))
+                .order_by(AcademicYear.start_date.desc())
+                .all()
+            )
 
         return dict(
             current_semester=current,
             semester_id=current.id if current else None,
-            academic_years=years
+            load_academic_years=load_academic_years,
         )
 
     @app.context_processor
@@ -3,6 +3,8 @@ import re
 import os
 import uuid
 import random
+import subprocess
+import sys
 from flask.cli import with_appcontext
 from models import db, KomorniHraStud, StudentSubjectEnrollment, KomorniHraUcitel, Subject, Student
 from utils.import_oracle import (get_or_create_academic_year, get_or_create_semester, get_or_create_subject, \
@@ -12,10 +14,13 @@ from utils.import_oracle import (get_or_create_academic_year, get_or_create_seme
 from sqlalchemy.exc import IntegrityError, DBAPIError
 from collections import defaultdict
 from flask import current_app
+from utils.oracle_helpers import init_oracle_client
+from models.archive import is_archived
 
 def require_oracle_enabled():
     """Abort CLI command if Oracle is disabled/unavailable."""
-    if not current_app.config.get("ORACLE_ENABLED", False):
+    # In FAST_STARTUP mode the Instant Client is not loaded yet — do it now, before connecting
+    if not current_app.config.get("ORACLE_ENABLED", False) or not init_oracle_client(current_app):
         click.echo(
             "Oracle is disabled (missing Instant Client / ORACLE_DRIVER / init failed). "
             "Run without Oracle or configure Instant Client.",
@@ -89,6 +94,7 @@ def cli_oracle_students_update(dry_run):
     created_sse_subject = 0  # StudentSubjectEnrollment (per-subject)
     skipped_no_instrument = 0
     skipped_status_p = 0
+    skipped_archived = 0
     row_errors = 0
 
     click.echo("🔍 Fetching Oracle students...", err=True)
@@ -140,8 +146,13 @@ def cli_oracle_students_update(dry_run):
             else:
                 click.echo(f"ℹ️ [{idx}] Player not created (already exists or error).", err=True)
 
-            # 4) Track active enrollment intent only for S/K (not P)
-            if status_allows_enrollment(status):
+            # 4) Track active enrollment intent only for S/K (not P);
+            #    archived semesters keep their enrollments in the archive table, read-only
+            archived = is_archived(sem.id)
+            if archived:
+                skipped_archived += 1
+                click.echo(f"🗄️ [{idx}] Semester {sem.id} is archived — enrollments left untouched.", err=True)
+            elif status_allows_enrollment(status):
                 active_by_sem_subj[(sem.id, subj.id)].add(student.id)
             else:
                 skipped_status_p += 1
@@ -153,7 +164,9 @@ def cli_oracle_students_update(dry_run):
                 created_sse += 1
                 click.echo(f"🗓️  [{idx}] SemesterEnrollment created (student={student.id}, sem={sem.id})", err=True)
 
-            # 6) Ensure StudentSubjectEnrollment only for S/K
+            # 6) Ensure StudentSubjectEnrollment only for S/K (never for archived semesters)
+            if archived:
+                continue
             if status_allows_enrollment(status):
                 existing = StudentSubjectEnrollment.query.filter_by(
                     student_id=student.id, subject_id=subj.id, semester_id=sem.id
@@ -263,6 +276,7 @@ def cli_oracle_students_update(dry_run):
         f"   Removed enrollments:     -{removed_enrollments}\n"
         f"   Skipped (no instrument): {skipped_no_instrument}\n"
         f"   Skipped (status P):      {skipped_status_p}\n"
+        f"   Skipped (archived sem.): {skipped_archived}\n"
         f"   Row errors:              {row_errors}",
         err=True
     )
@@ -474,3 +488,392 @@ def cli_seed_test_students(count, reset):
         click.echo(f"   {student.full_name:<30}  instrument: {instr:<20}  email: {email}")
 
     click.echo("\nLog in via /auth/dev-login and pick the account you want to test.")
+
+
+@click.command("create-schema")
+@with_appcontext
+def cli_create_schema():
+    """Create missing Postgres tables (explicit replacement for create_all on boot)."""
+    db.create_all(bind_key=None)
+    click.echo("✅ Schema created (existing tables left untouched).")
+
+
+@click.command("profile-startup")
+@click.option("--top", default=25, show_default=True, help="Number of slowest imports to list.")
+@click.option("--fast/--no-fast", default=True, show_default=True, help="Profile with FAST_STARTUP on/off.")
+def cli_profile_startup(top, fast):
+    """
+    Measure import + create_app() cost in a fresh interpreter (python -X importtime).
+    Prints total wall time and the slowest imports by cumulative time.
+    """
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, FAST_STARTUP="1" if fast else "0")
+    code = (
+        "import time; t = time.perf_counter(); "
+        "from app import create_app; create_app(); "
+        "print(f'{time.perf_counter() - t:.3f}')"
+    )
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=project_root, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        click.echo(proc.stderr[-2000:], err=True)
+        raise SystemExit(proc.returncode)
+
+    # "import time:  self [us] | cumulative | imported package"
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+        except ValueError:
+            continue
+
+    wall = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else "?"
+    click.echo(f"⏱️  create_app() with FAST_STARTUP={'on' if fast else 'off'}: {wall} s")
+    click.echo(f"\n{'cumulative':>12}  {'self':>10}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        click.echo(f"{cumulative_us / 1000:>10.1f}ms  {self_us / 1000:>8.1f}ms  {name}")
+
+
+@click.command("session-cleanup")
+@with_appcontext
+def cli_session_cleanup():
+    """Delete expired rows from the server-side session store."""
+    interface = current_app.session_interface
+    store = getattr(interface, "store", None)
+    if store is None:
+        click.echo("ℹ️  SESSION_BACKEND=cookie — nothing to clean up.")
+        return
+    removed = store.cleanup()
+    click.echo(f"🗑️  Removed {removed} expired session(s).")
+
+
+@click.command("library-import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "json", "jsonl"]), default=None,
+              help="Catalogue format (default: from the file extension).")
+@click.option("--batch-size", default=500, show_default=True, help="Records written per INSERT batch.")
+@click.option("--no-create-composers", is_flag=True, help="Report unknown composers instead of creating them.")
+@click.option("--dry-run", is_flag=True, help="Run the whole import and roll it back.")
+@with_appcontext
+def cli_library_import(path, fmt, batch_size, no_create_composers, dry_run):
+    """Import a CSV / JSON / JSON Lines catalogue of compositions into the library."""
+    from utils.library_import import import_library, detect_format
+
+    def progress(report):
+        click.echo(
+            f"   … {report.read} read, {report.created_compositions} created, "
+            f"{report.duplicates} duplicates, {len(report.errors)} errors"
+        )
+
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        report = import_library(
+            fh,
+            fmt or detect_format(path),
+            batch_size=batch_size,
+            create_composers=not no_create_composers,
+            dry_run=dry_run,
+            on_progress=progress,
+        )
+
+    click.echo(
+        f"📚 Compositions: {report.created_compositions} created, {report.duplicates} duplicates skipped; "
+        f"composers created: {report.created_composers}; instrumentation entries: {report.created_entries}."
+    )
+    if report.unknown_instruments:
+        click.echo("⚠️  Unknown instruments: " + ", ".join(
+            f"{token} ({count}×)" for token, count in sorted(report.unknown_instruments.items())
+        ))
+    for line_no, message in report.errors:
+        click.echo(f"❌ line {line_no}: {message}")
+    if dry_run:
+        click.echo("\n(dry-run — no changes written)")
+
+
+@click.command("rebuild-instrumentation-cache")
+@click.option("--batch-size", default=1000, show_default=True, help="Owners refreshed per UPDATE batch.")
+@with_appcontext
+def cli_rebuild_instrumentation_cache(batch_size):
+    """Recompute the denormalized instrumentation summary / signature of compositions, ensembles and projects."""
+    from sqlalchemy import select
+    from models.core import refresh_instrumentation_cache
+    from models.ensembles import INSTRUMENTATION_OWNERS
+
+    for model, column in INSTRUMENTATION_OWNERS.items():
+        ids = db.session.scalars(select(model.id).order_by(model.id)).all()
+        for start in range(0, len(ids), batch_size):
+            refresh_instrumentation_cache(db.session.connection(), model, column, ids[start:start + batch_size])
+            db.session.commit()
+        click.echo(f"🎼 {model.__tablename__}: {len(ids)} refreshed.")
+
+
+@click.command("benchmark-player-order")
+@click.option("--semester-id", type=int, default=None, help="Semester to load (default: the one with most links).")
+@click.option("--repeat", default=5, show_default=True, help="Runs per variant (best time is reported).")
+@with_appcontext
+def cli_benchmark_player_order(semester_id, repeat):
+    """
+    Compare loading a semester's ensemble players ordered by the old correlated
+    instrument-weight subquery vs. the denormalized player_sort_key column.
+    """
+    import time
+    from sqlalchemy import select, func
+    from models import EnsemblePlayer
+    from models.ensembles import player_sort_key_expression
+
+    if semester_id is None:
+        semester_id = db.session.scalar(
+            select(EnsemblePlayer.semester_id)
+            .group_by(EnsemblePlayer.semester_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+    if semester_id is None:
+        click.echo("ℹ️  No ensemble players to benchmark.")
+        return
+
+    base = select(EnsemblePlayer.id).where(EnsemblePlayer.semester_id == semester_id)
+    variants = {
+        "correlated subquery": base.order_by(
+            EnsemblePlayer.ensemble_id, player_sort_key_expression(EnsemblePlayer.player_id)
+        ),
+        "player_sort_key column": base.order_by(EnsemblePlayer.ensemble_id, EnsemblePlayer.player_sort_key),
+    }
+
+    results = {}
+    for label, stmt in variants.items():
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            rows = db.session.execute(stmt).all()
+            timings.append(time.perf_counter() - t)
+        results[label] = (min(timings), len(rows))
+
+    click.echo(f"⏱️  Semester {semester_id}, best of {repeat}:")
+    for label, (best, count) in results.items():
+        click.echo(f"   {label:<24} {best * 1000:>9.2f} ms  ({count} rows)")
+
+    old, new = results["correlated subquery"][0], results["player_sort_key column"][0]
+    if new:
+        click.echo(f"   speed-up: {old / new:.1f}×")
+
+
+@click.command("rebuild-student-status")
+@click.option("--semester-id", type=int, default=None, help="Only this semester (default: every semester).")
+@with_appcontext
+def cli_rebuild_student_status(semester_id):
+    """Recompute the student_semester_status read model behind the student list filters."""
+    from models.student_status import refresh_student_semester_status
+
+    written = refresh_student_semester_status(
+        db.session.connection(), semester_ids=[semester_id] if semester_id else None, everything=True
+    )
+    db.session.commit()
+    click.echo(f"🎓 {written} student/semester status rows refreshed.")
+
+
+@click.command("recompute-hours")
+@click.option("--semester-id", type=int, default=None, help="Only this semester (default: every semester).")
+@click.option("--ensemble-id", "ensemble_ids", type=int, multiple=True, help="Only these ensembles (repeatable).")
+@click.option("--dry-run", is_flag=True, help="Report the changes, then roll back.")
+@with_appcontext
+def cli_recompute_hours(semester_id, ensemble_ids, dry_run):
+    """Re-apply the hour-donation rule to ensemble teacher links in one UPDATE."""
+    from models.ensembles import recompute_hour_donations
+    from utils.portal_loader import mark_portal_written
+
+    changed = recompute_hour_donations(
+        db.session.connection(), semester_id=semester_id, ensemble_ids=ensemble_ids or None
+    )
+    if changed:
+        mark_portal_written(db.session)
+    scope = f"semester {semester_id}" if semester_id is not None else "all semesters"
+    click.echo(f"⏱️  {len(changed)} teacher links updated ({scope}).")
+
+    if dry_run:
+        db.session.rollback()
+        click.echo("(dry-run — no changes written)")
+    else:
+        db.session.commit()
+
+
+@click.command("takeover-teachers")
+@click.option("--semester-id", type=int, required=True, help="Target semester; teachers come from the one before it.")
+@click.option("--ensemble-id", "ensemble_ids", type=int, multiple=True,
+              help="Only these ensembles (default: every ensemble linked to the target semester).")
+@click.option("--dry-run", is_flag=True, help="List the links that would be created, write nothing.")
+@with_appcontext
+def cli_takeover_teachers(semester_id, ensemble_ids, dry_run):
+    """Carry teacher assignments over from the previous semester for all continuing ensembles."""
+    from models import Semester, Ensemble
+    from utils.semesters import get_previous_semester
+    from models.archive import ArchivedSemesterError
+    from utils.teacher_carryover import carry_over_teachers, continuing_ensemble_ids
+
+    target = db.session.get(Semester, semester_id)
+    if target is None:
+        raise click.ClickException(f"Semester {semester_id} does not exist.")
+    source = get_previous_semester(target)
+    if source is None:
+        raise click.ClickException(f"Semester {target.name} has no previous semester.")
+
+    query = Ensemble.query.filter(Ensemble.id.in_(ensemble_ids)) if ensemble_ids else None
+    try:
+        report = carry_over_teachers(source, target, continuing_ensemble_ids(target, query), dry_run=dry_run)
+    except ArchivedSemesterError as e:
+        raise click.ClickException(f"{target.name}: {e}")
+
+    for ensemble in report.as_dict()["ensembles"]:
+        click.echo(f"  + {ensemble['name']}: {', '.join(t or '?' for t in ensemble['teachers'])}")
+    click.echo(
+        f"👥 {source.name} → {target.name}: {report.created} teacher links "
+        f"across {len(report.additions)} of {report.ensemble_count} ensembles."
+    )
+
+    if dry_run:
+        db.session.rollback()
+        click.echo("(dry-run — no changes written)")
+    else:
+        db.session.commit()
+
+
+@click.command("db-index-report")
+@click.option("--semester-id", type=int, default=None, help="Semester to profile (default: the one with most ensembles).")
+@click.option("--min-rows", default=1000, show_default=True,
+              help="Ignore sequential scans of tables with fewer (estimated) rows.")
+@click.option("--show-sql", is_flag=True, help="Print the SQL of statements with flagged scans.")
+@with_appcontext
+def cli_db_index_report(semester_id, min_rows, show_sql):
+    """EXPLAIN (ANALYZE, BUFFERS) the registered hot queries and flag sequential scans."""
+    from utils.index_report import run_index_report, default_report_semester_id
+
+    if semester_id is None:
+        semester_id = default_report_semester_id()
+    if semester_id is None:
+        click.echo("ℹ️  No ensembles linked to any semester.")
+        return
+
+    try:
+        reports = run_index_report(semester_id, min_rows=min_rows)
+    finally:
+        db.session.rollback()
+
+    click.echo(f"🔎 Semester {semester_id}, sequential scans on tables ≥ {min_rows} rows:")
+    flagged_total = 0
+    for report in reports:
+        total_ms = sum(s.execution_ms for s in report.statements)
+        flagged = report.flagged
+        flagged_total += len(flagged)
+        icon = "⚠️ " if flagged else "✅"
+        click.echo(f"{icon} {report.label}: {len(report.statements)} statements, {total_ms:.1f} ms")
+        for plan in flagged:
+            for scan in plan.seq_scans:
+                click.echo(
+                    f"     Seq Scan on {scan.relation} (~{scan.table_rows} rows): "
+                    f"{scan.actual_rows} kept, {scan.removed_rows} filtered out"
+                    + (f" — {scan.filter}" if scan.filter else "")
+                )
+            click.echo(f"     {plan.execution_ms:.1f} ms, buffers hit={plan.shared_hit} read={plan.shared_read}")
+            if show_sql:
+                click.echo("     " + " ".join(plan.sql.split()))
+
+    click.echo(f"{flagged_total} statements with sequential scans.")
+
+
+@click.command("archive-semester")
+@click.option("--semester-id", "semester_ids", type=int, multiple=True, help="Semester to archive (repeatable).")
+@click.option("--all-closed", is_flag=True, help="Archive every ended, not yet archived semester.")
+@click.option("--dry-run", is_flag=True, help="Report the rows that would move, then roll back.")
+@with_appcontext
+def cli_archive_semester(semester_ids, all_closed, dry_run):
+    """Move closed semesters' players, teachers, repertoire and enrollments into the archive tables."""
+    from models import Semester
+    from utils.semester_archive import archive_semester, archivable_semesters, SemesterArchiveError
+
+    if all_closed:
+        semesters = archivable_semesters()
+    else:
+        semesters = [db.session.get(Semester, sid) for sid in semester_ids]
+        if None in semesters:
+            raise click.ClickException("Unknown semester id.")
+    if not semesters:
+        click.echo("ℹ️  Nothing to archive.")
+        return
+
+    for semester in semesters:
+        try:
+            counts = archive_semester(semester)
+        except SemesterArchiveError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+        summary = ", ".join(f"{table}: {n}" for table, n in counts.items())
+        click.echo(f"🗄️  {semester.name} (id {semester.id}) archived — {summary}")
+
+    if dry_run:
+        db.session.rollback()
+        click.echo("(dry-run — no changes written)")
+    else:
+        db.session.commit()
+
+
+@click.command("restore-semester")
+@click.option("--semester-id", type=int, required=True, help="Archived semester to move back into the live tables.")
+@with_appcontext
+def cli_restore_semester(semester_id):
+    """Move an archived semester back into the live tables (makes it editable again)."""
+    from models import Semester
+    from utils.semester_archive import restore_semester, SemesterArchiveError
+
+    semester = db.session.get(Semester, semester_id)
+    if semester is None:
+        raise click.ClickException(f"Semester {semester_id} does not exist.")
+    try:
+        counts = restore_semester(semester)
+    except SemesterArchiveError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    db.session.commit()
+    summary = ", ".join(f"{table}: {n}" for table, n in counts.items())
+    click.echo(f"📤 {semester.name} (id {semester.id}) restored — {summary}")
+
+
+@click.command("snapshot-semester")
+@click.option("--semester-id", "semester_ids", type=int, multiple=True, help="Semester to snapshot (repeatable).")
+@click.option("--all-closed", is_flag=True, help="Every archived semester without a snapshot.")
+@click.option("--replace", is_flag=True, help="Rebuild snapshots that already exist.")
+@with_appcontext
+def cli_snapshot_semester(semester_ids, all_closed, replace):
+    """Freeze the resolved state of archived semesters for the historical views and exports."""
+    import json
+    from models import Semester, SemesterArchive, SemesterSnapshot
+    from utils.semester_snapshot import snapshot_semester, SnapshotError
+
+    if all_closed:
+        query = Semester.query.filter(Semester.id.in_(db.session.query(SemesterArchive.semester_id)))
+        if not replace:
+            query = query.filter(Semester.id.notin_(db.session.query(SemesterSnapshot.semester_id)))
+        semesters = query.order_by(Semester.start_date).all()
+    else:
+        semesters = [db.session.get(Semester, sid) for sid in semester_ids]
+        if None in semesters:
+            raise click.ClickException("Unknown semester id.")
+    if not semesters:
+        click.echo("ℹ️  Nothing to snapshot.")
+        return
+
+    for semester in semesters:
+        try:
+            snapshot = snapshot_semester(semester, replace=replace)
+        except SnapshotError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+        db.session.commit()
+        size_kb = len(json.dumps(snapshot.payload)) / 1024
+        click.echo(
+            f"📸 {semester.name} (id {semester.id}): {len(snapshot.payload['ensembles'])} ensembles, {size_kb:.1f} kB"
+        )
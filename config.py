@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 
@@ -33,6 +34,36 @@ class BaseConfig:
     WEBAUTHN_RP_ID = os.environ.get("WEBAUTHN_RP_ID", "localhost")
     WEBAUTHN_RP_NAME = os.environ.get("WEBAUTHN_RP_NAME", "2chamber App")
     WEBAUTHN_ORIGIN = os.environ.get("WEBAUTHN_ORIGIN", "http://localhost:5000")
+
+    # Fast startup: load the Oracle Instant Client lazily on first use and skip
+    # db.create_all() on boot (run `flask create-schema` explicitly instead).
+    FAST_STARTUP = os.environ.get("FAST_STARTUP", "").lower() in ("1", "true", "yes")
+
+    # Session backend: "cookie" (signed cookie), "sqlalchemy" (Postgres) or "sqlite" (local file).
+    # Server-side backends keep only an opaque id in the cookie.
+    SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "cookie").lower()
+    SESSION_SQLITE_PATH = os.environ.get("SESSION_SQLITE_PATH")
+    SESSION_STORE_TTL = timedelta(hours=int(os.environ.get("SESSION_STORE_TTL_HOURS", 12)))
+    SESSION_CLEANUP_INTERVAL = int(os.environ.get("SESSION_CLEANUP_INTERVAL", 600))  # seconds
+
+    # In-memory semester timeline; rebuilt on local Semester writes, TTL covers other processes
+    SEMESTER_TIMELINE_TTL = int(os.environ.get("SEMESTER_TIMELINE_TTL", 300))  # seconds
+
+    # In-memory instrument abbreviation/name index used by orchestration_parser
+    INSTRUMENT_INDEX_TTL = int(os.environ.get("INSTRUMENT_INDEX_TTL", 300))  # seconds
+
+    # Rendered "my ensembles" fragment of the student/teacher portals, per (user, semester);
+    # dropped on local assignment writes, TTL covers other processes (0 = off)
+    PORTAL_FRAGMENT_TTL = int(os.environ.get("PORTAL_FRAGMENT_TTL", 60))  # seconds
+
+    # Template fragments wrapped in {% call cache_fragment(...) %} (nav, semester dropdown, ensemble
+    # rows), keyed by dependency tags bumped on commit of local writes. Backend "memory" (per process,
+    # TTL covers other processes) or "sqlite" (tags and fragments shared by the workers of a host).
+    FRAGMENT_CACHE_TTL = int(os.environ.get("FRAGMENT_CACHE_TTL", 300))  # seconds, 0 = off
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", 2000))
+    FRAGMENT_CACHE_BACKEND = os.environ.get("FRAGMENT_CACHE_BACKEND", "memory").lower()
+    FRAGMENT_CACHE_SQLITE_PATH = os.environ.get("FRAGMENT_CACHE_SQLITE_PATH")
+
     ORACLE_URL = construct_oracle_db_uri(
         user=os.environ.get('ORACLE_DB_USER'),
         password=os.environ.get('ORACLE_DB_PSWD'),
@@ -40,8 +71,6 @@ class BaseConfig:
         port=os.environ.get('ORACLE_DB_PORT'),
         service_name=os.environ.get('ORACLE_DB_SERVICE_NAME')
     )
-    if not ORACLE_URL:
-        raise RuntimeError("Missing ORACLE_DB_* env vars; cannot start app.")
 
     SQLALCHEMY_BINDS = {}
     OAUTH_TENANT_ID = os.environ.get("OAUTH_TENANT_ID")
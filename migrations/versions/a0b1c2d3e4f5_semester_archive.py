@@ -0,0 +1,100 @@
+"""semester archive: archive tables for closed semesters' assignments
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'a0b1c2d3e4f5'
+down_revision = 'f9a0b1c2d3e4'
+branch_labels = None
+depends_on = None
+
+
+def _fk(target, ondelete='CASCADE'):
+    return sa.ForeignKey(target, ondelete=ondelete)
+
+
+TABLES = {
+    'semester_archives': lambda: [
+        sa.Column('semester_id', sa.Integer(), _fk('semesters.id'), primary_key=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('row_counts', sa.JSON(), nullable=False, server_default='{}'),
+    ],
+    'ensemble_players_archive': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('player_id', sa.Integer(), _fk('players.id'), nullable=True),
+        sa.Column('ensemble_id', sa.Integer(), _fk('ensembles.id'), nullable=False),
+        sa.Column('semester_id', sa.Integer(), _fk('semesters.id'), nullable=True),
+        sa.Column('ensemble_instrumentation_id', sa.Integer(), _fk('ensemble_instrumentations.id', 'SET NULL'),
+                  nullable=True),
+        sa.Column('player_sort_key', sa.Integer(), nullable=False, server_default='9999'),
+    ],
+    'ensemble_teachers_archive': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('hour_donation', sa.Float(), nullable=True),
+        sa.Column('teacher_id', sa.Integer(), _fk('teachers.id'), nullable=True),
+        sa.Column('ensemble_id', sa.Integer(), _fk('ensembles.id'), nullable=False),
+        sa.Column('semester_id', sa.Integer(), _fk('semesters.id'), nullable=False),
+    ],
+    'ensemble_repertoires_archive': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('ensemble_id', sa.Integer(), _fk('ensembles.id'), nullable=False),
+        sa.Column('composition_id', sa.Integer(), _fk('compositions.id'), nullable=False),
+        sa.Column('semester_id', sa.Integer(), _fk('semesters.id'), nullable=False),
+    ],
+    'student_subject_enrollments_archive': lambda: [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('student_id', sa.Integer(), _fk('students.id'), nullable=False),
+        sa.Column('semester_id', sa.Integer(), _fk('semesters.id'), nullable=False),
+        sa.Column('subject_id', sa.Integer(), _fk('subjects.id'), nullable=False),
+        sa.Column('classification', postgresql.ENUM(name='classification_enum', create_type=False), nullable=True),
+        sa.Column('classification_basis', postgresql.ENUM(name='classification_basis_enum', create_type=False),
+                  nullable=True),
+        sa.Column('classification_date', sa.Date(), nullable=True),
+        sa.Column('erasmus', sa.Boolean(), nullable=True),
+    ],
+}
+
+INDEXES = {
+    'ix_ens_players_archive_semester_ensemble': (
+        'ensemble_players_archive', ['semester_id', 'ensemble_id', 'player_sort_key']
+    ),
+    'ix_ens_players_archive_player': ('ensemble_players_archive', ['player_id', 'semester_id']),
+    'ix_ens_teachers_archive_semester_ensemble': ('ensemble_teachers_archive', ['semester_id', 'ensemble_id']),
+    'ix_ens_teachers_archive_teacher': ('ensemble_teachers_archive', ['teacher_id', 'semester_id']),
+    'ix_ens_repertoires_archive_composition': ('ensemble_repertoires_archive', ['composition_id', 'semester_id']),
+    'ix_ens_repertoires_archive_semester_ensemble': ('ensemble_repertoires_archive', ['semester_id', 'ensemble_id']),
+    'ix_sse_archive_student_semester': ('student_subject_enrollments_archive', ['student_id', 'semester_id']),
+    'ix_sse_archive_semester_subject': ('student_subject_enrollments_archive', ['semester_id', 'subject_id']),
+}
+
+
+def upgrade():
+    existing_tables = set(sa_inspect(op.get_bind()).get_table_names())
+    for name, columns in TABLES.items():
+        if name not in existing_tables:
+            op.create_table(name, *columns())
+
+    inspector = sa_inspect(op.get_bind())
+    for name, (table, columns) in INDEXES.items():
+        if name not in {idx['name'] for idx in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    # archived rows would be lost with their tables: move them back first (flask restore-semester)
+    bind = op.get_bind()
+    existing_tables = set(sa_inspect(bind).get_table_names())
+    if 'semester_archives' in existing_tables:
+        if bind.execute(sa.text("SELECT count(*) FROM semester_archives")).scalar():
+            raise RuntimeError("Archived semesters exist; run `flask restore-semester` for each before downgrading.")
+
+    for name in reversed(list(TABLES)):
+        if name in existing_tables:
+            op.drop_table(name)
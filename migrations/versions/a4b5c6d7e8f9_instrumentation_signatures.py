@@ -0,0 +1,67 @@
+"""instrumentation signature on compositions and ensembles
+
+Revision ID: a4b5c6d7e8f9
+Revises: f3a4b5c6d7e8
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'a4b5c6d7e8f9'
+down_revision = 'f3a4b5c6d7e8'
+branch_labels = None
+depends_on = None
+
+
+OWNERS = [
+    # owner table, entry table, entry FK
+    ('compositions', 'composition_instrumentations', 'composition_id'),
+    ('ensembles', 'ensemble_instrumentations', 'ensemble_id'),
+]
+
+
+def upgrade():
+    inspector = sa_inspect(op.get_bind())
+
+    for table, entry_table, fk in OWNERS:
+        existing_cols = {col['name'] for col in inspector.get_columns(table)}
+        existing_idx = {idx['name'] for idx in inspector.get_indexes(table)}
+
+        if 'instrumentation_signature' not in existing_cols:
+            op.add_column(table, sa.Column('instrumentation_signature', sa.String(length=1024), nullable=True))
+        if 'instrumentation_size' not in existing_cols:
+            op.add_column(table, sa.Column('instrumentation_size', sa.Integer(), nullable=False, server_default='0'))
+
+        # backfill: "<instrument_id>x<count>" sorted by instrument id, ";" separated
+        op.execute(f"""
+            UPDATE {table} AS o
+            SET instrumentation_signature = s.signature,
+                instrumentation_size = s.size
+            FROM (
+                SELECT owner_id,
+                       string_agg(instrument_id::text || 'x' || n::text, ';' ORDER BY instrument_id) AS signature,
+                       sum(n) AS size
+                FROM (
+                    SELECT e.{fk} AS owner_id, i.instrument_id, count(*) AS n
+                    FROM {entry_table} e
+                    JOIN instrumentations i ON i.id = e.id
+                    GROUP BY e.{fk}, i.instrument_id
+                ) c
+                GROUP BY owner_id
+            ) s
+            WHERE s.owner_id = o.id
+        """)
+
+        for column in ('instrumentation_signature', 'instrumentation_size'):
+            name = f'ix_{table}_{column}'
+            if name not in existing_idx:
+                op.create_index(name, table, [column])
+
+
+def downgrade():
+    for table, _, _ in OWNERS:
+        for column in ('instrumentation_size', 'instrumentation_signature'):
+            op.drop_index(f'ix_{table}_{column}', table_name=table)
+            op.drop_column(table, column)
@@ -0,0 +1,33 @@
+"""denormalized instrumentation_summary on compositions, ensembles and projects
+
+Revision ID: b5c6d7e8f9a0
+Revises: a4b5c6d7e8f9
+Create Date: 2026-10-19
+
+The column starts NULL (models fall back to formatting the entries);
+fill it with `flask rebuild-instrumentation-cache`.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'b5c6d7e8f9a0'
+down_revision = 'a4b5c6d7e8f9'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['compositions', 'ensembles', 'projects']
+
+
+def upgrade():
+    inspector = sa_inspect(op.get_bind())
+    for table in TABLES:
+        existing_cols = {col['name'] for col in inspector.get_columns(table)}
+        if 'instrumentation_summary' not in existing_cols:
+            op.add_column(table, sa.Column('instrumentation_summary', sa.String(length=1024), nullable=True))
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_column(table, 'instrumentation_summary')
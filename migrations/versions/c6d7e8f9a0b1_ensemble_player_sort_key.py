@@ -0,0 +1,43 @@
+"""denormalized player_sort_key on ensemble_players
+
+Revision ID: c6d7e8f9a0b1
+Revises: b5c6d7e8f9a0
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'c6d7e8f9a0b1'
+down_revision = 'b5c6d7e8f9a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa_inspect(op.get_bind())
+    existing_cols = {col['name'] for col in inspector.get_columns('ensemble_players')}
+    existing_idx = {idx['name'] for idx in inspector.get_indexes('ensemble_players')}
+
+    if 'player_sort_key' not in existing_cols:
+        op.add_column('ensemble_players',
+            sa.Column('player_sort_key', sa.Integer(), nullable=False, server_default='9999'))
+
+    # backfill: instrument weight of the assigned player
+    op.execute("""
+        UPDATE ensemble_players AS ep
+        SET player_sort_key = COALESCE(i.weight, 9999)
+        FROM players p
+        JOIN instruments i ON i.id = p.instrument_id
+        WHERE p.id = ep.player_id
+    """)
+
+    if 'ix_ens_players_ensemble_sort' not in existing_idx:
+        op.create_index('ix_ens_players_ensemble_sort', 'ensemble_players',
+                        ['ensemble_id', 'player_sort_key', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_ens_players_ensemble_sort', table_name='ensemble_players')
+    op.drop_column('ensemble_players', 'player_sort_key')
@@ -0,0 +1,34 @@
+"""add server_sessions table
+
+Revision ID: d1e2f3a4b5c6
+Revises: 2a435a4003b3
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'd1e2f3a4b5c6'
+down_revision = '2a435a4003b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = sa_inspect(op.get_bind()).get_table_names()
+
+    if 'server_sessions' not in existing:
+        op.create_table(
+            'server_sessions',
+            sa.Column('id', sa.String(length=64), nullable=False),
+            sa.Column('data', sa.Text(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_server_sessions_expires_at', 'server_sessions', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_server_sessions_expires_at', table_name='server_sessions')
+    op.drop_table('server_sessions')
@@ -0,0 +1,32 @@
+"""semester_snapshots: resolved state of closed semesters for historical exports
+
+Revision ID: d3e4f5a6b7c8
+Revises: a0b1c2d3e4f5
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'd3e4f5a6b7c8'
+down_revision = 'a0b1c2d3e4f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'semester_snapshots' not in sa_inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'semester_snapshots',
+            sa.Column('semester_id', sa.Integer(), sa.ForeignKey('semesters.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('payload', postgresql.JSONB(), nullable=False),
+        )
+
+
+def downgrade():
+    if 'semester_snapshots' in sa_inspect(op.get_bind()).get_table_names():
+        op.drop_table('semester_snapshots')
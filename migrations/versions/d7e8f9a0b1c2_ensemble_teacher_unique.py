@@ -0,0 +1,49 @@
+"""unique (ensemble_id, semester_id, teacher_id) on ensemble_teachers
+
+Revision ID: d7e8f9a0b1c2
+Revises: c6d7e8f9a0b1
+Create Date: 2026-10-19
+
+Duplicate links (same teacher twice on an ensemble in a semester) are removed,
+keeping the oldest row, and hour donations of the affected ensembles are re-split.
+"""
+from alembic import op
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'd7e8f9a0b1c2'
+down_revision = 'c6d7e8f9a0b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa_inspect(op.get_bind())
+    existing = {uc['name'] for uc in inspector.get_unique_constraints('ensemble_teachers')}
+    if 'uq_ensemble_teacher_semester' in existing:
+        return
+
+    op.execute("""
+        DELETE FROM ensemble_teachers AS dup
+        USING ensemble_teachers AS keep
+        WHERE dup.ensemble_id = keep.ensemble_id
+          AND dup.semester_id = keep.semester_id
+          AND dup.teacher_id = keep.teacher_id
+          AND dup.id > keep.id
+    """)
+    op.execute("""
+        UPDATE ensemble_teachers AS et
+        SET hour_donation = s.share
+        FROM (
+            SELECT id, 1.0 / count(*) OVER (PARTITION BY ensemble_id, semester_id) AS share
+            FROM ensemble_teachers
+        ) s
+        WHERE s.id = et.id AND et.hour_donation IS DISTINCT FROM s.share
+    """)
+
+    op.create_unique_constraint(
+        'uq_ensemble_teacher_semester', 'ensemble_teachers', ['ensemble_id', 'semester_id', 'teacher_id']
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_ensemble_teacher_semester', 'ensemble_teachers', type_='unique')
@@ -0,0 +1,55 @@
+"""add player_fingerprint to student_chamber_applications
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'e2f3a4b5c6d7'
+down_revision = 'd1e2f3a4b5c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa_inspect(op.get_bind())
+    existing_cols = {col['name'] for col in inspector.get_columns('student_chamber_applications')}
+    existing_idx = {idx['name'] for idx in inspector.get_indexes('student_chamber_applications')}
+
+    if 'player_fingerprint' not in existing_cols:
+        op.add_column('student_chamber_applications',
+            sa.Column('player_fingerprint', sa.String(length=512), nullable=True))
+
+    # backfill: applicant's player + co-players, sorted numerically, comma separated
+    op.execute("""
+        UPDATE student_chamber_applications AS a
+        SET player_fingerprint = f.fingerprint
+        FROM (
+            SELECT s.application_id, string_agg(s.player_id::text, ',' ORDER BY s.player_id) AS fingerprint
+            FROM (
+                SELECT a2.id AS application_id, p.id AS player_id
+                FROM student_chamber_applications a2
+                JOIN players p ON p.student_id = a2.student_id
+                UNION
+                SELECT application_id, player_id
+                FROM student_chamber_application_players
+            ) s
+            GROUP BY s.application_id
+        ) f
+        WHERE f.application_id = a.id
+    """)
+    # no players at all: '' like player_fingerprint_for([]) and refresh_player_fingerprints, not NULL
+    op.execute("UPDATE student_chamber_applications SET player_fingerprint = '' WHERE player_fingerprint IS NULL")
+
+    if 'ix_sca_semester_player_fingerprint' not in existing_idx:
+        op.create_index('ix_sca_semester_player_fingerprint', 'student_chamber_applications',
+                        ['semester_id', 'player_fingerprint'])
+
+
+def downgrade():
+    op.drop_index('ix_sca_semester_player_fingerprint', table_name='student_chamber_applications')
+    op.drop_column('student_chamber_applications', 'player_fingerprint')
@@ -0,0 +1,77 @@
+"""student_semester_status read model for the student list filters
+
+Revision ID: e8f9a0b1c2d3
+Revises: d7e8f9a0b1c2
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'e8f9a0b1c2d3'
+down_revision = 'd7e8f9a0b1c2'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'ix_sss_semester_ensemble': ['semester_id', 'has_ensemble', 'student_id'],
+    'ix_sss_semester_classification': ['semester_id', 'has_classification', 'student_id'],
+    'ix_sss_semester_application': ['semester_id', 'has_pending_application', 'student_id'],
+}
+
+
+def upgrade():
+    inspector = sa_inspect(op.get_bind())
+
+    if 'student_semester_status' not in inspector.get_table_names():
+        op.create_table(
+            'student_semester_status',
+            sa.Column('student_id', sa.Integer(), sa.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('semester_id', sa.Integer(), sa.ForeignKey('semesters.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('has_ensemble', sa.Boolean(), nullable=False, server_default='false'),
+            sa.Column('ensemble_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('has_classification', sa.Boolean(), nullable=False, server_default='false'),
+            sa.Column('has_pending_application', sa.Boolean(), nullable=False, server_default='false'),
+        )
+
+    existing_idx = {idx['name'] for idx in sa_inspect(op.get_bind()).get_indexes('student_semester_status')}
+    for name, columns in INDEXES.items():
+        if name not in existing_idx:
+            op.create_index(name, 'student_semester_status', columns)
+
+    # backfill (same rules as models.student_status.refresh_student_semester_status)
+    op.execute("""
+        INSERT INTO student_semester_status
+            (student_id, semester_id, ensemble_count, has_ensemble, has_classification, has_pending_application)
+        SELECT c.student_id, c.semester_id,
+               COALESCE(e.n, 0), COALESCE(e.n, 0) > 0,
+               EXISTS (SELECT 1 FROM student_subject_enrollments sse
+                       WHERE sse.student_id = c.student_id AND sse.semester_id = c.semester_id
+                         AND sse.classification IS NOT NULL),
+               EXISTS (SELECT 1 FROM student_chamber_applications sca
+                       WHERE sca.student_id = c.student_id AND sca.semester_id = c.semester_id)
+        FROM (
+            SELECT student_id, semester_id FROM student_subject_enrollments
+            UNION
+            SELECT p.student_id, ep.semester_id FROM ensemble_players ep JOIN players p ON p.id = ep.player_id
+            WHERE p.student_id IS NOT NULL
+            UNION
+            SELECT student_id, semester_id FROM student_chamber_applications WHERE semester_id IS NOT NULL
+        ) c
+        LEFT JOIN (
+            SELECT p.student_id, ep.semester_id, count(DISTINCT ep.ensemble_id) AS n
+            FROM ensemble_players ep
+            JOIN players p ON p.id = ep.player_id
+            JOIN ensemble_semesters es ON es.ensemble_id = ep.ensemble_id AND es.semester_id = ep.semester_id
+            GROUP BY p.student_id, ep.semester_id
+        ) e ON e.student_id = c.student_id AND e.semester_id = c.semester_id
+        ON CONFLICT (student_id, semester_id) DO NOTHING
+    """)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='student_semester_status')
+    op.drop_table('student_semester_status')
@@ -0,0 +1,46 @@
+"""prefix / unaccent search indexes for player candidate lookup
+
+Revision ID: f3a4b5c6d7e8
+Revises: e2f3a4b5c6d7
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = 'f3a4b5c6d7e8'
+down_revision = 'e2f3a4b5c6d7'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_INDEXES = [
+    ('ix_students_search_last_name', 'students', 'last_name'),
+    ('ix_students_search_first_name', 'students', 'first_name'),
+    ('ix_players_search_last_name', 'players', 'last_name'),
+    ('ix_players_search_first_name', 'players', 'first_name'),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    # unaccent() is only STABLE; an IMMUTABLE wrapper with a fixed dictionary is indexable
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+
+    for name, table, column in SEARCH_INDEXES:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} (f_unaccent(lower({column})) text_pattern_ops)"
+        )
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_players_instrument_id ON players (instrument_id)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_players_instrument_id")
+    for name, _, _ in SEARCH_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
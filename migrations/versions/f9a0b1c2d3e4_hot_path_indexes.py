@@ -0,0 +1,69 @@
+"""composite / partial indexes for hot ensemble and semester access paths
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect as sa_inspect
+
+revision = 'f9a0b1c2d3e4'
+down_revision = 'e8f9a0b1c2d3'
+branch_labels = None
+depends_on = None
+
+
+# name -> (table, columns, partial WHERE or None)
+INDEXES = {
+    'ix_ens_players_ensemble_semester': ('ensemble_players', ['ensemble_id', 'semester_id', 'player_id'], None),
+    'ix_ens_players_semester_player_assigned': (
+        'ensemble_players', ['semester_id', 'player_id'], 'player_id IS NOT NULL'
+    ),
+    'ix_ens_teachers_semester_teacher': ('ensemble_teachers', ['semester_id', 'teacher_id', 'ensemble_id'], None),
+    'ix_ens_semesters_semester_ensemble': ('ensemble_semesters', ['semester_id', 'ensemble_id'], None),
+    'ix_sse_semester_subject_student': (
+        'student_subject_enrollments', ['semester_id', 'subject_id', 'student_id'], None
+    ),
+    'ix_ens_repertoires_ensemble_semester': ('ensemble_repertoires', ['ensemble_id', 'semester_id'], None),
+    'ix_students_active_name': ('students', ['last_name', 'first_name'], 'active'),
+}
+
+
+def _invalid_indexes(bind):
+    """Leftovers of an interrupted CREATE INDEX CONCURRENTLY: present in the catalog, unusable."""
+    return set(bind.execute(sa.text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+    ), {"names": list(INDEXES)}).scalars())
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction; keeps the tables writable while building
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for name in _invalid_indexes(bind):
+            op.drop_index(name, table_name=INDEXES[name][0], postgresql_concurrently=True)
+
+        inspector = sa_inspect(bind)
+        for name, (table, columns, where) in INDEXES.items():
+            existing = {idx['name'] for idx in inspector.get_indexes(table)}
+            if name in existing:
+                continue
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+    op.execute("ANALYZE ensemble_players, ensemble_teachers, ensemble_semesters, "
+               "student_subject_enrollments, ensemble_repertoires, students")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        inspector = sa_inspect(op.get_bind())
+        for name, (table, _, _) in INDEXES.items():
+            if name in {idx['name'] for idx in inspector.get_indexes(table)}:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
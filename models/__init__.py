@@ -4,9 +4,11 @@ db = SQLAlchemy()
 
 from .core import *
 from .library import *
-from .auth import Role, RolePermission, Permission, User, PasskeyCredential
+from .auth import Role, RolePermission, Permission, User, PasskeyCredential, ServerSession
 from .ensembles import *
 from .students import *
 from .teachers import *
 from .oracle import *
 from .players import *
+from .student_status import *
+from .archive import *
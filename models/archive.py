@@ -0,0 +1,186 @@
+from datetime import datetime
+from sqlalchemy import Enum, event, inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+from models import db
+from models.ensembles import EnsemblePlayer, EnsembleTeacher, EnsembleRepertoire
+from models.students import StudentSubjectEnrollment
+
+
+class SemesterArchive(db.Model):
+    """
+    A closed semester frozen by `flask archive-semester`: its ensemble players, teachers,
+    repertoire and subject enrollments were moved into the *_archive tables below, so the
+    live tables only carry the working set. Archived semesters are read-only.
+    """
+    __tablename__ = 'semester_archives'
+
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), primary_key=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    row_counts = db.Column(db.JSON, nullable=False, default=dict)  # {live table name: rows moved}
+
+    semester = db.relationship('Semester')
+
+
+class SemesterSnapshot(db.Model):
+    """
+    Fully resolved state of an archived semester (ensembles, seats, players, teachers, hours,
+    repertoire, health) written once by `flask snapshot-semester`; the ensemble list, the
+    workloads page and the PDF / table exports of that semester read it instead of
+    recomputing from the relational tables. Restoring the semester deletes it.
+    """
+    __tablename__ = 'semester_snapshots'
+
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False)
+    payload = db.Column(JSONB, nullable=False)
+
+    semester = db.relationship('Semester')
+
+
+# Same columns and ids as the live rows. Only the (semester, ...) access paths are indexed and
+# relationships are view-only: archive rows are written by utils.semester_archive alone.
+
+class ArchivedEnsemblePlayer(db.Model):
+    __tablename__ = 'ensemble_players_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'), nullable=True)
+    ensemble_id = db.Column(db.Integer, db.ForeignKey('ensembles.id', ondelete='CASCADE'), nullable=False)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), nullable=True)
+    # the seat may be re-shaped later; the archived assignment outlives it
+    ensemble_instrumentation_id = db.Column(
+        db.Integer, db.ForeignKey('ensemble_instrumentations.id', ondelete='SET NULL'), nullable=True
+    )
+    player_sort_key = db.Column(db.Integer, nullable=False, default=9999, server_default="9999")
+
+    player = db.relationship("Player", viewonly=True)
+    ensemble = db.relationship("Ensemble", viewonly=True)
+    ensemble_instrumentation = db.relationship("EnsembleInstrumentation", viewonly=True)
+    semester = db.relationship("Semester", viewonly=True)
+
+    __table_args__ = (
+        db.Index("ix_ens_players_archive_semester_ensemble", "semester_id", "ensemble_id", "player_sort_key"),
+        db.Index("ix_ens_players_archive_player", "player_id", "semester_id"),
+    )
+
+
+class ArchivedEnsembleTeacher(db.Model):
+    __tablename__ = 'ensemble_teachers_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    hour_donation = db.Column(db.Float)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id', ondelete='CASCADE'), nullable=True)
+    ensemble_id = db.Column(db.Integer, db.ForeignKey('ensembles.id', ondelete='CASCADE'), nullable=False)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), nullable=False)
+
+    teacher = db.relationship("Teacher", viewonly=True)
+    ensemble = db.relationship("Ensemble", viewonly=True)
+    semester = db.relationship("Semester", viewonly=True)
+
+    __table_args__ = (
+        db.Index("ix_ens_teachers_archive_semester_ensemble", "semester_id", "ensemble_id"),
+        db.Index("ix_ens_teachers_archive_teacher", "teacher_id", "semester_id"),
+    )
+
+
+class ArchivedEnsembleRepertoire(db.Model):
+    __tablename__ = 'ensemble_repertoires_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ensemble_id = db.Column(db.Integer, db.ForeignKey("ensembles.id", ondelete="CASCADE"), nullable=False)
+    composition_id = db.Column(db.Integer, db.ForeignKey("compositions.id", ondelete="CASCADE"), nullable=False)
+    semester_id = db.Column(db.Integer, db.ForeignKey("semesters.id", ondelete="CASCADE"), nullable=False)
+
+    ensemble = db.relationship("Ensemble", viewonly=True)
+    composition = db.relationship("Composition", viewonly=True)
+    semester = db.relationship("Semester", viewonly=True)
+
+    __table_args__ = (
+        db.Index("ix_ens_repertoires_archive_composition", "composition_id", "semester_id"),
+        db.Index("ix_ens_repertoires_archive_semester_ensemble", "semester_id", "ensemble_id"),
+    )
+
+
+class ArchivedStudentSubjectEnrollment(db.Model):
+    __tablename__ = 'student_subject_enrollments_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=False)
+    classification = db.Column(
+        Enum('A', 'B', 'C', 'D', 'E', 'Z', 'N', name='classification_enum'),
+        nullable=True
+    )
+    classification_basis = db.Column(
+        Enum('exam', 'request', 'performed_live', name='classification_basis_enum'),
+        nullable=True
+    )
+    classification_date = db.Column(db.Date, nullable=True)
+    erasmus = db.Column(db.Boolean, default=False)
+
+    student = db.relationship('Student', viewonly=True)
+    semester = db.relationship('Semester', viewonly=True)
+    subject = db.relationship('Subject', viewonly=True)
+
+    __table_args__ = (
+        db.Index('ix_sse_archive_student_semester', 'student_id', 'semester_id'),
+        db.Index('ix_sse_archive_semester_subject', 'semester_id', 'subject_id'),
+    )
+
+
+# live model -> archive model
+ARCHIVE_MODELS = {
+    EnsemblePlayer: ArchivedEnsemblePlayer,
+    EnsembleTeacher: ArchivedEnsembleTeacher,
+    EnsembleRepertoire: ArchivedEnsembleRepertoire,
+    StudentSubjectEnrollment: ArchivedStudentSubjectEnrollment,
+}
+
+
+def is_archived(semester_id):
+    # identity map: repeated checks within one request hit the DB once
+    return bool(semester_id) and db.session.get(SemesterArchive, semester_id) is not None
+
+
+def semester_model(model, semester_id):
+    """The model holding `model` rows of the semester: its archive twin once the semester is archived."""
+    return ARCHIVE_MODELS[model] if is_archived(semester_id) else model
+
+
+class ArchivedSemesterError(Exception):
+    """A write into the live tables for an archived (read-only) semester."""
+
+    def __init__(self, message="Semestr je archivován, jeho data nelze měnit."):
+        super().__init__(message)
+
+
+def ensure_not_archived(semester_id):
+    """Raise ArchivedSemesterError for an archived semester; for core writes the flush guard cannot see."""
+    if is_archived(semester_id):
+        raise ArchivedSemesterError()
+
+
+def _semester_ids(obj):
+    state = sa_inspect(obj)
+    ids = {obj.semester_id, *state.attrs.semester_id.history.deleted}
+    # rows linked through the relationship get their semester_id only during the flush
+    if obj.semester_id is None:
+        ids.add(getattr(state.attrs.semester.loaded_value, "id", None))
+    return {sid for sid in ids if sid is not None}
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_archived_semester_writes(session, flush_context, instances):
+    """
+    Archived semesters keep their rows in the *_archive tables; a live row written for one
+    would split the semester between both tables (and break restore_semester's unique keys).
+    """
+    semester_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if type(obj) in ARCHIVE_MODELS:
+            semester_ids |= _semester_ids(obj)
+    if any(session.get(SemesterArchive, sid) is not None for sid in semester_ids):
+        raise ArchivedSemesterError()
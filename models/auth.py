@@ -118,3 +118,11 @@ class PasskeyCredential(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="passkey_credentials")
+
+
+class ServerSession(db.Model):
+    """Server-side session payload; the cookie only carries the signed opaque id."""
+    __tablename__ = "server_sessions"
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -2,7 +2,7 @@ from sqlalchemy.orm import relationship
 from collections import defaultdict
 from models import db
 from datetime import datetime
-from sqlalchemy import UniqueConstraint, CheckConstraint, Index
+from sqlalchemy import UniqueConstraint, CheckConstraint, Index, select, update, bindparam, func
 
 
 class AcademicYear(db.Model):
@@ -229,6 +229,110 @@ class DoublingInstrumentation(db.Model):
     doubling_instrument = relationship('Instrument')
 
 
+def instrumentation_signature_for(instrument_ids):
+    """
+    Canonical multiset key of an instrumentation: "<instrument_id>x<count>" sorted by id,
+    joined by ";" (e.g. "3x2;7x1;12x1"). None for an empty instrumentation.
+    """
+    counts = defaultdict(int)
+    for instrument_id in instrument_ids:
+        counts[instrument_id] += 1
+    if not counts:
+        return None
+    return ";".join(f"{iid}x{counts[iid]}" for iid in sorted(counts))
+
+
+def parse_instrumentation_signature(signature):
+    """"3x2;7x1" -> {3: 2, 7: 1}."""
+    counts = {}
+    for item in (signature or "").split(";"):
+        if item:
+            iid, _, count = item.partition("x")
+            counts[int(iid)] = int(count)
+    return counts
+
+
+def format_instrument_counts(rows):
+    """
+    [(abbreviation, weight, position)] -> "2Fl, Ob, Pf": grouped by abbreviation,
+    ordered by instrument weight and position.
+    """
+    counter = defaultdict(int)
+    order = []
+
+    for abbr, _, _ in sorted(rows, key=lambda r: (r[1] or 0, r[2] or 0)):
+        abbr = abbr.strip()
+        if abbr not in counter:
+            order.append(abbr)
+        counter[abbr] += 1
+
+    return ", ".join(f"{counter[abbr]}{abbr}" if counter[abbr] > 1 else abbr for abbr in order)
+
+
+def format_instrumentation(instrumentation_entries, comment=None):
+    """Summary of ORM instrumentation entries ("2Fl, Ob, Pf"), followed by a free-text comment."""
+    text = format_instrument_counts(
+        (e.instrument.abbreviation or e.instrument.name, e.instrument.weight, e.position)
+        for e in instrumentation_entries
+    )
+    return ", ".join(part for part in (text, comment) if part)
+
+
+def refresh_instrumentation_cache(connection, owner_model, owner_column, owner_ids):
+    """
+    Recompute the denormalized instrumentation columns of `owner_model` rows from their entries
+    (owner_column = entry FK, e.g. CompositionInstrumentation.composition_id):
+    instrumentation_summary always, instrumentation_signature / instrumentation_size where the
+    owner has them. Needed after bulk INSERT/DELETE of entries, which bypass the after_flush
+    maintenance. Returns {owner_id: {column: value}}.
+    """
+    owner_ids = {oid for oid in owner_ids if oid}
+    if not owner_ids:
+        return {}
+
+    entries = {oid: [] for oid in owner_ids}
+    entry_cls = owner_column.class_
+    rows = connection.execute(
+        select(
+            owner_column, entry_cls.instrument_id,
+            func.coalesce(Instrument.abbreviation, Instrument.name), Instrument.weight, entry_cls.position,
+        )
+        .join(Instrument, Instrument.id == entry_cls.instrument_id)
+        .where(owner_column.in_(owner_ids))
+    )
+    for owner_id, instrument_id, abbr, weight, position in rows:
+        entries[owner_id].append((instrument_id, abbr, weight, position))
+
+    table = owner_model.__table__
+    with_signature = "instrumentation_signature" in table.c
+
+    values = {}
+    for oid, items in entries.items():
+        values[oid] = {"instrumentation_summary": format_instrument_counts(item[1:] for item in items)}
+        if with_signature:
+            values[oid]["instrumentation_signature"] = instrumentation_signature_for(item[0] for item in items)
+            values[oid]["instrumentation_size"] = len(items)
+
+    columns = list(next(iter(values.values())))
+    connection.execute(
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values({column: bindparam(f"b_{column}") for column in columns}),
+        [
+            {"b_id": oid, **{f"b_{column}": value for column, value in cols.items()}}
+            for oid, cols in values.items()
+        ],
+    )
+    return values
+
+
+def owners_of_instruments(connection, owner_column, instrument_ids):
+    """Owner ids whose entries use any of the instruments (to refresh after an Instrument edit)."""
+    return set(connection.scalars(
+        select(owner_column).distinct().where(owner_column.class_.instrument_id.in_(instrument_ids))
+    ))
+
+
 class ProjectInstrumentation(Instrumentation):
     __tablename__ = 'project_instrumentations'
     id = db.Column(db.Integer, db.ForeignKey('instrumentations.id'), primary_key=True)
@@ -286,6 +390,8 @@ class Project(db.Model):
     conductor = db.Column(db.String(100))
     programme = db.Column(db.Text)  # Changed from db.String to db.Text
     instrumentation_comment = db.Column(db.String(256))
+    # denormalized "2Fl, Ob, Pf" of instrumentation_entries (without the comment), see refresh_instrumentation_cache()
+    instrumentation_summary = db.Column(db.String(1024), nullable=True)
     color = db.Column(db.String(50))
 
     application_mode = db.Column(db.String(20), default="project")
@@ -304,6 +410,9 @@ class Project(db.Model):
 
     @property
     def instrumentation(self):
+        if self.instrumentation_summary is not None:
+            return ", ".join(part for part in (self.instrumentation_summary, self.instrumentation_comment) if part)
+
         if not self.instrumentation_entries:
             return ""
 
@@ -1,39 +1,22 @@
-from sqlalchemy.orm import relationship, column_property
+from sqlalchemy.orm import relationship, column_property, Session
+from sqlalchemy.orm.attributes import set_committed_value
 from models import db
-from models.core import Instrumentation, Semester
+from models.core import (
+    Instrumentation, Semester, Instrument, Project, ProjectInstrumentation,
+    format_instrument_counts, refresh_instrumentation_cache, owners_of_instruments,
+)
+from models.library import Composition, CompositionInstrumentation
 from datetime import date
-from collections import defaultdict
 from sqlalchemy.ext.hybrid import hybrid_property, hybrid_method
-from sqlalchemy import case, func, select, exists
+from sqlalchemy import case, func, select, exists, event, update, or_, inspect as sa_inspect
 
 
 def format_ensemble_instrumentation(instrumentation_entries):
-    counter = defaultdict(int)
-    order = []
-
-    sorted_entries = sorted(
-        instrumentation_entries,
-        key=lambda x: (
-            x.instrument.weight if x.instrument else 9999,
-            x.position or 0
-        )
+    return format_instrument_counts(
+        (e.instrument.abbreviation or e.instrument.name, e.instrument.weight, e.position)
+        for e in instrumentation_entries
     )
 
-    for entry in sorted_entries:
-        abbr = entry.instrument.abbreviation or entry.instrument.name
-        abbr = abbr.strip()
-
-        if abbr not in counter:
-            order.append(abbr)
-        counter[abbr] += 1
-
-    formatted = []
-    for abbr in order:
-        count = counter[abbr]
-        formatted.append(f"{count}{abbr}" if count > 1 else abbr)
-
-    return ", ".join(formatted)
-
 
 # --- Ensemble ---
 class Ensemble(db.Model):
@@ -42,6 +25,12 @@ class Ensemble(db.Model):
     name = db.Column(db.String(160), nullable=False, unique=False)
     active = db.Column(db.Boolean, default=True)
 
+    # denormalized from instrumentation_entries (summary = "2Fl, Ob, Pf", signature see
+    # instrumentation_signature_for()); maintained in after_flush below
+    instrumentation_summary = db.Column(db.String(1024), nullable=True)
+    instrumentation_signature = db.Column(db.String(1024), nullable=True, index=True)
+    instrumentation_size = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
     exception_id = db.Column(db.Integer, db.ForeignKey('chamber_exceptions.id', ondelete="CASCADE"))
     exception = relationship("ChamberException", back_populates="ensemble", uselist=False)
 
@@ -98,13 +87,27 @@ class Ensemble(db.Model):
         passive_deletes=True,
     )
 
+    def _archived_links(self, model, semester_id, *order_by):
+        """
+        The ensemble's `model` rows of an archived semester. Archiving moves them out of the live
+        tables, so the relationships above come back empty for it; [] for any other semester.
+        """
+        from models.archive import semester_model
+        archived = semester_model(model, semester_id)
+        if archived is model:
+            return []
+        return (
+            archived.query
+            .filter_by(ensemble_id=self.id, semester_id=semester_id)
+            .order_by(*(getattr(archived, name) for name in order_by), archived.id)
+            .all()
+        )
+
     def repertoire_for_semester(self, semester_id):
         """Return all compositions assigned to this ensemble for the given semester."""
-        return [
-            link.composition
-            for link in self.repertoire_links
-            if link.semester_id == semester_id
-        ]
+        links = [link for link in self.repertoire_links if link.semester_id == semester_id]
+        links = links or self._archived_links(EnsembleRepertoire, semester_id)
+        return [link.composition for link in links]
 
     @property
     def semesters(self):
@@ -119,17 +122,13 @@ class Ensemble(db.Model):
         return any(link.semester_id == semester_id for link in self.semester_links)
 
     def is_in_upcoming_semester(self, current_semester: "Semester") -> bool:
-        upcoming = (
-            Semester.query
-            .filter(Semester.start_date > current_semester.end_date)
-            .order_by(Semester.start_date.asc())
-            .first()
-        )
-        return bool(upcoming) and self.is_in_semester(upcoming.id)
+        from utils.semesters import get_semester_timeline
+        upcoming_id = get_semester_timeline().next_after(current_semester.id)
+        return bool(upcoming_id) and self.is_in_semester(upcoming_id)
 
     def semester_teacher(self, semester_id):
-        teacher = EnsembleTeacher.query.filter_by(ensemble_id=self.id, semester_id=semester_id).first()
-        return teacher if teacher else None
+        links = self.semester_teacher_links(semester_id)
+        return links[0] if links else None
 
     def semester_teachers(self, semester_id):
         """
@@ -138,12 +137,13 @@ class Ensemble(db.Model):
         """
         return [
             link.teacher
-            for link in self.teacher_links
-            if link.semester_id == semester_id and link.teacher is not None
+            for link in self.semester_teacher_links(semester_id)
+            if link.teacher is not None
         ]
 
     def semester_teacher_links(self, semester_id):
-        return [link for link in self.teacher_links if link.semester_id == semester_id]
+        links = [link for link in self.teacher_links if link.semester_id == semester_id]
+        return links or self._archived_links(EnsembleTeacher, semester_id)
 
     @property
     def players(self):
@@ -155,6 +155,8 @@ class Ensemble(db.Model):
 
     @property
     def instrumentation(self):
+        if self.instrumentation_summary is not None:
+            return self.instrumentation_summary
         return format_ensemble_instrumentation(self.instrumentation_entries)
 
     @property
@@ -190,24 +192,26 @@ class Ensemble(db.Model):
     @health_check_in.expression
     def health_check_in(cls, semester_id):
         from models import Player  # make sure Player is importable from models
+        from models.archive import semester_model
+        seats = semester_model(EnsemblePlayer, semester_id)
 
         # total assigned players in given semester (player_id not null)
         total = (
-            select(func.count(EnsemblePlayer.id))
-            .where(EnsemblePlayer.ensemble_id == cls.id)
-            .where(EnsemblePlayer.semester_id == semester_id)
-            .where(EnsemblePlayer.player_id.isnot(None))
+            select(func.count(seats.id))
+            .where(seats.ensemble_id == cls.id)
+            .where(seats.semester_id == semester_id)
+            .where(seats.player_id.isnot(None))
             .correlate(cls)
             .scalar_subquery()
         )
 
         # assigned students in given semester
         student_count = (
-            select(func.count(EnsemblePlayer.id))
-            .join(Player, Player.id == EnsemblePlayer.player_id)
-            .where(EnsemblePlayer.ensemble_id == cls.id)
-            .where(EnsemblePlayer.semester_id == semester_id)
-            .where(EnsemblePlayer.player_id.isnot(None))
+            select(func.count(seats.id))
+            .join(Player, Player.id == seats.player_id)
+            .where(seats.ensemble_id == cls.id)
+            .where(seats.semester_id == semester_id)
+            .where(seats.player_id.isnot(None))
             .where(Player.student_id.isnot(None))
             .correlate(cls)
             .scalar_subquery()
@@ -250,27 +254,27 @@ class Ensemble(db.Model):
         # python-level (když máš načtené vztahy)
         if not self.instrumentation_entries:
             return False
-        for instr in self.instrumentation_entries:
-            ok = any(
-                ep.semester_id == semester_id and ep.player_id is not None
-                for ep in instr.player_links
-            )
-            if not ok:
-                return False
-        return True
+        filled = {
+            ep.ensemble_instrumentation_id
+            for ep in self.player_links_for_semester(semester_id)
+            if ep.player_id is not None
+        }
+        return all(instr.id in filled for instr in self.instrumentation_entries)
 
     @is_complete_in.expression
     def is_complete_in(cls, semester_id):
         # SQL-level: existuje slot, pro který NEEXISTUJE obsazení v daném semestru?
+        from models.archive import semester_model
+        seats = semester_model(EnsemblePlayer, semester_id)
         missing_slot_exists = (
             select(EnsembleInstrumentation.id)
             .where(EnsembleInstrumentation.ensemble_id == cls.id)
             .where(
                 ~exists(
                     select(1).where(
-                        EnsemblePlayer.ensemble_instrumentation_id == EnsembleInstrumentation.id,
-                        EnsemblePlayer.semester_id == semester_id,
-                        EnsemblePlayer.player_id.isnot(None),
+                        seats.ensemble_instrumentation_id == EnsembleInstrumentation.id,
+                        seats.semester_id == semester_id,
+                        seats.player_id.isnot(None),
                     )
                 )
             )
@@ -280,8 +284,9 @@ class Ensemble(db.Model):
         return ~exists(missing_slot_exists)
 
     def player_links_for_semester(self, semester_id: int):
-        """Return EnsemblePlayer links for one semester only."""
-        return [ep for ep in self.player_links if ep.semester_id == semester_id]
+        """Return EnsemblePlayer links (archive rows for an archived semester) for one semester only."""
+        links = [ep for ep in self.player_links if ep.semester_id == semester_id]
+        return links or self._archived_links(EnsemblePlayer, semester_id, "player_sort_key")
 
     def players_for_semester(self, semester_id: int):
         """Return Player objects for one semester only."""
@@ -373,6 +378,7 @@ class EnsembleRepertoire(db.Model):
             "ensemble_id", "composition_id", "semester_id",
             name="uq_ensemble_repertoire_per_semester"
         ),
+        db.Index("ix_ens_repertoires_ensemble_semester", "ensemble_id", "semester_id"),
     )
 
 
@@ -396,6 +402,8 @@ class EnsembleSemester(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('ensemble_id', 'semester_id', name='uq_ensemble_semester'),
+        # "ensembles of a semester" semi-joins (Ensemble.semester_links.any(semester_id == ...))
+        db.Index('ix_ens_semesters_semester_ensemble', 'semester_id', 'ensemble_id'),
     )
 
 
@@ -420,6 +428,14 @@ class EnsemblePlayer(db.Model):
             "semester_id",
             name="uq_ens_instr_semester"
         ),
+        # ordered loads of Ensemble.player_links / player_links_for_semester
+        db.Index("ix_ens_players_ensemble_sort", "ensemble_id", "player_sort_key", "id"),
+        db.Index("ix_ens_players_ensemble_semester", "ensemble_id", "semester_id", "player_id"),
+        # filled seats only: student status, workloads and "who plays where" lookups
+        db.Index(
+            "ix_ens_players_semester_player_assigned", "semester_id", "player_id",
+            postgresql_where=db.text("player_id IS NOT NULL"),
+        ),
     )
 
     player = db.relationship("Player", back_populates="ensemble_links")
@@ -427,21 +443,53 @@ class EnsemblePlayer(db.Model):
     ensemble_instrumentation = db.relationship("EnsembleInstrumentation", back_populates="player_links")
     semester = db.relationship("Semester")
 
-    @hybrid_property
-    def player_sort_key(self):
-        # Python-level: works when you access ensemble.player_links
-        return self.player.instrument.weight if self.player and self.player.instrument else 9999
+    # instrument weight of the player (9999 = no player / instrument), denormalized so that
+    # Ensemble.player_links orders by a plain column; see refresh_player_sort_keys()
+    player_sort_key = db.Column(db.Integer, nullable=False, default=9999, server_default="9999")
+
+
+def player_sort_key_expression(player_id_column):
+    """SQL for the instrument weight of a player (9999 when it has none) — the source of player_sort_key."""
+    from models import Player, Instrument
+    return func.coalesce(
+        select(Instrument.weight)
+        .join(Player, Player.instrument_id == Instrument.id)
+        .where(Player.id == player_id_column)
+        .scalar_subquery(),
+        9999,
+    )
 
-    @player_sort_key.expression
-    def player_sort_key(cls):
-        from models import Player, Instrument
-        return (
-            db.select(Instrument.weight)
-            .join(Player, Player.instrument_id == Instrument.id)
-            .where(Player.id == cls.player_id)
-            .correlate(cls)
-            .scalar_subquery()
-        )
+
+def refresh_player_sort_keys(connection, link_ids=(), ensemble_ids=(), player_ids=(), instrument_ids=()):
+    """
+    Recompute EnsemblePlayer.player_sort_key with one UPDATE for the links matching any criterion.
+    Returns {ensemble_player_id: sort_key} of the rows that changed.
+    """
+    from models import Player
+
+    table = EnsemblePlayer.__table__
+    criteria = []
+    if link_ids:
+        criteria.append(table.c.id.in_(set(link_ids)))
+    if ensemble_ids:
+        criteria.append(table.c.ensemble_id.in_(set(ensemble_ids)))
+    if player_ids:
+        criteria.append(table.c.player_id.in_(set(player_ids)))
+    if instrument_ids:
+        criteria.append(table.c.player_id.in_(
+            select(Player.id).where(Player.instrument_id.in_(set(instrument_ids)))
+        ))
+    if not criteria:
+        return {}
+
+    new_key = player_sort_key_expression(table.c.player_id)
+    rows = connection.execute(
+        update(table)
+        .where(or_(*criteria), table.c.player_sort_key.is_distinct_from(new_key))
+        .values(player_sort_key=new_key)
+        .returning(table.c.id, table.c.player_sort_key)
+    )
+    return dict(rows.all())
 
 
 class EnsembleApplication(db.Model):
@@ -492,6 +540,10 @@ class EnsembleNote(db.Model):
 
 class EnsembleTeacher(db.Model):
     __tablename__ = 'ensemble_teachers'
+    __table_args__ = (
+        db.UniqueConstraint('ensemble_id', 'semester_id', 'teacher_id', name='uq_ensemble_teacher_semester'),
+        db.Index('ix_ens_teachers_semester_teacher', 'semester_id', 'teacher_id', 'ensemble_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
 
     hour_donation = db.Column(db.Float)
@@ -502,3 +554,126 @@ class EnsembleTeacher(db.Model):
     teacher = db.relationship("Teacher", back_populates="ensemble_links")
     ensemble = db.relationship("Ensemble", back_populates="teacher_links")
     semester = db.relationship("Semester")
+
+
+def hour_donation_expression(table):
+    """The hour-donation rule: an ensemble's hour is split evenly among its teachers in the semester."""
+    return 1.0 / func.count().over(partition_by=(table.c.ensemble_id, table.c.semester_id))
+
+
+def recompute_hour_donations(connection, semester_id=None, ensemble_ids=None):
+    """
+    Re-apply the hour-donation rule with one windowed UPDATE over ensemble_teachers.
+    semester_id / ensemble_ids narrow the scope (both None = every semester).
+    Returns {ensemble_teacher_id: hour_donation} of the rows that changed.
+    """
+    table = EnsembleTeacher.__table__
+    criteria = []
+    if semester_id is not None:
+        criteria.append(table.c.semester_id == semester_id)
+    if ensemble_ids is not None:
+        if not ensemble_ids:
+            return {}
+        criteria.append(table.c.ensemble_id.in_(set(ensemble_ids)))
+
+    shares = (
+        select(table.c.id, hour_donation_expression(table).label("hour_donation"))
+        .where(*criteria)
+        .subquery()
+    )
+    rows = connection.execute(
+        update(table)
+        .where(table.c.id == shares.c.id, table.c.hour_donation.is_distinct_from(shares.c.hour_donation))
+        .values(hour_donation=shares.c.hour_donation)
+        .returning(table.c.id, table.c.hour_donation)
+    )
+    return dict(rows.all())
+
+
+def _owner_ids(obj, attr):
+    history = sa_inspect(obj).attrs[attr].history
+    return {getattr(obj, attr), *history.deleted}
+
+
+# owner model -> FK column of its instrumentation entries
+INSTRUMENTATION_OWNERS = {
+    Composition: CompositionInstrumentation.composition_id,
+    Ensemble: EnsembleInstrumentation.ensemble_id,
+    Project: ProjectInstrumentation.project_id,
+}
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_instrumentation_cache(session, flush_context):
+    """Recompute the denormalized instrumentation columns when entries or instruments changed."""
+    owner_ids = {model: set() for model in INSTRUMENTATION_OWNERS}
+    changed_instrument_ids = set()
+
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for model, column in INSTRUMENTATION_OWNERS.items():
+            if isinstance(obj, column.class_):
+                owner_ids[model] |= _owner_ids(obj, column.key)
+        if isinstance(obj, Instrument) and obj in session.dirty:
+            state = sa_inspect(obj)
+            if any(state.attrs[a].history.has_changes() for a in ("abbreviation", "name", "weight")):
+                changed_instrument_ids.add(obj.id)
+
+    if not any(owner_ids.values()) and not changed_instrument_ids:
+        return
+
+    connection = session.connection()
+
+    if changed_instrument_ids:
+        for model, column in INSTRUMENTATION_OWNERS.items():
+            owner_ids[model] |= owners_of_instruments(connection, column, changed_instrument_ids)
+
+    refreshed = {
+        model: refresh_instrumentation_cache(connection, model, INSTRUMENTATION_OWNERS[model], ids)
+        for model, ids in owner_ids.items()
+    }
+
+    # the owners were updated behind the ORM; sync loaded (and just inserted) instances
+    owners = [obj for obj in session.new if type(obj) in refreshed]
+    for model, values in refreshed.items():
+        owners.extend(
+            obj for obj in (session.identity_map.get(session.identity_key(model, oid)) for oid in values)
+            if obj is not None
+        )
+    for obj in owners:
+        for column, value in refreshed[type(obj)].get(obj.id, {}).items():
+            set_committed_value(obj, column, value)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_player_sort_keys(session, flush_context):
+    """Keep EnsemblePlayer.player_sort_key in step with the player's instrument and its weight."""
+    from models import Player
+
+    link_ids, player_ids, instrument_ids = set(), set(), set()
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, EnsemblePlayer):
+            state = sa_inspect(obj)
+            if obj in session.new or state.attrs.player_id.history.has_changes():
+                link_ids.add(obj.id)
+        elif isinstance(obj, Player) and obj in session.dirty:
+            if sa_inspect(obj).attrs.instrument_id.history.has_changes():
+                player_ids.add(obj.id)
+        elif isinstance(obj, Instrument) and obj in session.dirty:
+            if sa_inspect(obj).attrs.weight.history.has_changes():
+                instrument_ids.add(obj.id)
+
+    if not (link_ids or player_ids or instrument_ids):
+        return
+
+    changed = refresh_player_sort_keys(
+        session.connection(), link_ids=link_ids, player_ids=player_ids, instrument_ids=instrument_ids
+    )
+
+    links = [obj for obj in session.new if isinstance(obj, EnsemblePlayer)]
+    links.extend(
+        obj for obj in (session.identity_map.get(session.identity_key(EnsemblePlayer, lid)) for lid in changed)
+        if obj is not None
+    )
+    for link in links:
+        if link.id in changed:
+            set_committed_value(link, "player_sort_key", changed[link.id])
@@ -31,10 +31,15 @@ class Composer(db.Model):
         return len(self.compositions)
 
 
-def format_chamber_instrumentation(instrumentation_entries):
+def format_chamber_instrumentation(instrumentation_entries, include_doublings=False):
+    """
+    "2Fl, Ob, Pf". With include_doublings the output round-trips through
+    orchestration_parser: "2Fl (Picc, +Afl)" = last player doubles Picc, separate Afl.
+    """
     from collections import defaultdict
 
     counter = defaultdict(int)
+    doublings = defaultdict(lambda: defaultdict(int))
     order = []
 
     sorted_entries = sorted(
@@ -53,10 +58,22 @@ def format_chamber_instrumentation(instrumentation_entries):
             order.append(abbr)
         counter[abbr] += 1
 
+        if include_doublings:
+            for d in entry.doublings:
+                d_abbr = (d.doubling_instrument.abbreviation or d.doubling_instrument.name).strip()
+                doublings[abbr][("+" if d.separate else "", d_abbr)] += 1
+
     formatted = []
     for abbr in order:
         count = counter[abbr]
-        formatted.append(f"{count}{abbr}" if count > 1 else abbr)
+        text = f"{count}{abbr}" if count > 1 else abbr
+        if doublings[abbr]:
+            items = [
+                f"{sep}{n}{d_abbr}" if n > 1 else f"{sep}{d_abbr}"
+                for (sep, d_abbr), n in doublings[abbr].items()
+            ]
+            text += f" ({', '.join(items)})"
+        formatted.append(text)
 
     return ", ".join(formatted)
 
@@ -72,6 +89,13 @@ class Composition(db.Model):
     description = db.Column(db.Text)
     composer_id = db.Column(db.Integer, ForeignKey('composers.id'), nullable=False)
 
+    # denormalized from instrumentation_entries (summary = "2Fl, Ob, Pf", signature see
+    # instrumentation_signature_for()); maintained by the after_flush listener in models.ensembles
+    # and refresh_instrumentation_cache()
+    instrumentation_summary = db.Column(db.String(1024), nullable=True)
+    instrumentation_signature = db.Column(db.String(1024), nullable=True, index=True)
+    instrumentation_size = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
     composer = relationship('Composer', back_populates='compositions')
     instrumentation_entries = relationship(
         "CompositionInstrumentation",
@@ -87,6 +111,8 @@ class Composition(db.Model):
 
     @property
     def chamber_instrumentation(self):
+        if self.instrumentation_summary is not None:
+            return self.instrumentation_summary
         if not self.instrumentation_entries:
             return ""
         return format_chamber_instrumentation(self.instrumentation_entries)
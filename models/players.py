@@ -16,7 +16,7 @@ class Player(db.Model):
                            unique=True, nullable=True, index=True)
     student = relationship('Student', back_populates='player')
 
-    instrument_id = db.Column(db.Integer, db.ForeignKey('instruments.id', ondelete='SET NULL'))
+    instrument_id = db.Column(db.Integer, db.ForeignKey('instruments.id', ondelete='SET NULL'), index=True)
     instrument = relationship('Instrument')
 
     ensemble_links = db.relationship(
@@ -0,0 +1,206 @@
+from sqlalchemy import event, select, exists, func, union, or_, and_, inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models import db
+from models.ensembles import Ensemble, EnsembleSemester, EnsemblePlayer
+from models.students import StudentSubjectEnrollment, StudentChamberApplication
+from models.players import Player
+from models.archive import SemesterArchive
+
+
+class StudentSemesterStatus(db.Model):
+    """
+    Read model behind the student list filters: one row per (student, semester) the student
+    appears in. Maintained by refresh_student_semester_status() from flush events and after
+    bulk writes; `flask rebuild-student-status` rebuilds it from scratch.
+    """
+    __tablename__ = 'student_semester_status'
+
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), primary_key=True)
+
+    has_ensemble = db.Column(db.Boolean, nullable=False, default=False, server_default='false')
+    ensemble_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    has_classification = db.Column(db.Boolean, nullable=False, default=False, server_default='false')
+    has_pending_application = db.Column(db.Boolean, nullable=False, default=False, server_default='false')
+
+    __table_args__ = (
+        db.Index('ix_sss_semester_ensemble', 'semester_id', 'has_ensemble', 'student_id'),
+        db.Index('ix_sss_semester_classification', 'semester_id', 'has_classification', 'student_id'),
+        db.Index('ix_sss_semester_application', 'semester_id', 'has_pending_application', 'student_id'),
+    )
+
+
+def student_status_flag(flag, semester_ids, value=True):
+    """
+    Filter on Student: some of the semesters (None = any) has `flag` (value=True), or none has
+    (value=False). Students without a status row count as not having the flag.
+    """
+    from models.students import Student
+
+    criteria = [StudentSemesterStatus.student_id == Student.id, getattr(StudentSemesterStatus, flag).is_(True)]
+    if semester_ids is not None:
+        criteria.append(StudentSemesterStatus.semester_id.in_(semester_ids))
+    matches = exists().where(*criteria)
+    return matches if value else ~matches
+
+
+def _ensemble_count(student_id, semester_id):
+    return (
+        select(func.count(func.distinct(EnsemblePlayer.ensemble_id)))
+        .join(Player, Player.id == EnsemblePlayer.player_id)
+        .join(EnsembleSemester, and_(
+            EnsembleSemester.ensemble_id == EnsemblePlayer.ensemble_id,
+            EnsembleSemester.semester_id == EnsemblePlayer.semester_id,
+        ))
+        .where(Player.student_id == student_id, EnsemblePlayer.semester_id == semester_id)
+        .scalar_subquery()
+    )
+
+
+def refresh_student_semester_status(connection, student_ids=(), player_ids=(), ensemble_ids=(),
+                                    semester_ids=None, everything=False):
+    """
+    Recompute status rows with one INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+    Scope: students given directly, through their player, or through an ensemble they play in;
+    semester_ids narrows to those semesters (None = all). everything=True rebuilds every row
+    except those of archived semesters.
+    Returns the number of rows written.
+    """
+    student_criteria = []
+    if student_ids:
+        student_criteria.append(lambda col: col.in_(set(student_ids)))
+    if player_ids:
+        student_criteria.append(lambda col: col.in_(
+            select(Player.student_id).where(Player.id.in_(set(player_ids)), Player.student_id.isnot(None))
+        ))
+    if ensemble_ids:
+        members = (
+            select(Player.student_id)
+            .join(EnsemblePlayer, EnsemblePlayer.player_id == Player.id)
+            .where(EnsemblePlayer.ensemble_id.in_(set(ensemble_ids)), Player.student_id.isnot(None))
+        )
+        student_criteria.append(lambda col: col.in_(members))
+    if not student_criteria and not everything:
+        return 0
+
+    def scoped(stmt, student_col, semester_col):
+        if student_criteria:
+            stmt = stmt.where(or_(*(criterion(student_col) for criterion in student_criteria)))
+        if semester_ids is not None:
+            stmt = stmt.where(semester_col.in_(set(semester_ids)))
+        # archived semesters keep the rows computed before their data left the live tables
+        stmt = stmt.where(semester_col.notin_(select(SemesterArchive.semester_id)))
+        return stmt.where(student_col.isnot(None), semester_col.isnot(None))
+
+    enrollment, application, status = StudentSubjectEnrollment, StudentChamberApplication, StudentSemesterStatus
+    candidates = union(
+        scoped(select(enrollment.student_id, enrollment.semester_id), enrollment.student_id, enrollment.semester_id),
+        scoped(
+            select(Player.student_id, EnsemblePlayer.semester_id).join(Player, Player.id == EnsemblePlayer.player_id),
+            Player.student_id, EnsemblePlayer.semester_id,
+        ),
+        scoped(select(application.student_id, application.semester_id), application.student_id, application.semester_id),
+        # existing rows, so flags that went away are reset
+        scoped(select(status.student_id, status.semester_id), status.student_id, status.semester_id),
+    ).subquery()
+
+    ensemble_count = _ensemble_count(candidates.c.student_id, candidates.c.semester_id)
+    has_classification = exists().where(
+        enrollment.student_id == candidates.c.student_id,
+        enrollment.semester_id == candidates.c.semester_id,
+        enrollment.classification.isnot(None),
+    )
+    has_application = exists().where(
+        application.student_id == candidates.c.student_id,
+        application.semester_id == candidates.c.semester_id,
+    )
+
+    stmt = pg_insert(status.__table__).from_select(
+        ["student_id", "semester_id", "ensemble_count", "has_ensemble", "has_classification",
+         "has_pending_application"],
+        select(
+            candidates.c.student_id,
+            candidates.c.semester_id,
+            ensemble_count,
+            ensemble_count > 0,
+            has_classification,
+            has_application,
+        ),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "semester_id"],
+        set_={
+            column: stmt.excluded[column]
+            for column in ("ensemble_count", "has_ensemble", "has_classification", "has_pending_application")
+        },
+    )
+    return connection.execute(stmt).rowcount
+
+
+def _values(obj, attr):
+    history = sa_inspect(obj).attrs[attr].history
+    return {v for v in (getattr(obj, attr), *history.deleted) if v is not None}
+
+
+_PENDING_KEY = "student_status_pending"
+_PENDING_STUDENTS_KEY = "student_status_pending_students"
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_deleted_ensemble_members(session, flush_context, instances):
+    """Ensemble players vanish by ON DELETE CASCADE, so remember their students before the flush."""
+    deleted_students = {obj.student_id for obj in session.deleted if isinstance(obj, Player) and obj.student_id}
+    if deleted_students:
+        session.info.setdefault(_PENDING_STUDENTS_KEY, set()).update(deleted_students)
+
+    pairs = [
+        (obj.id, None) if isinstance(obj, Ensemble) else (obj.ensemble_id, obj.semester_id)
+        for obj in session.deleted
+        if isinstance(obj, (Ensemble, EnsembleSemester)) and obj.id is not None
+    ]
+    if not pairs:
+        return
+
+    criteria = [
+        EnsemblePlayer.ensemble_id == ensemble_id if semester_id is None
+        else and_(EnsemblePlayer.ensemble_id == ensemble_id, EnsemblePlayer.semester_id == semester_id)
+        for ensemble_id, semester_id in pairs
+    ]
+    rows = session.connection().execute(
+        select(Player.student_id, EnsemblePlayer.semester_id)
+        .join(Player, Player.id == EnsemblePlayer.player_id)
+        .where(or_(*criteria), Player.student_id.isnot(None))
+    ).all()
+    session.info.setdefault(_PENDING_KEY, set()).update((s, sem) for s, sem in rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_student_semester_status(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, set())
+    student_ids = {s for s, _ in pending}
+    semester_ids = {sem for _, sem in pending}
+    player_ids, ensemble_ids = set(), set()
+    all_semester_student_ids = session.info.pop(_PENDING_STUDENTS_KEY, set())
+
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (StudentSubjectEnrollment, StudentChamberApplication)):
+            student_ids |= _values(obj, "student_id")
+            semester_ids |= _values(obj, "semester_id")
+        elif isinstance(obj, EnsemblePlayer):
+            player_ids |= _values(obj, "player_id")
+            semester_ids |= _values(obj, "semester_id")
+        elif isinstance(obj, EnsembleSemester) and obj not in session.deleted:
+            ensemble_ids |= _values(obj, "ensemble_id")
+            semester_ids |= _values(obj, "semester_id")
+        elif isinstance(obj, Player) and obj in session.dirty:
+            if sa_inspect(obj).attrs.student_id.history.has_changes():
+                all_semester_student_ids |= _values(obj, "student_id")
+
+    if student_ids or player_ids or ensemble_ids:
+        refresh_student_semester_status(
+            session.connection(), student_ids=student_ids, player_ids=player_ids, ensemble_ids=ensemble_ids,
+            semester_ids=semester_ids,
+        )
+    if all_semester_student_ids:
+        refresh_student_semester_status(session.connection(), student_ids=all_semester_student_ids)
@@ -1,5 +1,9 @@
 from sqlalchemy import UniqueConstraint, Index
-from sqlalchemy.orm import relationship, object_session
+from sqlalchemy import Text, cast, func, literal_column, or_, select, union, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import relationship, object_session, Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import event, inspect as sa_inspect
 from models import db
 from models.core import Subject, Semester, Department, Instrument
 from sqlalchemy.ext.hybrid import hybrid_method
@@ -58,6 +62,11 @@ class Student(db.Model):
         order_by="desc(StudentRequest.request_date)",
     )
 
+    __table_args__ = (
+        # student list / pickers: active students in name order
+        Index('ix_students_active_name', 'last_name', 'first_name', postgresql_where=db.text('active')),
+    )
+
     enrollment_requests = relationship(
         "ChamberEnrollmentRequest",
         back_populates="student",
@@ -220,9 +229,15 @@ class StudentSubjectEnrollment(db.Model):
         UniqueConstraint('student_id', 'semester_id', 'subject_id', name='uq_student_semester_subject'),
         Index('ix_sse_subject_semester', 'subject_id', 'semester_id'),
         Index('ix_sse_student_semester', 'student_id', 'semester_id'),
+        Index('ix_sse_semester_subject_student', 'semester_id', 'subject_id', 'student_id'),
     )
 
 
+def player_fingerprint_for(player_ids):
+    """Canonical key of a player set: sorted player ids joined by commas (e.g. "3,17,42")."""
+    return ",".join(str(pid) for pid in sorted(set(player_ids)))
+
+
 class StudentChamberApplication(db.Model):
     __tablename__ = 'student_chamber_applications'
     id = db.Column(db.Integer, primary_key=True)
@@ -279,6 +294,13 @@ class StudentChamberApplication(db.Model):
         passive_deletes=True
     )
 
+    # applicant + co-player ids, see player_fingerprint_for(); kept up to date in after_flush below
+    player_fingerprint = db.Column(db.String(512), nullable=True)
+
+    __table_args__ = (
+        Index('ix_sca_semester_player_fingerprint', 'semester_id', 'player_fingerprint'),
+    )
+
     @property
     def all_player_ids(self):
         """Return a set of all player IDs (applicant + co-players)."""
@@ -293,25 +315,19 @@ class StudentChamberApplication(db.Model):
         if not session or not self.semester_id:
             return []
 
-        my_players = self.all_player_ids
+        fingerprint = self.player_fingerprint or player_fingerprint_for(self.all_player_ids)
 
-        # load other apps in same semester (excluding self)
-        candidates = (
+        return (
             session.query(StudentChamberApplication)
             .filter(
                 StudentChamberApplication.semester_id == self.semester_id,
+                StudentChamberApplication.player_fingerprint == fingerprint,
                 StudentChamberApplication.id != self.id,
             )
+            .order_by(StudentChamberApplication.id)
             .all()
         )
 
-        related = []
-        for app in candidates:
-            if app.all_player_ids == my_players:
-                related.append(app)
-
-        return related
-
     @property
     def student_count(self):
         """Applicant + co-players that are real students."""
@@ -473,6 +489,98 @@ class StudentChamberApplicationPlayers(db.Model):
     player = relationship('Player')
 
 
+def refresh_player_fingerprints(connection, application_ids=(), student_ids=()):
+    """
+    Recompute StudentChamberApplication.player_fingerprint (see player_fingerprint_for) with one
+    UPDATE for the given applications and the applications of the given students.
+    Returns {application_id: fingerprint} of the rows that changed.
+    """
+    from models.players import Player
+
+    table = StudentChamberApplication.__table__
+    applications = table.alias("fingerprint_applications")
+    links = StudentChamberApplicationPlayers.__table__
+    criteria = []
+    if application_ids:
+        criteria.append(applications.c.id.in_(set(application_ids)))
+    if student_ids:
+        criteria.append(applications.c.student_id.in_(set(student_ids)))
+    if not criteria:
+        return {}
+
+    # applicant's player + co-players, as in the e2f3a4b5c6d7 backfill
+    members = union(
+        select(applications.c.id.label("application_id"), Player.id.label("player_id"))
+        .join(Player, Player.student_id == applications.c.student_id)
+        .where(or_(*criteria)),
+        select(links.c.application_id, links.c.player_id)
+        .where(links.c.application_id.in_(select(applications.c.id).where(or_(*criteria)))),
+    ).subquery("members")
+    fingerprints = (
+        select(
+            applications.c.id,
+            func.coalesce(
+                func.string_agg(cast(members.c.player_id, Text),
+                                aggregate_order_by(literal_column("','"), members.c.player_id)),
+                "",
+            ).label("fingerprint"),
+        )
+        .select_from(applications.outerjoin(members, members.c.application_id == applications.c.id))
+        .where(or_(*criteria))
+        .group_by(applications.c.id)
+        .subquery("fingerprints")
+    )
+    rows = connection.execute(
+        update(table)
+        .where(table.c.id == fingerprints.c.id,
+               table.c.player_fingerprint.is_distinct_from(fingerprints.c.fingerprint))
+        .values(player_fingerprint=fingerprints.c.fingerprint)
+        .returning(table.c.id, table.c.player_fingerprint)
+    )
+    return dict(rows.all())
+
+
+def _ids(obj, attr):
+    history = sa_inspect(obj).attrs[attr].history
+    return {v for v in (getattr(obj, attr), *history.deleted) if v is not None}
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_player_fingerprints(session, flush_context):
+    """
+    Recompute StudentChamberApplication.player_fingerprint when its player set may have changed.
+    Runs after the flush so that players inserted in the same flush already have their ids.
+    """
+    from models.players import Player
+
+    application_ids, student_ids = set(), set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, StudentChamberApplication) and obj not in session.deleted:
+            state = sa_inspect(obj)
+            if obj in session.new or state.attrs.student_id.history.has_changes():
+                application_ids.add(obj.id)
+        elif isinstance(obj, StudentChamberApplicationPlayers):
+            application_ids |= _ids(obj, "application_id")
+        elif isinstance(obj, Player):
+            # a student's player row is the applicant part of the set
+            if obj in session.new or obj in session.deleted \
+                    or sa_inspect(obj).attrs.student_id.history.has_changes():
+                student_ids |= _ids(obj, "student_id")
+
+    if not (application_ids or student_ids):
+        return
+
+    changed = refresh_player_fingerprints(
+        session.connection(), application_ids=application_ids, student_ids=student_ids
+    )
+
+    # the applications were updated behind the ORM; sync loaded instances
+    for app_id, fingerprint in changed.items():
+        app = session.identity_map.get(session.identity_key(StudentChamberApplication, app_id))
+        if app is not None:
+            set_committed_value(app, "player_fingerprint", fingerprint)
+
+
 class StudentChamberApplicationTeacher(db.Model):
     __tablename__ = 'student_chamber_application_teachers'
     id = db.Column(db.Integer, primary_key=True)
@@ -1,15 +1,24 @@
+from collections import Counter
 from . import api_bp
 from flask import jsonify, session, abort, request, url_for
 from models import db
 from models.core import Semester
-from models.ensembles import Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleTeacher, EnsembleInstrumentation
+from models.ensembles import Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleTeacher, EnsembleInstrumentation, \
+    refresh_player_sort_keys
 from models.students import StudentSubjectEnrollment
+from models.archive import ArchivedSemesterError, is_archived
+from models.student_status import refresh_student_semester_status
 from models.players import Player
+from models.students import Student
 from models.teachers import Teacher
-from models.core import Instrument
+from models.core import Instrument, refresh_instrumentation_cache
+from sqlalchemy import insert, update, delete, func, or_, and_
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import IntegrityError
 from utils.decorators import permission_required
+from utils.semesters import get_next_semester, get_previous_semester
+from utils.filter_helpers import search_key, prefix_pattern, get_common_filters, apply_common_filters
+from utils.semester_move import load_semester_move_info, carry_over_warnings
 
 
 def _get_current_semester_or_400():
@@ -20,21 +29,11 @@ def _get_current_semester_or_400():
 
 
 def _get_upcoming_semester(current_semester: Semester):
-    return (
-        Semester.query
-        .filter(Semester.start_date > current_semester.end_date)
-        .order_by(Semester.start_date.asc())
-        .first()
-    )
+    return get_next_semester(current_semester)
 
 
 def _get_previous_semester(current_semester: Semester):
-    return (
-        Semester.query
-        .filter(Semester.end_date < current_semester.start_date)
-        .order_by(Semester.end_date.desc())
-        .first()
-    )
+    return get_previous_semester(current_semester)
 
 
 @api_bp.route('/ensemble/<int:ensemble_id>/get-semester-move-info', methods=['GET'])
@@ -44,95 +43,65 @@ def get_ensemble_semester_move_info(ensemble_id):
     current_semester = _get_current_semester_or_400()
     upcoming_semester = _get_upcoming_semester(current_semester)
 
-    if not upcoming_semester:
-        return jsonify({
-            "ensemble_id": ensemble.id,
-            "current_semester": {"id": current_semester.id, "name": current_semester.name},
-            "upcoming_semester": None,
-            "players": [],
-            "message": "No upcoming semester found."
-        }), 200
-
-    is_in_current_semester = (
-            db.session.query(EnsembleSemester.id)
-            .filter(
-                EnsembleSemester.ensemble_id == ensemble.id,
-                EnsembleSemester.semester_id == current_semester.id
-            )
-            .first()
-            is not None
-    )
+    info = load_semester_move_info([ensemble.id], current_semester, upcoming_semester)
+    return jsonify(info[ensemble.id]), 200
 
-    players = []
-    if is_in_current_semester:
-        players = (
-            db.session.query(Player)
-            .options(
-                joinedload(Player.instrument).joinedload(Instrument.instrument_section),
-                joinedload(Player.instrument).joinedload(Instrument.instrument_group),
-            )
-            .join(EnsemblePlayer, EnsemblePlayer.player_id == Player.id)
-            .filter(
-                EnsemblePlayer.ensemble_id == ensemble.id,
-                EnsemblePlayer.semester_id == current_semester.id,
-            )
-            .order_by(Player.last_name.asc(), Player.first_name.asc())
-            .all()
-        )
 
-    # Bulk-check "has any subject enrollment in upcoming semester"
-    student_ids = [p.student_id for p in players if p.student_id]
-    active_student_ids = set()
-    if student_ids:
-        active_student_ids = set(
-            r[0] for r in (
-                db.session.query(StudentSubjectEnrollment.student_id)
-                .filter(
-                    StudentSubjectEnrollment.semester_id == upcoming_semester.id,
-                    StudentSubjectEnrollment.student_id.in_(student_ids)
-                )
-                .distinct()
-                .all()
-            )
+SEMESTER_MOVE_BATCH_LIMIT = 500
+
+
+@api_bp.route('/ensembles/semester-move-info', methods=['GET'])
+@permission_required("ens_end_semester")
+def get_ensembles_semester_move_info():
+    """
+    Move-info payloads for many ensembles in one response.
+    ?ids=1,2,3 (or repeated ids=) selects ensembles explicitly; without ids the
+    rollover page's filters apply (current-semester ensembles not yet moved).
+    """
+    current_semester = _get_current_semester_or_400()
+    upcoming_semester = _get_upcoming_semester(current_semester)
+
+    raw_ids = [part for value in request.args.getlist("ids") for part in value.split(",") if part.strip()]
+    try:
+        requested_ids = [int(part) for part in raw_ids]
+    except ValueError:
+        return jsonify({"ok": False, "error": "Neplatný seznam souborů."}), 400
+
+    if requested_ids:
+        ensemble_ids = [
+            r[0] for r in db.session.query(Ensemble.id).filter(Ensemble.id.in_(requested_ids)).order_by(Ensemble.id)
+        ]
+    else:
+        query = db.session.query(Ensemble.id).filter(
+            Ensemble.semester_links.any(EnsembleSemester.semester_id == current_semester.id)
         )
+        if upcoming_semester:
+            query = query.filter(~Ensemble.semester_links.any(EnsembleSemester.semester_id == upcoming_semester.id))
+        query = apply_common_filters(query, get_common_filters(), current_semester.id)
+        ensemble_ids = [r[0] for r in query.order_by(Ensemble.id).limit(SEMESTER_MOVE_BATCH_LIMIT + 1)]
 
-    payload_players = []
-    for p in players:
-        instr = p.instrument
-        payload_players.append({
-            "player_id": p.id,
-            "full_name": p.full_name,
-            "is_guest": p.is_guest,
-            "student_id": p.student_id,
-
-            "instrument": None if not instr else {
-                "id": instr.id,
-                "name": instr.name,
-                "name_en": instr.name_en,
-                "abbr": instr.abbreviation,
-                "normalized_abbr": instr.normalized_abbr,
-                "section": None if not instr.instrument_section else {
-                    "id": instr.instrument_section.id,
-                    "name": instr.instrument_section.name,
-                },
-                "group": None if not instr.instrument_group else {
-                    "id": instr.instrument_group.id,
-                    "name": instr.instrument_group.name,
-                },
-            },
-
-            "has_active_subject_in_upcoming_semester": bool(
-                p.student_id and p.student_id in active_student_ids
-            ),
-        })
+    if len(ensemble_ids) > SEMESTER_MOVE_BATCH_LIMIT:
+        return jsonify({
+            "ok": False,
+            "error": f"Najednou lze načíst nejvýše {SEMESTER_MOVE_BATCH_LIMIT} souborů.",
+        }), 400
 
-    return jsonify({
-        "ensemble_id": ensemble.id,
+    info = load_semester_move_info(ensemble_ids, current_semester, upcoming_semester)
+    for payload in info.values():
+        payload["warnings"] = carry_over_warnings(payload)
+
+    response = jsonify({
+        "ok": True,
         "current_semester": {"id": current_semester.id, "name": current_semester.name},
-        "upcoming_semester": {"id": upcoming_semester.id, "name": upcoming_semester.name},
-        "ensemble_is_in_current_semester": is_in_current_semester,
-        "players": payload_players
-    }), 200
+        "upcoming_semester": (
+            {"id": upcoming_semester.id, "name": upcoming_semester.name} if upcoming_semester else None
+        ),
+        "ensembles": {str(ensemble_id): payload for ensemble_id, payload in info.items()},
+    })
+    # revalidate every time; an unchanged preview costs a 304 instead of the payload
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @api_bp.route('/ensemble/<int:ensemble_id>/deactivate', methods=['POST'])
@@ -430,3 +399,339 @@ def api_ensemble_update(ensemble_id):
             "detail_url": detail_url,
         }
     }), 200
+
+
+# ---------------------------------------------------------
+# BULK SLOT ASSIGNMENT
+# ---------------------------------------------------------
+
+def _parse_optional_int(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _assignment_map(ensemble_id: int, semester_id: int):
+    rows = db.session.execute(
+        db.select(EnsemblePlayer.ensemble_instrumentation_id, EnsemblePlayer.player_id)
+        .where(
+            EnsemblePlayer.ensemble_id == ensemble_id,
+            EnsemblePlayer.semester_id == semester_id,
+            EnsemblePlayer.ensemble_instrumentation_id.isnot(None),
+        )
+    ).all()
+    return {str(slot_id): player_id for slot_id, player_id in rows}
+
+
+@api_bp.route("/ensembles/<int:ensemble_id>/assignments", methods=["GET"])
+@permission_required("ens_player_assign")
+def api_ensemble_assignments(ensemble_id):
+    ensemble = Ensemble.query.get_or_404(ensemble_id)
+    semester_id = request.args.get("semester_id", type=int) or _get_current_semester_or_400().id
+
+    return jsonify({
+        "ok": True,
+        "ensemble_id": ensemble.id,
+        "semester_id": semester_id,
+        "assignments": _assignment_map(ensemble.id, semester_id),
+    }), 200
+
+
+@api_bp.route("/ensembles/<int:ensemble_id>/assignments", methods=["PUT"])
+@permission_required("ens_player_assign")
+def api_ensemble_assignments_replace(ensemble_id):
+    """
+    Replace the whole slot -> player map of an ensemble for one semester.
+
+    Body:
+        {
+          "semester_id": 12,                      # optional, defaults to the browsed semester
+          "assignments": {"101": 55, "102": null}, # slot id -> player id (null = empty slot)
+          "new_slots": [{"instrument_id": 7, "player_id": 60}]   # optional, appended slots
+        }
+
+    Slots missing from "assignments" lose their row for that semester; a player may hold one slot only.
+    Everything is validated against one prefetched snapshot before anything is written,
+    then applied as batched DELETE / UPDATE / INSERT statements in a single commit.
+    """
+    ensemble = Ensemble.query.get_or_404(ensemble_id)
+    data = request.get_json(silent=True) or {}
+
+    raw_assignments = data.get("assignments")
+    raw_new_slots = data.get("new_slots") or []
+    if not isinstance(raw_assignments, dict) or not isinstance(raw_new_slots, list):
+        return jsonify({"ok": False, "error": "Neplatný formát požadavku."}), 400
+
+    try:
+        semester_id = _parse_optional_int(data.get("semester_id"))
+        assignments = {int(k): _parse_optional_int(v) for k, v in raw_assignments.items()}
+        new_slots = [
+            (int(s["instrument_id"]), _parse_optional_int(s.get("player_id")))
+            for s in raw_new_slots
+        ]
+    except (TypeError, ValueError, KeyError):
+        return jsonify({"ok": False, "error": "Neplatný formát požadavku."}), 400
+
+    semester = db.session.get(Semester, semester_id) if semester_id else _get_current_semester_or_400()
+    if not semester:
+        return jsonify({"ok": False, "error": "Semestr neexistuje."}), 404
+    # core statements below bypass the flush guard
+    if is_archived(semester.id):
+        return jsonify({"ok": False, "error": str(ArchivedSemesterError())}), 409
+
+    # --- snapshot ---
+    slots = dict(
+        db.session.execute(
+            db.select(EnsembleInstrumentation.id, EnsembleInstrumentation.position)
+            .where(EnsembleInstrumentation.ensemble_id == ensemble.id)
+        ).all()
+    )
+    existing = {
+        slot_id: (ep_id, player_id)
+        for ep_id, slot_id, player_id in db.session.execute(
+            db.select(EnsemblePlayer.id, EnsemblePlayer.ensemble_instrumentation_id, EnsemblePlayer.player_id)
+            .where(
+                EnsemblePlayer.ensemble_id == ensemble.id,
+                EnsemblePlayer.semester_id == semester.id,
+                EnsemblePlayer.ensemble_instrumentation_id.isnot(None),
+            )
+        ).all()
+    }
+
+    player_ids = {pid for pid in assignments.values() if pid} | {pid for _, pid in new_slots if pid}
+    known_players = set(
+        db.session.scalars(db.select(Player.id).where(Player.id.in_(player_ids)))
+    ) if player_ids else set()
+
+    instrument_ids = {iid for iid, _ in new_slots}
+    known_instruments = set(
+        db.session.scalars(db.select(Instrument.id).where(Instrument.id.in_(instrument_ids)))
+    ) if instrument_ids else set()
+
+    is_linked = db.session.query(EnsembleSemester.id).filter(
+        EnsembleSemester.ensemble_id == ensemble.id,
+        EnsembleSemester.semester_id == semester.id,
+    ).first() is not None
+
+    # --- validation ---
+    errors = []
+    for slot_id in sorted(set(assignments) - set(slots)):
+        errors.append(f"Pozice {slot_id} nepatří do tohoto souboru.")
+    for pid in sorted(player_ids - known_players):
+        errors.append(f"Hráč {pid} neexistuje.")
+    placed = Counter(pid for pid in [*assignments.values(), *(pid for _, pid in new_slots)] if pid)
+    for pid in sorted(pid for pid, count in placed.items() if count > 1):
+        errors.append(f"Hráč {pid} je přiřazen na více pozic.")
+    for iid in sorted(instrument_ids - known_instruments):
+        errors.append(f"Nástroj {iid} neexistuje.")
+    if errors:
+        return jsonify({"ok": False, "error": "Obsazení nebylo uloženo.", "errors": errors}), 400
+
+    # --- diff ---
+    to_delete = [ep_id for slot_id, (ep_id, _) in existing.items() if slot_id not in assignments]
+    to_update = [
+        {"id": existing[slot_id][0], "player_id": player_id}
+        for slot_id, player_id in assignments.items()
+        if slot_id in existing and existing[slot_id][1] != player_id
+    ]
+    to_insert = [
+        {
+            "ensemble_id": ensemble.id,
+            "semester_id": semester.id,
+            "ensemble_instrumentation_id": slot_id,
+            "player_id": player_id,
+        }
+        for slot_id, player_id in assignments.items()
+        if slot_id not in existing
+    ]
+
+    created_slot_ids = []
+    try:
+        # deletes first so a slot never holds two rows for the semester (uq_ens_instr_semester)
+        if to_delete:
+            db.session.execute(delete(EnsemblePlayer).where(EnsemblePlayer.id.in_(to_delete)))
+        if to_update:
+            db.session.execute(update(EnsemblePlayer), to_update)
+
+        if new_slots:
+            next_position = max((p or 0 for p in slots.values()), default=0) + 1
+            created_slot_ids = list(db.session.scalars(
+                insert(EnsembleInstrumentation).returning(
+                    EnsembleInstrumentation.id, sort_by_parameter_order=True
+                ),
+                [
+                    {"ensemble_id": ensemble.id, "instrument_id": iid, "position": next_position + i}
+                    for i, (iid, _) in enumerate(new_slots)
+                ],
+            ))
+            to_insert.extend(
+                {
+                    "ensemble_id": ensemble.id,
+                    "semester_id": semester.id,
+                    "ensemble_instrumentation_id": slot_id,
+                    "player_id": player_id,
+                }
+                for slot_id, (_, player_id) in zip(created_slot_ids, new_slots)
+            )
+            refresh_instrumentation_cache(
+                db.session.connection(), Ensemble, EnsembleInstrumentation.ensemble_id, [ensemble.id]
+            )
+
+        if to_insert:
+            db.session.execute(insert(EnsemblePlayer), to_insert)
+        if to_insert or to_update:
+            refresh_player_sort_keys(db.session.connection(), ensemble_ids=[ensemble.id])
+        if to_insert or to_update or to_delete:
+            # previous occupants plus everyone placed, in existing and in new slots alike
+            touched_players = {player_id for _, player_id in existing.values()} | player_ids
+            refresh_student_semester_status(
+                db.session.connection(), player_ids=touched_players - {None}, semester_ids=[semester.id]
+            )
+
+        if not is_linked:
+            db.session.add(EnsembleSemester(ensemble_id=ensemble.id, semester_id=semester.id))
+
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({
+            "ok": False,
+            "error": "Obsazení bylo mezitím změněno jiným uživatelem. Načtěte stránku znovu.",
+        }), 409
+
+    return jsonify({
+        "ok": True,
+        "ensemble_id": ensemble.id,
+        "semester_id": semester.id,
+        "inserted": len(to_insert),
+        "updated": len(to_update),
+        "deleted": len(to_delete),
+        "created_slot_ids": created_slot_ids,
+        "linked_semester": not is_linked,
+        "assignments": _assignment_map(ensemble.id, semester.id),
+    }), 200
+
+
+# ---------------------------------------------------------
+# PLAYER CANDIDATE SEARCH (Tom Select remote loading)
+# ---------------------------------------------------------
+
+CANDIDATES_PER_PAGE = 20
+
+
+@api_bp.route("/ensembles/<int:ensemble_id>/slots/<int:slot_id>/candidates", methods=["GET"])
+@permission_required("ens_player_assign")
+def api_slot_candidates(ensemble_id, slot_id):
+    """
+    Players that can fill a slot: same instrument as the slot, not yet assigned to this
+    ensemble in the semester. mode=student (active, enrolled in the semester) | guest | all.
+    Name search is a prefix match per word over last/first name (accent-insensitive).
+    """
+    slot = db.session.get(EnsembleInstrumentation, slot_id)
+    if not slot or slot.ensemble_id != ensemble_id:
+        return jsonify({"ok": False, "error": "Neplatná pozice obsazení."}), 404
+
+    semester_id = request.args.get("semester_id", type=int) or _get_current_semester_or_400().id
+    mode = request.args.get("mode", "student")
+    terms = request.args.get("q", "").split()
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", CANDIDATES_PER_PAGE, type=int), 1), 100)
+
+    last_name = func.coalesce(Student.last_name, Player.last_name)
+    first_name = func.coalesce(Student.first_name, Player.first_name)
+
+    already_assigned = (
+        db.select(EnsemblePlayer.id)
+        .where(
+            EnsemblePlayer.player_id == Player.id,
+            EnsemblePlayer.ensemble_id == ensemble_id,
+            EnsemblePlayer.semester_id == semester_id,
+        )
+        .exists()
+    )
+
+    query = (
+        db.session.query(Player.id, Player.student_id, last_name, first_name, Instrument.name)
+        .outerjoin(Student, Student.id == Player.student_id)
+        .outerjoin(Instrument, Instrument.id == Player.instrument_id)
+        .filter(Player.instrument_id == slot.instrument_id)
+        .filter(~already_assigned)
+    )
+
+    if mode == "student":
+        enrolled = (
+            db.select(StudentSubjectEnrollment.id)
+            .where(
+                StudentSubjectEnrollment.student_id == Student.id,
+                StudentSubjectEnrollment.semester_id == semester_id,
+            )
+            .exists()
+        )
+        query = query.filter(Player.student_id.isnot(None), Student.active.is_(True), enrolled)
+    elif mode == "guest":
+        query = query.filter(Player.student_id.is_(None))
+
+    for term in terms:
+        pattern = prefix_pattern(term)
+        query = query.filter(or_(
+            search_key(Student.last_name).like(pattern),
+            search_key(Student.first_name).like(pattern),
+            and_(Player.student_id.is_(None), search_key(Player.last_name).like(pattern)),
+            and_(Player.student_id.is_(None), search_key(Player.first_name).like(pattern)),
+        ))
+
+    rows = (
+        query.order_by(last_name, first_name, Player.id)
+        .offset((page - 1) * per_page)
+        .limit(per_page + 1)
+        .all()
+    )
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    # workload + Erasmus for the page only: one grouped query each
+    player_ids = [r[0] for r in rows]
+    student_ids = [r[1] for r in rows if r[1]]
+
+    ensemble_counts = dict(
+        db.session.query(EnsemblePlayer.player_id, func.count(func.distinct(EnsemblePlayer.ensemble_id)))
+        .join(EnsembleSemester, and_(
+            EnsembleSemester.ensemble_id == EnsemblePlayer.ensemble_id,
+            EnsembleSemester.semester_id == semester_id,
+        ))
+        .filter(EnsemblePlayer.player_id.in_(player_ids), EnsemblePlayer.semester_id == semester_id)
+        .group_by(EnsemblePlayer.player_id)
+        .all()
+    ) if player_ids else {}
+
+    erasmus_ids = set(
+        sid for (sid,) in db.session.query(StudentSubjectEnrollment.student_id).filter(
+            StudentSubjectEnrollment.student_id.in_(student_ids),
+            StudentSubjectEnrollment.semester_id == semester_id,
+            StudentSubjectEnrollment.erasmus.is_(True),
+        ).distinct()
+    ) if student_ids else set()
+
+    items = [
+        {
+            "id": player_id,
+            "text": f"{last} {first}",
+            "instrument": instrument_name,
+            "is_guest": student_id is None,
+            "ensemble_count": ensemble_counts.get(player_id, 0),
+            "erasmus": student_id in erasmus_ids,
+            # Erasmus students cannot be assigned (same rule as the former list page)
+            "disabled": student_id in erasmus_ids,
+        }
+        for player_id, student_id, last, first, instrument_name in rows
+    ]
+
+    response = jsonify({
+        "ok": True,
+        "items": items,
+        "page": page,
+        "next_page": page + 1 if has_more else None,
+    })
+    response.headers["Cache-Control"] = "private, max-age=30"
+    response.add_etag()
+    return response.make_conditional(request)
@@ -1,4 +1,4 @@
-from flask import render_template, request, flash, redirect, url_for, session
+from flask import render_template, request, flash, redirect, url_for, session, jsonify
 from utils.nav import navlink
 from utils.decorators import permission_required
 from modules.chamber_applications import chamber_applications_bp
@@ -8,7 +8,8 @@ from models import db, Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleInstr
 from .forms import StudentChamberApplicationForm, EmptyForm, ExceptionRequestForm
 from flask_login import current_user
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_, func
+from sqlalchemy import or_, func, update
+from utils.batch_approval import approve_applications_batch, summarize_report
 import unicodedata
 from datetime import datetime
 
@@ -383,26 +384,73 @@ def reject(application_id):
     return redirect(url_for("chamber_applications.detail", application_id=application_id))
 
 
+@chamber_applications_bp.route("/approve-batch", methods=["POST"])
+@permission_required('app_approvals')
+def approve_batch():
+    """Approve selected applications (or all pending ones in the browsed semester) in one transaction."""
+    data = request.get_json(silent=True) or {}
+    application_ids = data.get("application_ids") or request.form.getlist("application_ids", type=int)
+    comment = data.get("comment") or request.form.get("comment") or None
+
+    if not application_ids:
+        application_ids = [
+            app_id for (app_id,) in db.session.query(StudentChamberApplication.id).filter(
+                StudentChamberApplication.status_id == 1,
+                StudentChamberApplication.semester_id == session.get("semester_id"),
+            ).order_by(StudentChamberApplication.id)
+        ]
+
+    try:
+        report = approve_applications_batch(application_ids, current_user, comment)
+    except ValueError as e:
+        if request.is_json:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        flash(str(e), "danger")
+        return redirect(url_for("chamber_applications.index"))
+
+    counts = summarize_report(report)
+    if request.is_json:
+        return jsonify({"ok": counts["error"] == 0, "summary": counts, "results": report}), 200
+
+    flash(
+        f"Schváleno žádostí: {counts['approved']}, přeskočeno: {counts['skipped']}, chyby: {counts['error']}.",
+        "success" if not counts["error"] else "warning",
+    )
+    for row in report:
+        if row["status"] == "error":
+            flash(f"Žádost č. {row['id']}: {row['message']}", "danger")
+    return redirect(url_for("chamber_applications.index"))
+
+
 @chamber_applications_bp.route("/reject-all", methods=["POST"])
 @permission_required('app_decline_all_unresolved')
 def reject_all():
     current_semester = Semester.query.get(session.get("semester_id"))
-    apps = StudentChamberApplication.query.filter_by(status_id=1, semester_id=current_semester.id).all()
-
     rejected_status = get_status_by_code("rejected")
 
     reason = "[SYSTÉM] Hromadné zamítnutí zbývajících žádostí. Student již byl přiřazen do komorního souboru"
 
-    for a in apps:
-        a.status = rejected_status
-        a.reviewed_by = current_user
-        a.reviewed_at = datetime.now()
-        a.review_comment = reason
+    # one UPDATE ... RETURNING instead of loading and flushing every application
+    rejected_ids = db.session.scalars(
+        update(StudentChamberApplication)
+        .where(
+            StudentChamberApplication.status_id == 1,
+            StudentChamberApplication.semester_id == current_semester.id,
+        )
+        .values(
+            status_id=rejected_status.id,
+            reviewed_by_id=current_user.id,
+            reviewed_at=datetime.now(),
+            review_comment=reason,
+        )
+        .returning(StudentChamberApplication.id)
+        .execution_options(synchronize_session=False)
+    ).all()
 
     db.session.commit()
 
     flash(
-        f"Žádosti {[a.id for a in apps]} byly zamítnuty.",
+        f"Žádosti {sorted(rejected_ids)} byly zamítnuty.",
         "warning"
     )
     return redirect(url_for("chamber_applications.index"))
@@ -1,4 +1,4 @@
-from flask import render_template, request, flash, redirect, url_for, session
+from flask import render_template, request, flash, redirect, url_for, session, jsonify
 from flask_login import current_user
 from utils.nav import navlink
 from utils.decorators import permission_required
@@ -9,6 +9,7 @@ from models import (
 )
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
+from utils.batch_approval import approve_enrollment_requests_batch, summarize_report
 
 
 @chamber_enrollment_requests_bp.route("/")
@@ -177,6 +178,49 @@ def approve(request_id):
     return redirect(url_for("chamber_enrollment_requests.detail", request_id=request_id))
 
 
+@chamber_enrollment_requests_bp.route("/approve-batch", methods=["POST"])
+@permission_required("cer_can_edit")
+def approve_batch():
+    """
+    Approve many pending requests into one target semester.
+    Takes explicit request_ids, otherwise every pending request of the filtered semester.
+    """
+    data = request.get_json(silent=True) or {}
+    target_semester_id = data.get("target_semester_id") or request.form.get("target_semester_id", type=int)
+    request_ids = data.get("request_ids") or request.form.getlist("request_ids", type=int)
+    semester_id = data.get("semester_id") or request.form.get("semester_id", type=int)
+    comment = (data.get("comment") or request.form.get("comment", "")).strip() or None
+
+    target_semester = db.session.get(Semester, target_semester_id) if target_semester_id else None
+    if not target_semester:
+        if request.is_json:
+            return jsonify({"ok": False, "error": "Chybí cílový semestr."}), 400
+        flash("Vyberte cílový semestr.", "danger")
+        return redirect(url_for("chamber_enrollment_requests.index", semester_id=semester_id, status="pending"))
+
+    if request_ids:
+        criteria = [ChamberEnrollmentRequest.id.in_(request_ids)]
+    else:
+        criteria = [ChamberEnrollmentRequest.status == "pending"]
+        if semester_id:
+            criteria.append(ChamberEnrollmentRequest.semester_id == semester_id)
+
+    report = approve_enrollment_requests_batch(criteria, target_semester, current_user, comment)
+    counts = summarize_report(report)
+
+    if request.is_json:
+        return jsonify({"ok": counts["error"] == 0, "summary": counts, "results": report}), 200
+
+    flash(
+        f"Schváleno přihlášek: {counts['approved']}, přeskočeno: {counts['skipped']}, chyby: {counts['error']}.",
+        "success" if not counts["error"] else "warning",
+    )
+    for row in report:
+        if row["status"] == "error":
+            flash(f"Přihláška č. {row['id']}: {row['message']}", "danger")
+    return redirect(url_for("chamber_enrollment_requests.index", semester_id=semester_id))
+
+
 @chamber_enrollment_requests_bp.route("/<int:request_id>/reject", methods=["POST"])
 @permission_required("cer_can_edit")
 def reject(request_id):
@@ -1,4 +1,4 @@
-from flask import flash, redirect, url_for, jsonify, render_template, request, session
+from flask import flash, redirect, url_for, jsonify, render_template, request, session, abort
 from flask_login import current_user
 from .forms import EnsembleForm, TeacherForm, NoteForm, TakeOverForm
 from utils.nav import navlink
@@ -9,14 +9,23 @@ from . import ensemble_bp
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 from models import EnsembleInstrumentation, EnsemblePlayer
+from models.ensembles import recompute_hour_donations
+from models.archive import is_archived, semester_model
 from utils.decorators import permission_required
-from sqlalchemy import or_, func, select
-from utils.export_helpers import render_pdf, build_ensemble_semester_pdf_maps
+from sqlalchemy import or_, func, select, case
+from utils.export_helpers import render_pdf, ensemble_table_query
+from utils.tabular_export import tabular_response, xlsx_available, EXPORT_FORMATS, YIELD_PER
 from utils.filter_helpers import get_common_filters, apply_common_filters
 from utils.session_helpers import get_or_set_current_semester, get_or_set_current_semester_id, \
     get_or_set_previous_semester_id
 from sqlalchemy.orm import joinedload
 from utils.return_to import remember_return_to, get_return_to
+from utils.semesters import get_next_semester, get_previous_semester
+from utils.teacher_carryover import carry_over_teachers, continuing_ensemble_ids
+from utils.semester_snapshot import load_semester_snapshot
+from utils.read_models import filtered_ensemble_ids, load_ensemble_rows, teacher_rows, teacher_name_key, \
+    teacher_department_key
+from utils.repertoire import match_compositions, MATCH_KINDS, MATCH_EXACT, MATCH_SUBSET, MATCH_SUPERSET, MATCH_LABELS
 
 
 @ensemble_bp.route("/all")
@@ -25,53 +34,61 @@ def index():
     remember_return_to("ens_return_to", "ensemble.index")
     current_semester_id = get_or_set_current_semester_id()
     current_semester = Semester.query.get_or_404(current_semester_id)
-    upcoming_semester = (
-        Semester.query
-        .filter(Semester.start_date > current_semester.end_date)
-        .order_by(Semester.start_date.asc())
-        .first()
-    )
+    upcoming_semester = get_next_semester(current_semester)
 
     has_upcoming_semester = upcoming_semester is not None
 
     page = request.args.get("page", 1, type=int)
     per_page = 20
 
-    # --- Collect and apply filters (shared helper) ---
+    # --- Collect filters and sorting ---
     filters = get_common_filters()
-    ensembles = db.session.query(Ensemble).filter(
-        Ensemble.semester_links.any(EnsembleSemester.semester_id == current_semester_id)
-    )
-    ensembles = apply_common_filters(ensembles, filters, current_semester_id)
-
-    # --- Sorting ---
     sort_by = request.args.get("sort_by", "name")
     sort_order = request.args.get("sort_order", "asc")
 
-    if sort_by == "name":
-        order_column = Ensemble.name
-    elif sort_by == "teacher":
-        # Sort by first teacher’s last name for the semester
-        order_column = func.lower(
-            select(Teacher.last_name)
-            .join(EnsembleTeacher)
-            .where(
-                EnsembleTeacher.ensemble_id == Ensemble.id,
-                EnsembleTeacher.semester_id == current_semester_id,
-            )
-            .limit(1)
-            .correlate(Ensemble)
-            .scalar_subquery()
+    # A closed semester with a snapshot is filtered and sorted from it; the page of
+    # Ensembles is then loaded in that order and its rows render from the snapshot.
+    snapshot = load_semester_snapshot(current_semester_id)
+    semester_rows = None
+    if snapshot:
+        rows = snapshot.sort_ensembles(snapshot.filter_ensembles(filters), sort_by, sort_order == "desc")
+        semester_rows = {row.id: row for row in rows}
+        ensembles = db.session.query(Ensemble).filter(Ensemble.id.in_(list(semester_rows)))
+        order_column = (
+            case({ensemble_id: position for position, ensemble_id in enumerate(semester_rows)}, value=Ensemble.id)
+            if semester_rows else Ensemble.name
         )
-    elif sort_by == "health":
-        order_column = Ensemble.health_check_in(current_semester_id)
-    elif sort_by == "complete":
-        order_column = Ensemble.is_complete_in(current_semester_id)
     else:
-        order_column = Ensemble.name
+        ensembles = db.session.query(Ensemble).filter(
+            Ensemble.semester_links.any(EnsembleSemester.semester_id == current_semester_id)
+        )
+        ensembles = apply_common_filters(ensembles, filters, current_semester_id)
+
+        if sort_by == "name":
+            order_column = Ensemble.name
+        elif sort_by == "teacher":
+            # Sort by first teacher’s last name for the semester
+            teacher_links = semester_model(EnsembleTeacher, current_semester_id)
+            order_column = func.lower(
+                select(Teacher.last_name)
+                .join(teacher_links, teacher_links.teacher_id == Teacher.id)
+                .where(
+                    teacher_links.ensemble_id == Ensemble.id,
+                    teacher_links.semester_id == current_semester_id,
+                )
+                .limit(1)
+                .correlate(Ensemble)
+                .scalar_subquery()
+            )
+        elif sort_by == "health":
+            order_column = Ensemble.health_check_in(current_semester_id)
+        elif sort_by == "complete":
+            order_column = Ensemble.is_complete_in(current_semester_id)
+        else:
+            order_column = Ensemble.name
 
-    if sort_order == "desc":
-        order_column = order_column.desc()
+        if sort_order == "desc":
+            order_column = order_column.desc()
 
     # --- Pagination ---
     pagination = (
@@ -79,11 +96,15 @@ def index():
         .paginate(page=page, per_page=per_page, error_out=False)
     )
     ensembles = pagination.items
+    if semester_rows is None and is_archived(current_semester_id):
+        # the relationships the rows render from only see the live tables
+        semester_rows = {row.id: row for row in load_ensemble_rows(current_semester_id, [e.id for e in ensembles])}
 
     # --- Render ---
     return render_template(
         "all_ensembles.html",
         ensembles=ensembles,
+        semester_rows=semester_rows,
         pagination=pagination,
         instruments=Instrument.query.order_by(Instrument.weight)
         .filter_by(is_primary=True)
@@ -111,19 +132,7 @@ def end_semester():
     current_semester_id = get_or_set_current_semester_id()
     current_semester = Semester.query.get_or_404(current_semester_id)
 
-    upcoming_semester = (
-        Semester.query
-        .filter(Semester.start_date > current_semester.end_date)
-        .order_by(Semester.start_date.asc())
-        .first()
-    )
-
-    upcoming_semester = (
-        Semester.query
-        .filter(Semester.start_date > current_semester.end_date)
-        .order_by(Semester.start_date.asc())
-        .first()
-    )
+    upcoming_semester = get_next_semester(current_semester)
     if not upcoming_semester:
         flash("Není dostupný nadcházející semestr.", "warning")
         return redirect(url_for("ensemble.index"))
@@ -204,18 +213,20 @@ def end_semester():
     )
 
 
+def _export_ensembles(semester_id, filters):
+    """EnsembleRows of the filtered list: from the semester's snapshot when it has one."""
+    snapshot = load_semester_snapshot(semester_id)
+    if snapshot:
+        return snapshot.filter_ensembles(filters)
+    return load_ensemble_rows(semester_id, filtered_ensemble_ids(semester_id, filters))
+
+
 @ensemble_bp.route("/all/pdf")
 @permission_required('ens_export_pdf')
 def export_pdf():
     current_semester_id = get_or_set_current_semester_id()
     filters = get_common_filters()
-
-    # Base query
-    ensembles = db.session.query(Ensemble).filter(
-        Ensemble.semester_links.any(EnsembleSemester.semester_id == current_semester_id)
-    )
-    ensembles = apply_common_filters(ensembles, filters, current_semester_id)
-    ensembles = ensembles.order_by(Ensemble.name).all()
+    ensembles = _export_ensembles(current_semester_id, filters)
 
     # --- Enrich filters with human-readable labels ---
     # (resolve IDs into names for the PDF header)
@@ -244,20 +255,10 @@ def export_pdf():
     else:
         filters["department_names"] = []
 
-    # Prepare context
-    ensemble_ids = [e.id for e in ensembles]
-    maps = build_ensemble_semester_pdf_maps(ensemble_ids, current_semester_id)
-
     context = {
         "ensembles": ensembles,
         "current_semester": Semester.query.get(current_semester_id),
         "filters": filters,
-
-        # ✅ NEW context vars
-        "player_links_by_ensemble": maps["player_links_by_ensemble"],
-        "student_count_by_ensemble": maps["student_count_by_ensemble"],
-        "external_count_by_ensemble": maps["external_count_by_ensemble"],
-        "teachers_by_ensemble": maps["teachers_by_ensemble"],
     }
 
     return render_pdf("pdf_export/all_ensembles.html", context, "SKH_KomorniSoubory_vse")
@@ -269,114 +270,61 @@ def export_pdf_by_teacher():
     current_semester_id = get_or_set_current_semester_id()
     filters = get_common_filters()
 
-    # Teachers that have at least one EnsembleTeacher record in current semester
-    teachers = (
-        Teacher.query.join(EnsembleTeacher)
-        .filter(EnsembleTeacher.semester_id == current_semester_id)
-        .distinct()
-    )
-    if filters["teacher_ids"]:
-        teachers = teachers.filter(Teacher.id.in_(filters["teacher_ids"]))
-    if filters["department_ids"]:
-        teachers = teachers.filter(Teacher.department_id.in_(filters["department_ids"]))
-    teachers = teachers.order_by(Teacher.last_name, Teacher.first_name).all()
-
-    filtered_teachers = []
-    for teacher in teachers:
-        # 1) Get ensembles for this teacher in this semester (already filtered by your filters)
-        q = (
-            db.session.query(Ensemble)
-            .join(EnsembleTeacher)
-            .filter(
-                EnsembleTeacher.semester_id == current_semester_id,
-                EnsembleTeacher.teacher_id == teacher.id,
-            )
-        )
-        q = apply_common_filters(q, filters, current_semester_id)
-        ensembles = q.order_by(Ensemble.name).all()
-
-        if not ensembles:
-            continue
-
-        # 2) Load the actual EnsembleTeacher rows (so we keep hour_donation)
-        teacher_rows = (
-            db.session.query(EnsembleTeacher)
-            .options(joinedload(EnsembleTeacher.ensemble))
-            .filter(
-                EnsembleTeacher.semester_id == current_semester_id,
-                EnsembleTeacher.teacher_id == teacher.id,
-                EnsembleTeacher.ensemble_id.in_([e.id for e in ensembles]),
-            )
-            .order_by(EnsembleTeacher.ensemble_id.asc())
-            .all()
-        )
-
-        teacher.pdf_rows = teacher_rows
-        filtered_teachers.append(teacher)
+    teachers = sorted(teacher_rows(_export_ensembles(current_semester_id, filters), filters), key=teacher_name_key)
 
     return render_pdf(
         "pdf_export/ensemble_by_teacher.html",
         {
-            "teachers": filtered_teachers,
+            "teachers": teachers,
             "current_semester": Semester.query.get(current_semester_id),
         },
         "SKH_KomorniSoubory_dle_pedagogu",
     )
 
 
-@ensemble_bp.route("/teacher-hours/pdf")
+@ensemble_bp.route("/all/export.<fmt>")
 @permission_required('ens_export_pdf')
-def export_pdf_teacher_hours():
+def export_table(fmt):
+    """Streaming CSV / XLSX of the filtered ensemble list (same filters as the index)."""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    if fmt == "xlsx" and not xlsx_available():
+        flash("Export do XLSX není dostupný (chybí balíček openpyxl).", "warning")
+        return redirect(url_for("ensemble.index", **request.args))
+
     current_semester_id = get_or_set_current_semester_id()
     filters = get_common_filters()
 
-    teachers = (
-        Teacher.query.join(EnsembleTeacher)
-        .filter(EnsembleTeacher.semester_id == current_semester_id)
-        .distinct()
-    )
-
-    if filters["teacher_ids"]:
-        teachers = teachers.filter(Teacher.id.in_(filters["teacher_ids"]))
-    if filters["department_ids"]:
-        teachers = teachers.filter(Teacher.department_id.in_(filters["department_ids"]))
-
-    teachers = teachers.order_by(Teacher.department_id, Teacher.last_name, Teacher.first_name).all()
-
-    filtered_teachers = []
-    for teacher in teachers:
-        # 1) Filter ensembles for this teacher + semester using your existing filter logic
-        q = (
-            db.session.query(Ensemble)
-            .join(EnsembleTeacher)
-            .filter(
-                EnsembleTeacher.semester_id == current_semester_id,
-                EnsembleTeacher.teacher_id == teacher.id,
-            )
+    snapshot = load_semester_snapshot(current_semester_id)
+    if snapshot:
+        rows = (
+            (e.name, e.instrumentation, ", ".join(t.full_name for t in e.teachers), e.student_count, e.guest_count,
+             e.health)
+            for e in snapshot.filter_ensembles(filters)
         )
-        q = apply_common_filters(q, filters, current_semester_id)
-        ensembles = q.order_by(Ensemble.name).all()
+    else:
+        rows = ensemble_table_query(current_semester_id, filters).yield_per(YIELD_PER)
+
+    return tabular_response(
+        fmt,
+        "SKH_KomorniSoubory",
+        ["Soubor", "Obsazení", "Pedagogové", "Studenti", "Hosté", "Stav"],
+        rows,
+        sheet_title="Soubory",
+    )
 
-        if not ensembles:
-            continue
 
-        # 2) Load actual EnsembleTeacher rows for those ensembles (so we keep hour_donation)
-        teacher_rows = (
-            db.session.query(EnsembleTeacher)
-            .options(joinedload(EnsembleTeacher.ensemble))
-            .filter(
-                EnsembleTeacher.semester_id == current_semester_id,
-                EnsembleTeacher.teacher_id == teacher.id,
-                EnsembleTeacher.ensemble_id.in_([e.id for e in ensembles]),
-            )
-            .order_by(EnsembleTeacher.ensemble_id.asc())
-            .all()
-        )
+@ensemble_bp.route("/teacher-hours/pdf")
+@permission_required('ens_export_pdf')
+def export_pdf_teacher_hours():
+    current_semester_id = get_or_set_current_semester_id()
+    filters = get_common_filters()
 
-        teacher.pdf_rows = teacher_rows
-        filtered_teachers.append(teacher)
+    filtered_teachers = sorted(
+        teacher_rows(_export_ensembles(current_semester_id, filters), filters), key=teacher_department_key
+    )
 
-    # Group teachers by department (unchanged, but now teachers carry pdf_rows)
+    # Group teachers by department
     grouped = {}
     for t in filtered_teachers:
         dept = t.department.name if t.department else "Neurčeno"
@@ -462,47 +410,24 @@ def ensemble_detail(ensemble_id):
     )
 
     # --- 2) Assignments in current semester (may have player_id NULL = empty slot) ---
+    seats = semester_model(EnsemblePlayer, current_semester_id)
     assignments = (
-        EnsemblePlayer.query
+        seats.query
         .filter(
-            EnsemblePlayer.ensemble_id == ensemble.id,
-            EnsemblePlayer.semester_id == current_semester_id,
-            EnsemblePlayer.ensemble_instrumentation_id.isnot(None),
+            seats.ensemble_id == ensemble.id,
+            seats.semester_id == current_semester_id,
+            seats.ensemble_instrumentation_id.isnot(None),
         )
         .options(
-            selectinload(EnsemblePlayer.player).selectinload(Player.student),
-            selectinload(EnsemblePlayer.player).selectinload(Player.instrument),
+            selectinload(seats.player).selectinload(Player.student),
+            selectinload(seats.player).selectinload(Player.instrument),
         )
         .all()
     )
 
     assignment_by_instr = {a.ensemble_instrumentation_id: a for a in assignments}
 
-    # --- 3) Available students (exclude those already assigned here THIS semester) ---
-    assigned_player_ids_sq = (
-        db.session.query(EnsemblePlayer.player_id)
-        .filter(
-            EnsemblePlayer.ensemble_id == ensemble.id,
-            EnsemblePlayer.semester_id == current_semester_id,
-            EnsemblePlayer.player_id.isnot(None),
-        )
-        .subquery()
-    )
-
-    available_students = (
-        db.session.query(Student)
-        .outerjoin(Player, Player.student_id == Student.id)
-        .options(selectinload(Student.instrument), selectinload(Student.player))
-        .filter(Student.active.is_(True))
-        .filter(
-            or_(
-                Player.id.is_(None),
-                ~Player.id.in_(select(assigned_player_ids_sq))
-            )
-        )
-        .order_by(Student.last_name, Student.first_name)
-        .all()
-    )
+    # --- 3) Player candidates are searched on demand (api.api_slot_candidates) ---
 
     available_instruments = (
         Instrument.query
@@ -526,7 +451,6 @@ def ensemble_detail(ensemble_id):
         ensemble=ensemble,
         instrumentations=instrumentations,
         assignment_by_instr=assignment_by_instr,
-        available_students=available_students,
         available_instruments=available_instruments,
         teacher_form=teacher_form,
         note_form=note_form,
@@ -542,12 +466,7 @@ from sqlalchemy.exc import IntegrityError
 
 
 def _get_previous_semester(semester: Semester):
-    return (
-        Semester.query
-        .filter(Semester.end_date < semester.start_date)
-        .order_by(Semester.end_date.desc())
-        .first()
-    )
+    return get_previous_semester(semester)
 
 
 @ensemble_bp.route("/<int:ensemble_id>/takeover_teachers/target/<int:semester_id>", methods=["POST"])
@@ -561,59 +480,77 @@ def takeover_teachers_previous_semester(ensemble_id, semester_id):
         flash("Neexistuje předchozí semestr, ze kterého by šlo pedagogy převzít.", "warning")
         return redirect(url_for("ensemble.ensemble_detail", ensemble_id=ensemble_id))
 
-    # sanity: if someone calls target=current but you want to allow it, keep it;
-    # if you want to block weird cases, do it here.
-
-    source_links = (
-        EnsembleTeacher.query
-        .filter_by(ensemble_id=ensemble_id, semester_id=source_semester.id)
-        .all()
-    )
-
-    if not source_links:
-        flash("V předchozím semestru nejsou žádní pedagogové k převzetí.", "warning")
+    try:
+        report = carry_over_teachers(source_semester, target_semester, [ensemble_id])
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        flash(f"Došlo k chybě při ukládání: {e}", "danger")
         return redirect(url_for("ensemble.ensemble_detail", ensemble_id=ensemble_id))
 
-    existing_teacher_ids = set(
-        t_id for (t_id,) in (
-            db.session.query(EnsembleTeacher.teacher_id)
-            .filter_by(ensemble_id=ensemble_id, semester_id=target_semester.id)
-            .all()
+    if report.created:
+        flash(
+            f"Pedagogové byli převzati ze semestru {source_semester.name} do {target_semester.name} ({report.created}×).",
+            "success"
         )
-        if t_id is not None
-    )
+    elif not db.session.query(
+        semester_model(EnsembleTeacher, source_semester.id).query
+        .filter_by(ensemble_id=ensemble_id, semester_id=source_semester.id).exists()
+    ).scalar():
+        flash("V předchozím semestru nejsou žádní pedagogové k převzetí.", "warning")
+    else:
+        flash("Všichni pedagogové už jsou v cílovém semestru přiřazeni.", "info")
 
-    created = 0
-    for ta in source_links:
-        if not ta.teacher_id:
-            continue
-        if ta.teacher_id in existing_teacher_ids:
-            continue
+    return redirect(url_for("ensemble.ensemble_detail", ensemble_id=ensemble_id))
 
-        db.session.add(EnsembleTeacher(
-            ensemble_id=ensemble_id,
-            teacher_id=ta.teacher_id,
-            semester_id=target_semester.id,
-            hour_donation=ta.hour_donation,  # copy donation too
-        ))
-        created += 1
+
+@ensemble_bp.route("/takeover_teachers/bulk", methods=["POST"])
+@permission_required("ens_teacher_assign")
+def takeover_teachers_bulk():
+    """
+    Carry teachers over from the previous semester for every ensemble of the current
+    semester matching the list filters (query string). dry_run=1 only reports the diff.
+    """
+    target_semester = get_or_set_current_semester()
+    source_semester = _get_previous_semester(target_semester)
+    wants_json = request.accept_mimetypes.best == "application/json"
+    dry_run = request.form.get("dry_run", request.args.get("dry_run", "")) in ("1", "true", "on")
+
+    if not source_semester:
+        message = "Neexistuje předchozí semestr, ze kterého by šlo pedagogy převzít."
+        if wants_json:
+            return jsonify({"ok": False, "error": message}), 400
+        flash(message, "warning")
+        return redirect(url_for("ensemble.index", **request.args))
+
+    query = apply_common_filters(db.session.query(Ensemble), get_common_filters(), target_semester.id)
+    ensemble_ids = continuing_ensemble_ids(target_semester, query)
 
     try:
-        db.session.commit()
+        report = carry_over_teachers(source_semester, target_semester, ensemble_ids, dry_run=dry_run)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
     except IntegrityError as e:
         db.session.rollback()
-        flash(f"Došlo k chybě při ukládání: {e}", "danger")
-        return redirect(url_for("ensemble.ensemble_detail", ensemble_id=ensemble_id))
+        if wants_json:
+            return jsonify({"ok": False, "error": f"Došlo k chybě při ukládání: {e.orig}"}), 409
+        flash(f"Došlo k chybě při ukládání: {e.orig}", "danger")
+        return redirect(url_for("ensemble.index", **request.args))
+
+    if wants_json:
+        return jsonify({"ok": True, "report": report.as_dict()})
 
-    if created:
+    if report.created:
         flash(
-            f"Pedagogové byli převzati ze semestru {source_semester.name} do {target_semester.name} ({created}×).",
+            f"Pedagogové byli převzati ze semestru {source_semester.name} do {target_semester.name} "
+            f"({report.created}× u {len(report.additions)} souborů).",
             "success"
         )
     else:
         flash("Všichni pedagogové už jsou v cílovém semestru přiřazeni.", "info")
-
-    return redirect(url_for("ensemble.ensemble_detail", ensemble_id=ensemble_id))
+    return redirect(url_for("ensemble.index", **request.args))
 
 
 def _get_or_create_player_for_student(student):
@@ -662,35 +599,12 @@ def add_player_to_ensemble(ensemble_id, ensemble_instrumentation_id, mode="stude
     current_semester = get_or_set_current_semester()
 
     if request.method == "GET":
-        if mode == "student":
-            available_players = (
-                db.session.query(Player)
-                .join(Student, Player.student)  # only players linked to students
-                .join(StudentSubjectEnrollment, StudentSubjectEnrollment.student_id == Student.id)
-                .filter(Student.active.is_(True))
-                .filter(Player.instrument_id == instrumentation.instrument_id)
-                .filter(StudentSubjectEnrollment.semester_id == current_semester.id)
-                .options(
-                    selectinload(Player.instrument),
-                    selectinload(Player.student).selectinload(Student.instrument),
-                )
-                .order_by(Student.last_name, Student.first_name)
-                .all()
-            )
-        else:
-            available_players = (
-                db.session.query(Player)
-                .filter(Player.student_id.is_(None))
-                .filter(Player.instrument_id == instrumentation.instrument_id)
-                .options(selectinload(Player.instrument))
-                .all()
-            )
-
+        # candidates are loaded page by page from api.api_slot_candidates (Tom Select remote load)
         return render_template(
             "ensemble_add_player.html",
             ensemble=ensemble,
             instrumentation=instrumentation,
-            available_players=available_players
+            mode=mode,
         )
 
     # POST
@@ -933,18 +847,6 @@ def ensemble_delete(ensemble_id):
     return redirect(url_for("ensemble.index"))
 
 
-def count_hour_donation_for_semester(ensemble_id: int, semester_id: int) -> float:
-    cnt = (
-        db.session.query(func.count(EnsembleTeacher.id))
-        .filter(
-            EnsembleTeacher.ensemble_id == ensemble_id,
-            EnsembleTeacher.semester_id == semester_id
-        )
-        .scalar()
-    )
-    return (1 / cnt) if cnt else 0.0
-
-
 @ensemble_bp.route("/<int:ensemble_id>/teacher/assign", methods=["POST"])
 @permission_required('ens_teacher_assign')
 def ensemble_assign_teacher(ensemble_id):
@@ -977,15 +879,7 @@ def ensemble_assign_teacher(ensemble_id):
         db.session.flush()
 
         # Recompute donation ONLY for current semester links
-        links_current = (
-            EnsembleTeacher.query
-            .filter_by(ensemble_id=ensemble.id, semester_id=current_semester.id)
-            .all()
-        )
-
-        donation = 1 / len(links_current) if links_current else 0.0
-        for link in links_current:
-            link.hour_donation = donation
+        recompute_hour_donations(db.session.connection(), semester_id=current_semester.id, ensemble_ids=[ensemble.id])
 
         db.session.commit()
         flash("Pedagog byl úspěšně přiřazen k souboru", "success")
@@ -1005,15 +899,7 @@ def ensemble_remove_teacher(assignment_id):
     db.session.flush()
 
     # Recompute donation ONLY for the same semester as the removed assignment
-    links_remaining = (
-        EnsembleTeacher.query
-        .filter_by(ensemble_id=ensemble_id, semester_id=semester_id)
-        .all()
-    )
-
-    donation = 1 / len(links_remaining) if links_remaining else 0.0
-    for link in links_remaining:
-        link.hour_donation = donation
+    recompute_hour_donations(db.session.connection(), semester_id=semester_id, ensemble_ids=[ensemble_id])
 
     db.session.commit()
     flash("Pedagog byl úspěšně odebrán ze souboru", "success")
@@ -1049,6 +935,16 @@ def delete_note(ensemble_id, note_id):
     return redirect(url_for("ensemble.ensemble_detail", ensemble_id=ensemble_id))
 
 
+REPERTOIRE_PER_PAGE = 25
+REPERTOIRE_MODES = {
+    "fit": ("Vhodné pro soubor", MATCH_KINDS),
+    MATCH_EXACT: ("Přesná shoda", (MATCH_EXACT,)),
+    MATCH_SUBSET: ("Menší obsazení", (MATCH_SUBSET,)),
+    MATCH_SUPERSET: ("Větší obsazení", (MATCH_SUPERSET,)),
+    "catalogue": ("Celý katalog", ()),
+}
+
+
 @ensemble_bp.route("/<int:ensemble_id>/add_composition", methods=["GET", "POST"])
 @permission_required('ens_edit')
 def add_composition_to_ensemble(ensemble_id):
@@ -1079,24 +975,43 @@ def add_composition_to_ensemble(ensemble_id):
     # === Filtering ===
     q = request.args.get("q", "").strip()
     instrument_filter = request.args.getlist("instrument_ids", type=int)
-
-    query = Composition.query.join(Composer).outerjoin(CompositionInstrumentation)
-
-    if q:
-        ilike = f"%{q}%"
-        query = query.filter(
-            db.or_(
-                Composition.name.ilike(ilike),
-                Composer.first_name.ilike(ilike),
-                Composer.last_name.ilike(ilike),
+    page = request.args.get("page", 1, type=int)
+    tolerance = max(0, min(request.args.get("tolerance", 1, type=int), 10))
+
+    # repertoire matching against the ensemble's slots; whole catalogue when it has none
+    default_mode = "fit" if ensemble.instrumentation_signature else "catalogue"
+    mode = request.args.get("mode", default_mode)
+    if mode not in REPERTOIRE_MODES:
+        mode = default_mode
+
+    if mode == "catalogue":
+        query = Composition.query.join(Composer).options(joinedload(Composition.composer))
+
+        if q:
+            ilike = f"%{q}%"
+            query = query.filter(
+                db.or_(
+                    Composition.name.ilike(ilike),
+                    Composer.first_name.ilike(ilike),
+                    Composer.last_name.ilike(ilike),
+                )
             )
-        )
 
-    if instrument_filter:
-        query = query.filter(CompositionInstrumentation.instrument_id.in_(instrument_filter))
+        if instrument_filter:
+            query = query.filter(Composition.instrumentation_entries.any(
+                CompositionInstrumentation.instrument_id.in_(instrument_filter)
+            ))
 
-    query = query.order_by(Composer.last_name, Composition.name)
-    available_compositions = query.all()
+        pagination = query.order_by(Composer.last_name, Composition.name).paginate(
+            page=page, per_page=REPERTOIRE_PER_PAGE, error_out=False
+        )
+        available_compositions = [(c, None) for c in pagination.items]
+    else:
+        pagination = match_compositions(
+            ensemble, tolerance=tolerance, kinds=REPERTOIRE_MODES[mode][1], q=q,
+            instrument_filter=instrument_filter, page=page, per_page=REPERTOIRE_PER_PAGE,
+        )
+        available_compositions = pagination.items
 
     instruments = Instrument.query.order_by(Instrument.weight).all()
 
@@ -1105,9 +1020,15 @@ def add_composition_to_ensemble(ensemble_id):
         ensemble=ensemble,
         current_semester=current_semester,
         available_compositions=available_compositions,
+        pagination=pagination,
         instruments=instruments,
+        instrument_names={i.id: i.abbreviation or i.name for i in instruments},
         q=q,
         instrument_filter=instrument_filter,
+        mode=mode,
+        modes=REPERTOIRE_MODES,
+        tolerance=tolerance,
+        match_labels=MATCH_LABELS,
     )
 
 
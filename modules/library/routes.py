@@ -1,10 +1,14 @@
-from flask import render_template, request, flash, redirect, url_for
+from flask import render_template, request, flash, redirect, url_for, jsonify
 from .forms import CompositionForm, ComposerForm, CompositionFilterForm
 from utils.nav import navlink
 from modules.library import library_bp
-from models import Composition, Composer
+from models import Composition, Composer, ArchivedEnsembleRepertoire
+from models.library import format_chamber_instrumentation
 from models import db
 from orchestration_parser import process_chamber_instrumentation_line
+from utils.decorators import permission_required
+from utils.library_import import import_library, detect_format
+import io
 
 
 @library_bp.route("/composers")
@@ -149,9 +153,15 @@ def composition_detail(composition_id):
     from itertools import groupby
     from operator import attrgetter
 
+    # live links plus those of archived semesters
+    repertoire_links = [
+        *composition.ensemble_links,
+        *ArchivedEnsembleRepertoire.query.filter_by(composition_id=composition.id),
+    ]
+
     # Sort by ensemble + semester (newest first)
     links_sorted = sorted(
-        composition.ensemble_links,
+        repertoire_links,
         key=lambda l: (l.ensemble_id, l.semester.start_date if l.semester else None),
         reverse=True
     )
@@ -165,6 +175,7 @@ def composition_detail(composition_id):
     return render_template(
         "composition_detail.html",
         composition=composition,
+        repertoire_links=repertoire_links,
         latest_links=latest_links
     )
 
@@ -191,7 +202,9 @@ def composition_edit(composition_id):
 
     # For GET requests, populate the form with existing data
     if not form.is_submitted():
-        form.instrumentation.data = composition.chamber_instrumentation
+        form.instrumentation.data = format_chamber_instrumentation(
+            composition.instrumentation_entries, include_doublings=True
+        )
 
     return render_template("composition_form.html", form=form, composition=composition)
 
@@ -210,3 +223,40 @@ def composition_delete(composition_id):
     except Exception as e:
         flash(f"Vyskytla se chyba: {e}", "danger")
         return redirect(url_for("library.compositions"))
+
+
+@library_bp.route("/import", methods=["GET", "POST"])
+@permission_required("lib_import")
+def library_import():
+    """Upload a CSV / JSON / JSON Lines catalogue; the file is streamed, not loaded into memory."""
+    if request.method == "GET":
+        return render_template("library_import.html", report=None)
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Vyberte soubor s katalogem.", "danger")
+        return redirect(url_for("library.library_import"))
+
+    fmt = request.form.get("format") or detect_format(upload.filename)
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+
+    try:
+        report = import_library(
+            stream,
+            fmt,
+            create_composers=bool(request.form.get("create_composers")),
+            dry_run=bool(request.form.get("dry_run")),
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f"Soubor se nepodařilo načíst: {e}", "danger")
+        return redirect(url_for("library.library_import"))
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"ok": not report.errors, "report": report.as_dict()})
+
+    flash(
+        f"Importováno skladeb: {report.created_compositions}, duplicit: {report.duplicates}, "
+        f"chyb: {len(report.errors)}.",
+        "success" if not report.errors else "warning",
+    )
+    return render_template("library_import.html", report=report, dry_run=bool(request.form.get("dry_run")))
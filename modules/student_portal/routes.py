@@ -3,11 +3,13 @@ from flask_login import current_user
 from modules.student_portal import student_portal_bp
 from modules.student_portal.forms import ChamberEnrollmentRequestForm
 from models import (
-    Semester, StudentSemesterEnrollment,
-    EnsemblePlayer, EnsembleTeacher, Player,
+    Semester, StudentSemesterEnrollment, StudentSubjectEnrollment,
+    Player,
     ChamberEnrollmentRequest, ChamberEnrollmentRequestPlayer, db,
 )
-from utils.session_helpers import get_or_set_current_semester
+from utils.session_helpers import get_or_set_current_semester, get_upcoming_semester
+from utils.portal_loader import load_student_portal, cached_fragment
+from models.archive import semester_model
 from datetime import date
 
 
@@ -41,28 +43,21 @@ def dashboard():
     else:
         semester = get_or_set_current_semester()
 
-    ensembles = student.ensembles_for_semester(semester.id) if semester else []
-
-    enrollments = [
-        e for e in student.subject_enrollments
-        if semester and e.semester_id == semester.id
-    ]
-
-    # Players and teachers per ensemble for this semester
-    ensemble_details = {}
-    for ensemble in ensembles:
-        ensemble_details[ensemble.id] = {
-            "players": (
-                EnsemblePlayer.query
-                .filter_by(ensemble_id=ensemble.id, semester_id=semester.id)
-                .all()
-            ),
-            "teachers": (
-                EnsembleTeacher.query
-                .filter_by(ensemble_id=ensemble.id, semester_id=semester.id)
-                .all()
-            ),
-        }
+    # archived semesters keep their enrollments in the archive table
+    enrollments = []
+    if semester:
+        enrollment_model = semester_model(StudentSubjectEnrollment, semester.id)
+        enrollments = enrollment_model.query.filter_by(student_id=student.id, semester_id=semester.id).all()
+
+    # Ensembles with co-players and teachers: fixed number of queries, rendered card cached
+    semester_key = semester.id if semester else None
+    ensembles_html = cached_fragment(
+        ("student", student.id, semester_key),
+        lambda: render_template(
+            "partials/_student_ensembles.html",
+            portal_ensembles=load_student_portal(student, semester_key),
+        ),
+    )
 
     enrollment_request = ChamberEnrollmentRequest.query.filter_by(
         student_id=student.id,
@@ -74,9 +69,8 @@ def dashboard():
         student=student,
         semester=semester,
         student_semesters=student_semesters,
-        ensembles=ensembles,
         enrollments=enrollments,
-        ensemble_details=ensemble_details,
+        ensembles_html=ensembles_html,
         enrollment_request=enrollment_request,
     )
 
@@ -104,9 +98,7 @@ def chamber_enrollment():
     current_ensembles = student.ensembles_for_semester(current_semester.id) if current_semester else []
 
     # 2. Query the UPCOMING semester globally to safely cross academic year boundaries
-    upcoming_semester = Semester.query.filter(
-        Semester.start_date > date.today()
-    ).order_by(Semester.start_date.asc()).first()
+    upcoming_semester = get_upcoming_semester()
 
     form = ChamberEnrollmentRequestForm()
     form.stay_ensemble.query_factory = lambda: current_ensembles
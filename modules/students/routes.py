@@ -1,23 +1,47 @@
-from flask import render_template, flash, redirect, url_for, session, request
+from flask import render_template, flash, redirect, url_for, session, request, abort, jsonify
 from utils.nav import navlink
-from models import Student, StudentSubjectEnrollment, Instrument, Subject, Player, EnsemblePlayer, Ensemble, \
-    EnsembleSemester, db, Semester, Department, StudentChamberApplication, StudentChamberApplicationStatus
+from models import Student, StudentSubjectEnrollment, Instrument, Subject, db, Semester, Department, \
+    StudentChamberApplication, StudentChamberApplicationStatus
 from modules.students import students_bp
 from sqlalchemy import and_, func, exists
 from .forms import EnrollmentForm
 from utils.decorators import role_required, permission_required
 from utils.session_helpers import get_or_set_current_semester
+from models.student_status import student_status_flag
+from utils.student_list import load_student_list_rows
+from utils.grading import apply_grades, grades_from_payload, ensemble_enrollment_ids, subject_enrollment_ids
+from models.archive import ARCHIVE_MODELS, is_archived, semester_model
+from utils.tabular_export import tabular_response, xlsx_available, EXPORT_FORMATS, YIELD_PER
 from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from datetime import date
 
 
-@students_bp.route("/", methods=["GET"])
-@navlink("Studenti", group="Lidé", weight=100)
-@permission_required("st_can_view")
-def index():
-    page = request.args.get("page", 1, type=int)
-    per_page = 20
+def _enrolled(semester_ids, subject_ids):
+    """
+    EXISTS an enrollment in one of the semesters (any semester when none are given) and one of
+    the subjects; archived semesters are looked up in the archive table.
+    """
+    if semester_ids:
+        by_model = {}
+        for sid in semester_ids:
+            by_model.setdefault(semester_model(StudentSubjectEnrollment, sid), []).append(sid)
+    else:
+        by_model = {StudentSubjectEnrollment: None, ARCHIVE_MODELS[StudentSubjectEnrollment]: None}
+
+    clauses = []
+    for model, sids in by_model.items():
+        criteria = [model.student_id == Student.id]
+        if sids:
+            criteria.append(model.semester_id.in_(sids))
+        if subject_ids:
+            criteria.append(model.subject_id.in_(subject_ids))
+        clauses.append(exists().where(*criteria))
+    return or_(*clauses)
+
 
+def _filtered_students_query():
+    """Student query filtered by the list's request args; shared by the index and the exports."""
     # --- Semester handling ---
     semester_ids = request.args.getlist("semester_id", type=int)
     semester_all = request.args.get("semester_all") == "1"
@@ -36,13 +60,7 @@ def index():
     subject_ids = request.args.getlist("subject_id", type=int)
 
     if semester_ids or subject_ids:
-        query = query.join(StudentSubjectEnrollment)
-
-        if semester_ids:
-            query = query.filter(StudentSubjectEnrollment.semester_id.in_(semester_ids))
-
-        if subject_ids:
-            query = query.filter(StudentSubjectEnrollment.subject_id.in_(subject_ids))
+        query = query.filter(_enrolled(semester_ids, subject_ids))
 
     # --- Search filter (by first_name OR last_name) ---
     search_query = request.args.get("q", "").strip()
@@ -60,89 +78,110 @@ def index():
     if department_ids:
         query = query.filter(Student.department_id.in_(department_ids))
 
-    # --- Classification filters ---
-    has_classification = request.args.get("has_classification")
+    # --- Status filters (precomputed per student and semester, see models.student_status) ---
+    status_semester_ids = semester_ids or None
 
-    if has_classification in ("0", "1") and semester_ids:
-        classification_exists = (
-            db.session.query(StudentSubjectEnrollment.id)
-            .filter(StudentSubjectEnrollment.student_id == Student.id)
-            .filter(StudentSubjectEnrollment.semester_id.in_(semester_ids))
-            .filter(StudentSubjectEnrollment.classification.isnot(None))
-            .correlate(Student)
-            .exists()
+    has_classification = request.args.get("has_classification")
+    if has_classification in ("0", "1"):
+        query = query.filter(
+            student_status_flag("has_classification", status_semester_ids, has_classification == "1")
         )
 
-        if has_classification == "1":
-            query = query.filter(classification_exists)
-        else:
-            query = query.filter(~classification_exists)
-
-    # --- Ensemble filter ---
     has_ensemble = request.args.get("has_ensemble")
     if has_ensemble in ("0", "1"):
-        query = query.outerjoin(Player, Student.player).outerjoin(
-            EnsemblePlayer, Player.id == EnsemblePlayer.player_id
-        ).outerjoin(
-            Ensemble, Ensemble.id == EnsemblePlayer.ensemble_id
-        ).outerjoin(
-            EnsembleSemester, Ensemble.id == EnsembleSemester.ensemble_id
-        )
+        query = query.filter(student_status_flag("has_ensemble", status_semester_ids, has_ensemble == "1"))
 
-        if has_ensemble == "1":
-            query = query.filter(EnsembleSemester.semester_id.in_(semester_ids))
-        else:  # has_ensemble == "0"
-            # students with no ensembles in the selected semester(s)
-            query = query.filter(
-                ~Student.id.in_(
-                    db.session.query(Student.id)
-                    .join(Player)
-                    .join(EnsemblePlayer)
-                    .join(Ensemble)
-                    .join(EnsembleSemester)
-                    .filter(EnsembleSemester.semester_id.in_(semester_ids))
-                )
-            )
-
-    # --- Chamber application filter ---
+    # --- Chamber application filter (always the current semester) ---
     has_pending_application = request.args.get("has_pending_application")
     if has_pending_application in ("0", "1"):
         current_semester = get_or_set_current_semester()
-        subq = (
-            db.session.query(StudentChamberApplication.id)
-            .filter(StudentChamberApplication.student_id == Student.id)
-            .filter(StudentChamberApplication.semester_id == current_semester.id)
-            .correlate(Student)
-        )
-        app_exists = subq.exists()
-        if has_pending_application == "1":
-            query = query.filter(app_exists)
-        else:
-            query = query.filter(~app_exists)
+        query = query.filter(student_status_flag(
+            "has_pending_application", [current_semester.id], has_pending_application == "1"
+        ))
+
+    selected = {
+        "semester_ids": semester_ids,
+        "instrument_ids": instrument_ids,
+        "subject_ids": subject_ids,
+        "has_ensemble": has_ensemble,
+        "department_ids": department_ids,
+        "search_query": search_query,
+        "has_classification": has_classification,
+        "has_pending_application": has_pending_application,
+    }
+    return query, selected
+
+
+@students_bp.route("/", methods=["GET"])
+@navlink("Studenti", group="Lidé", weight=100)
+@permission_required("st_can_view")
+def index():
+    page = request.args.get("page", 1, type=int)
+    per_page = 20
+
+    query, selected = _filtered_students_query()
 
     # --- Sort by name ---
     query = query.order_by(Student.last_name, Student.first_name)
 
     # --- Pagination ---
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = query.options(joinedload(Student.instrument)).paginate(page=page, per_page=per_page, error_out=False)
+
+    # --- Per-row semester data: one query per kind for the whole page ---
+    current_semester = get_or_set_current_semester()
+    student_rows = load_student_list_rows(pagination.items, current_semester.id if current_semester else None)
 
     # --- Render ---
     return render_template(
         "all_students.html",
         students=pagination.items,
+        student_rows=student_rows,
         pagination=pagination,
         subjects=Subject.query.order_by(Subject.weight).all(),
         instruments=Instrument.query.filter_by(is_primary=True).order_by(Instrument.weight).all(),
         semesters=Semester.query.order_by(Semester.start_date.desc()).all(),
         departments=Department.query.order_by(Department.name).all(),
-        selected_semester_ids=semester_ids,
-        selected_instrument_ids=instrument_ids,
-        selected_subject_ids=subject_ids,
-        selected_has_ensemble=has_ensemble,
-        selected_department_ids=department_ids,
-        search_query=search_query,
-        selected_has_classification=has_classification,
-        selected_has_pending_application=has_pending_application,
+        selected_semester_ids=selected["semester_ids"],
+        selected_instrument_ids=selected["instrument_ids"],
+        selected_subject_ids=selected["subject_ids"],
+        selected_has_ensemble=selected["has_ensemble"],
+        selected_department_ids=selected["department_ids"],
+        search_query=selected["search_query"],
+        selected_has_classification=selected["has_classification"],
+        selected_has_pending_application=selected["has_pending_application"],
+    )
+
+
+@students_bp.route("/export.<fmt>", methods=["GET"])
+@permission_required("st_can_view")
+def export_table(fmt):
+    """Streaming CSV / XLSX of the filtered student list (same filters as the index)."""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    if fmt == "xlsx" and not xlsx_available():
+        flash("Export do XLSX není dostupný (chybí balíček openpyxl).", "warning")
+        return redirect(url_for("students.index", **request.args))
+
+    query, _ = _filtered_students_query()
+    rows = (
+        query
+        .outerjoin(Instrument, Instrument.id == Student.instrument_id)
+        .outerjoin(Department, Department.id == Student.department_id)
+        .with_entities(
+            Student.last_name, Student.first_name, Student.osobni_cislo,
+            Instrument.name, Department.name, Student.email, Student.phone_number,
+        )
+        .distinct()
+        .order_by(Student.last_name, Student.first_name, Student.osobni_cislo)
+        .yield_per(YIELD_PER)
+    )
+
+    return tabular_response(
+        fmt,
+        "SKH_Studenti",
+        ["Příjmení", "Jméno", "Osobní číslo", "Hlavní nástroj", "Katedra", "E-mail", "Telefon"],
+        rows,
+        sheet_title="Studenti",
     )
 
 
@@ -230,3 +269,40 @@ def clear_classification(student_id):
 
     flash("Klasifikace byla odstraněna.", "success")
     return redirect(request.referrer or url_for("students.index"))
+
+
+@students_bp.route("/classify/batch", methods=["POST"])
+@permission_required("st_can_classify")
+def classify_batch():
+    """
+    Grade many enrollments at once. JSON body:
+    {"ensemble_id": 5} or {"subject_id": 3}, optional "semester_id" (default: current),
+    and "grades": {enrollment_id: {"classification", "basis", "date"}}.
+    """
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"ok": False, "error": "Neplatný požadavek."}), 400
+    semester_id = payload.get("semester_id") or session.get("semester_id")
+    if not semester_id:
+        return jsonify({"ok": False, "error": "Není vybrán semestr."}), 400
+    if is_archived(semester_id):
+        return jsonify({"ok": False, "error": "Semestr je archivován, klasifikaci nelze měnit."}), 400
+
+    if payload.get("ensemble_id"):
+        scope = ensemble_enrollment_ids(payload["ensemble_id"], semester_id)
+    elif payload.get("subject_id"):
+        scope = subject_enrollment_ids(payload["subject_id"], semester_id)
+    else:
+        return jsonify({"ok": False, "error": "Chybí soubor nebo předmět."}), 400
+
+    grades, error = grades_from_payload(payload)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+
+    updated, errors = apply_grades(grades, scope)
+    if errors:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "Klasifikace nebyla uložena.", "errors": errors}), 400
+
+    db.session.commit()
+    return jsonify({"ok": True, "updated": updated})
@@ -1,9 +1,15 @@
-from flask import render_template, redirect, url_for, abort, request
+from flask import render_template, redirect, url_for, abort, request, jsonify
 from flask_login import current_user
+from sqlalchemy import select, union
 from modules.teacher_portal import teacher_portal_bp
-from models import Semester, EnsembleTeacher, EnsemblePlayer, db
+from models import db, Semester, Ensemble, EnsembleTeacher, ArchivedEnsembleTeacher
+from models.archive import is_archived, semester_model
+from utils.grading import (
+    apply_grades, grades_from_payload, ensemble_enrollment_ids, load_grading_grid, CLASSIFICATIONS, CLASSIFICATION_BASES,
+    CLASSIFICATION_LABELS, BASIS_LABELS,
+)
 from utils.session_helpers import get_or_set_current_semester
-from sqlalchemy.orm import joinedload
+from utils.portal_loader import load_teacher_portal, cached_fragment
 
 
 @teacher_portal_bp.before_request
@@ -18,12 +24,14 @@ def require_teacher():
 def dashboard():
     teacher = current_user.teacher
 
-    # All semesters this teacher has been linked to an ensemble, newest first
+    # All semesters this teacher has been linked to an ensemble (live or archived), newest first
+    linked_semester_ids = union(
+        select(EnsembleTeacher.semester_id).where(EnsembleTeacher.teacher_id == teacher.id),
+        select(ArchivedEnsembleTeacher.semester_id).where(ArchivedEnsembleTeacher.teacher_id == teacher.id),
+    )
     teacher_semesters = (
         Semester.query
-        .join(EnsembleTeacher, EnsembleTeacher.semester_id == Semester.id)
-        .filter(EnsembleTeacher.teacher_id == teacher.id)
-        .distinct()
+        .filter(Semester.id.in_(linked_semester_ids))
         .order_by(Semester.start_date.desc())
         .all()
     )
@@ -36,28 +44,65 @@ def dashboard():
     else:
         semester = get_or_set_current_semester()
 
-    # Ensembles this teacher is assigned to in the selected semester
-    ensemble_links = (
-        EnsembleTeacher.query
-        .filter_by(teacher_id=teacher.id, semester_id=semester.id if semester else None)
-        .options(joinedload(EnsembleTeacher.ensemble))
-        .all()
-    ) if semester else []
+    # Ensembles with players and co-teachers: fixed number of queries, rendered card cached
+    semester_key = semester.id if semester else None
 
-    # Players per ensemble for this semester
-    ensemble_details = {}
-    for link in ensemble_links:
-        ensemble = link.ensemble
-        ensemble_details[ensemble.id] = EnsemblePlayer.query.filter_by(
-            ensemble_id=ensemble.id,
-            semester_id=semester.id,
-        ).options(joinedload(EnsemblePlayer.player)).all()
+    def render_ensembles():
+        portal_ensembles = load_teacher_portal(teacher, semester_key)
+        html = render_template(
+            "partials/_teacher_ensembles.html", portal_ensembles=portal_ensembles, semester_id=semester_key
+        )
+        return html, len(portal_ensembles)
+
+    ensembles_html, ensemble_count = cached_fragment(("teacher", teacher.id, semester_key), render_ensembles)
 
     return render_template(
         "teacher_dashboard.html",
         teacher=teacher,
         semester=semester,
         teacher_semesters=teacher_semesters,
-        ensemble_links=ensemble_links,
-        ensemble_details=ensemble_details,
+        ensembles_html=ensembles_html,
+        ensemble_count=ensemble_count,
+    )
+
+
+@teacher_portal_bp.route("/ensemble/<int:ensemble_id>/grades", methods=["GET", "POST"])
+def ensemble_grades(ensemble_id):
+    """Grading grid for the students of an ensemble the teacher teaches; the grid posts all rows once."""
+    teacher = current_user.teacher
+    ensemble = Ensemble.query.get_or_404(ensemble_id)
+    semester_id = request.args.get("semester_id", type=int) or get_or_set_current_semester().id
+    semester = Semester.query.get_or_404(semester_id)
+
+    teacher_links = semester_model(EnsembleTeacher, semester.id)
+    teaches = db.session.query(
+        teacher_links.query.filter_by(teacher_id=teacher.id, ensemble_id=ensemble.id, semester_id=semester.id).exists()
+    ).scalar()
+    if not teaches:
+        abort(403)
+
+    scope = ensemble_enrollment_ids(ensemble.id, semester.id)
+    archived = is_archived(semester.id)
+
+    if request.method == "POST":
+        if archived:
+            return jsonify({"ok": False, "error": "Semestr je archivován, klasifikaci nelze měnit."}), 400
+        grades, error = grades_from_payload(request.get_json(silent=True))
+        if error:
+            return jsonify({"ok": False, "error": error}), 400
+        updated, errors = apply_grades(grades, scope)
+        if errors:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": "Klasifikace nebyla uložena.", "errors": errors}), 400
+        db.session.commit()
+        return jsonify({"ok": True, "updated": updated})
+
+    return render_template(
+        "ensemble_grades.html",
+        ensemble=ensemble,
+        semester=semester,
+        enrollments=load_grading_grid(scope, semester.id),
+        archived=archived,
+        classifications=[(c, CLASSIFICATION_LABELS.get(c, c)) for c in CLASSIFICATIONS],
+        bases=[(b, BASIS_LABELS.get(b, b)) for b in CLASSIFICATION_BASES],
     )
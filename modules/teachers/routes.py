@@ -1,17 +1,24 @@
 from . import teachers_bp
 from utils.nav import navlink
 from collections import defaultdict
-from flask import render_template
-from sqlalchemy.orm import joinedload
-from models import Teacher
-from models.ensembles import EnsembleTeacher
+from flask import render_template, request, redirect, url_for, flash, abort
+from sqlalchemy import select
+from models import db, Teacher
 from utils.session_helpers import get_or_set_current_semester_id
 from models.core import Semester
+from utils.filter_helpers import get_common_filters
+from utils.export_helpers import teacher_workload_query
+from utils.read_models import load_ensemble_rows, semester_teacher_ensemble_ids, teacher_rows, teacher_department_key
+from utils.tabular_export import tabular_response, xlsx_available, EXPORT_FORMATS, YIELD_PER
+from utils.semester_snapshot import load_semester_snapshot
 
 @teachers_bp.route('/all')
 @navlink("Pedagogové", group="Lidé", weight=150)
 def index():
-    teachers = Teacher.query.order_by(Teacher.last_name).all()
+    # id / name rows only: the list renders nothing else
+    teachers = db.session.execute(
+        select(Teacher.id, Teacher.first_name, Teacher.last_name).order_by(Teacher.last_name)
+    ).all()
     return render_template("all_teachers.html", teachers=teachers)
 
 @teachers_bp.route("/teacher/<int:teacher_id>")
@@ -31,37 +38,17 @@ def workloads():
     current_semester_id = get_or_set_current_semester_id()
     current_semester = Semester.query.get(current_semester_id)
 
-    # Teachers that are linked in the current semester (same idea as your PDF export)
-    teachers = (
-        Teacher.query
-        .join(EnsembleTeacher, EnsembleTeacher.teacher_id == Teacher.id)
-        .filter(EnsembleTeacher.semester_id == current_semester_id)
-        .options(
-            joinedload(Teacher.department),  # if relationship exists
-        )
-        .distinct()
-        .order_by(Teacher.department_id, Teacher.last_name, Teacher.first_name)
-        .all()
-    )
-
-    # Attach pdf_rows = list of EnsembleTeacher links for this semester (with ensembles)
-    # so the existing PDF-based template structure works unchanged.
-    for t in teachers:
-        t.pdf_rows = (
-            EnsembleTeacher.query
-            .filter(
-                EnsembleTeacher.semester_id == current_semester_id,
-                EnsembleTeacher.teacher_id == t.id,
-            )
-            .options(joinedload(EnsembleTeacher.ensemble))
-            .order_by(EnsembleTeacher.id)
-            .all()
-        )
+    snapshot = load_semester_snapshot(current_semester_id)
+    if snapshot:
+        ensembles = snapshot.ensembles
+    else:
+        ensembles = load_ensemble_rows(current_semester_id, semester_teacher_ensemble_ids(current_semester_id))
+    teachers = sorted(teacher_rows(ensembles), key=teacher_department_key)
 
     # Group by department name (string key matches your PDF template)
     grouped = defaultdict(list)
     for t in teachers:
-        dept_name = (t.department.name if getattr(t, "department", None) else "Bez katedry")
+        dept_name = t.department.name if t.department else "Bez katedry"
         grouped[dept_name].append(t)
 
     grouped_teachers = dict(grouped)
@@ -71,3 +58,33 @@ def workloads():
         current_semester=current_semester,
         grouped_teachers=grouped_teachers,
     )
+
+
+@teachers_bp.route("/workloads/export.<fmt>")
+def workloads_export(fmt):
+    """
+    Streaming CSV / XLSX of the semester's teacher workloads, one row per ensemble link;
+    honours the ensemble list filters (teacher, department, instrument, search, ...).
+    """
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    if fmt == "xlsx" and not xlsx_available():
+        flash("Export do XLSX není dostupný (chybí balíček openpyxl).", "warning")
+        return redirect(url_for("teachers.workloads", **request.args))
+
+    current_semester_id = get_or_set_current_semester_id()
+    filters = get_common_filters()
+
+    snapshot = load_semester_snapshot(current_semester_id)
+    if snapshot:
+        rows = snapshot.workload_rows(filters)
+    else:
+        rows = teacher_workload_query(current_semester_id, filters).yield_per(YIELD_PER)
+
+    return tabular_response(
+        fmt,
+        "SKH_Uvazky",
+        ["Katedra", "Příjmení", "Jméno", "Soubor", "Hodinová dotace"],
+        rows,
+        sheet_title="Úvazky",
+    )
@@ -1,31 +1,115 @@
 import re
-from flask import flash
+import threading
+import time
+import unicodedata
+from typing import NamedTuple
+from flask import flash, current_app, has_request_context
+from sqlalchemy import event, insert, delete, select
+from sqlalchemy.orm import Session
 from models import db
-from models.core import Instrument, DoublingInstrumentation
-from models import CompositionInstrumentation
-from collections import defaultdict
-from sqlalchemy import func
+from models.core import Instrument, Instrumentation, DoublingInstrumentation, refresh_instrumentation_cache
+from models import Composition, CompositionInstrumentation
 
 
 def normalize_abbr(abbr):
+    """"Pf." -> "pf", "Lesní roh" -> "lesniroh" (case, dots, spaces, dashes and accents ignored)."""
+    abbr = "".join(
+        c for c in unicodedata.normalize("NFKD", abbr)
+        if not unicodedata.combining(c)
+    )
     return abbr.lower().replace('.', '').replace(' ', '').replace('-', '')
 
 
-def find_instrument_by_abbr(abbr, strict=True):
+# ---------------------------------------------------------
+# INSTRUMENT INDEX
+# ---------------------------------------------------------
+
+class InstrumentIndex:
+    """
+    Normalized abbreviation / Czech name / English name -> instrument id, built from one query.
+    Abbreviations win over names; among equal aliases the lighter (weight, id) instrument wins.
+    """
+
+    def __init__(self, rows):
+        self._by_key = {}
+        rows = sorted(rows, key=lambda r: (r.weight or 0, r.id))
+        for field in ("abbreviation", "name", "name_en"):
+            for row in rows:
+                value = getattr(row, field)
+                if value:
+                    self._by_key.setdefault(normalize_abbr(value), row.id)
+
+    def lookup(self, token):
+        return self._by_key.get(normalize_abbr(token)) if token else None
+
+
+_index_lock = threading.Lock()
+_index_cache = {"index": None, "loaded_at": 0.0, "generation": 0}
+
+
+def get_instrument_index() -> InstrumentIndex:
     """
-    Finds an instrument by performing a case-insensitive search
-    on the existing 'abbreviation' column.
+    Process-wide index, rebuilt after an Instrument row is written in this process.
+    INSTRUMENT_INDEX_TTL (seconds) bounds staleness for writes made by other processes.
     """
-    # 1. Normalize the user's input string (e.g., "Pf." -> "pf")
-    normalized_input = normalize_abbr(abbr)
+    ttl = current_app.config.get("INSTRUMENT_INDEX_TTL", 300)
+    index = _index_cache["index"]
+    if index is not None and time.monotonic() - _index_cache["loaded_at"] < ttl:
+        return index
+
+    with _index_lock:
+        index = _index_cache["index"]
+        if index is not None and time.monotonic() - _index_cache["loaded_at"] < ttl:
+            return index
+
+        generation = _index_cache["generation"]
+        rows = db.session.execute(
+            select(Instrument.id, Instrument.abbreviation, Instrument.name, Instrument.name_en, Instrument.weight)
+        ).all()
+        index = InstrumentIndex(rows)
+        # a commit that landed while loading may not be in `rows`; serve it but don't cache it
+        if _index_cache["generation"] == generation:
+            _index_cache["index"] = index
+            _index_cache["loaded_at"] = time.monotonic()
+        return index
+
+
+def invalidate_instrument_index():
+    _index_cache["generation"] += 1
+    _index_cache["index"] = None
+
+
+_INSTRUMENT_WRITTEN_KEY = "instrument_index_stale"
 
-    # 2. Use func.lower() to make the database column lowercase before comparing
-    instrument = Instrument.query.filter(
-        func.lower(Instrument.abbreviation) == normalized_input
-    ).first()
 
-    if instrument:
-        return instrument
+@event.listens_for(Session, "after_flush")
+def _collect_instrument_writes(session, flush_context):
+    if any(isinstance(obj, Instrument) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_INSTRUMENT_WRITTEN_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_instrument_commit(session):
+    # only committed rows may reach the cache; other requests must not rebuild from uncommitted ones
+    if session.info.pop(_INSTRUMENT_WRITTEN_KEY, False):
+        invalidate_instrument_index()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_instrument_writes_on_rollback(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_INSTRUMENT_WRITTEN_KEY, None)
+
+
+def find_instrument_by_abbr(abbr, strict=True):
+    """
+    Finds an instrument by abbreviation, Czech or English name
+    (case-, accent- and punctuation-insensitive) using the in-memory index.
+    """
+    instrument_id = get_instrument_index().lookup(abbr)
+
+    if instrument_id:
+        return db.session.get(Instrument, instrument_id)
 
     if strict:
         raise ValueError(f"Instrument abbreviation not found: '{abbr}'")
@@ -33,6 +117,28 @@ def find_instrument_by_abbr(abbr, strict=True):
     return None
 
 
+# ---------------------------------------------------------
+# PARSING (no database access)
+# ---------------------------------------------------------
+
+class ParsedDoubling(NamedTuple):
+    count: int | None  # None = only the last player of the group
+    instrument_id: int | None
+    token: str
+    separate: bool
+
+
+class ParsedPart(NamedTuple):
+    count: int
+    instrument_id: int | None
+    token: str
+    doublings: list
+
+
+PART_RE = re.compile(r"^(\d+)?\s*([^()]*?)\s*(?:\((.*)\))?$")
+DOUBLING_RE = re.compile(r"^(\+)?\s*(\d+)?\s*(.+)$")
+
+
 def clean_line(input_line):
     cleaned = re.sub(r'[\u200b\u200c\u200d\u2060\ufeff]', '', input_line)
     cleaned = re.sub(r'\s+', ' ', cleaned)
@@ -63,134 +169,167 @@ def split_instrumentation_line(input_line):
     return parts
 
 
-def assign_doublings(players, items, separate, find_instrument_func):
-    numbered = []
-    non_numbered = []
-
-    for item in items:
-        item = item.strip()
-        if re.match(r"\d+", item):
-            numbered.append(item)
-        else:
-            non_numbered.append(item)
+def parse_instrumentation_line(line, index=None):
+    """
+    "2Fl (Picc, +Afl), Ob, Pf" -> [ParsedPart, ...].
+    Doublings in parentheses: "2Picc" = the last two players, "Picc" = the last player,
+    a leading "+" marks a separate doubling.
+    """
+    index = index or get_instrument_index()
+    parts = []
 
-    # Numbered → reverse order
-    for item in numbered:
-        m = re.match(r"(\d+)([a-zA-Z .]+)", item)
-        if not m:
+    for raw in split_instrumentation_line(line or ""):
+        match = PART_RE.match(raw)
+        if not raw or not match or not match.group(2):
             continue
-        count = int(m.group(1))
-        abbr = m.group(2).strip()
-
-        instrument = find_instrument_func(abbr, strict=False)
-        targets = sorted(players, key=lambda p: p.position, reverse=True)[:count]
-
-        if instrument:
-            for p in targets:
-                existing = DoublingInstrumentation.query.filter_by(
-                    instrumentation_id=p.id,
-                    doubling_instrument_id=instrument.id
-                ).first()
-
-                if not existing:
-                    db.session.add(DoublingInstrumentation(
-                        instrumentation_id=p.id,
-                        doubling_instrument_id=instrument.id,
-                        separate=separate
-                    ))
-
-    # Non-numbered → last player
-    target_player = sorted(players, key=lambda p: p.position)[-1] if players else None
-
-    if not target_player and players:
-        target_player = next((p for p in players if p.concertmaster), None)
-
-    for abbr in non_numbered:
-        abbr = abbr.strip()
-        instrument = find_instrument_func(abbr, strict=False)
-
-        if instrument and target_player:
-            existing = DoublingInstrumentation.query.filter_by(
-                instrumentation_id=target_player.id,
-                doubling_instrument_id=instrument.id
-            ).first()
-
-            if not existing:
-                db.session.add(DoublingInstrumentation(
-                    instrumentation_id=target_player.id,
-                    doubling_instrument_id=instrument.id,
-                    separate=separate
-                ))
-        elif target_player:
-            # Unknown instrument → add comment
-            target_player.comment = ((target_player.comment or '') + f" {abbr}").strip()
-            db.session.add(target_player)
 
+        count = int(match.group(1)) if match.group(1) else 1
+        token = match.group(2)
 
-def process_chamber_instrumentation_line(composition_id, line, clear_existing=True):
-    # STEP 1: Log function entry and initial inputs
-    print(f"\n[DEBUG] --- Starting process_chamber_instrumentation_line ---")
-    print(f"[DEBUG] Composition ID: {composition_id}")
-    print(f"[DEBUG] Raw input line: '{line}'")
+        doublings = []
+        for item in (match.group(3) or "").split(","):
+            item = item.strip()
+            d = DOUBLING_RE.match(item) if item else None
+            if not d:
+                continue
+            doublings.append(ParsedDoubling(
+                count=int(d.group(2)) if d.group(2) else None,
+                instrument_id=index.lookup(d.group(3)),
+                token=d.group(3).strip(),
+                separate=bool(d.group(1)),
+            ))
 
-    if clear_existing:
-        # STEP 2: Log the deletion of existing records
-        existing_count = CompositionInstrumentation.query.filter_by(composition_id=composition_id).count()
-        print(f"[DEBUG] 'clear_existing' is True. Deleting {existing_count} existing instrumentation entries.")
-        CompositionInstrumentation.query.filter_by(composition_id=composition_id).delete()
+        parts.append(ParsedPart(count, index.lookup(token), token, doublings))
 
-    # STEP 3: Log the result of splitting the input line
-    instruments = split_instrumentation_line(line)
-    print(f"[DEBUG] Line split into parts: {instruments}")
+    return parts
 
-    grouped = defaultdict(list)
 
-    # STEP 4: Loop through each part and log the parsing process
-    print("[DEBUG] ---> Looping through each instrument part...")
-    for abbr in instruments:
-        abbr = abbr.strip()
-        print(f"\n[DEBUG]   Processing part: '{abbr}'")
+# ---------------------------------------------------------
+# PERSISTENCE
+# ---------------------------------------------------------
 
-        if not abbr:
-            print("[DEBUG]   Skipping empty part.")
-            continue
+def build_instrumentation_rows(parts):
+    """
+    Group parsed parts by instrument (first appearance order) into entries:
+    [{"instrument_id", "position", "concertmaster", "comment", "doublings": [(instrument_id, separate)]}].
+    """
+    groups = {}
+    for part in parts:
+        if part.instrument_id:
+            groups.setdefault(part.instrument_id, []).append(part)
+
+    rows = []
+    for instrument_id, group_parts in groups.items():
+        count = sum(p.count for p in group_parts)
+        entries = [
+            {
+                "instrument_id": instrument_id,
+                "position": (i + 1) if count > 1 else None,
+                "concertmaster": i == 0,
+                "comment": None,
+                "doublings": [],
+            }
+            for i in range(count)
+        ]
+
+        for part in group_parts:
+            for d in part.doublings:
+                targets = entries[-d.count:] if d.count else entries[-1:]
+                for entry in targets:
+                    if d.instrument_id:
+                        if (d.instrument_id, d.separate) not in entry["doublings"]:
+                            entry["doublings"].append((d.instrument_id, d.separate))
+                    else:
+                        # unknown doubling instrument -> keep it as a comment
+                        entry["comment"] = ((entry["comment"] or "") + f" {d.token}").strip()
+
+        rows.extend(entries)
+
+    return rows
+
+
+def clear_composition_instrumentation(composition_ids):
+    """Delete instrumentation entries (and their doublings) of the given compositions."""
+    entry_ids = select(CompositionInstrumentation.id).where(
+        CompositionInstrumentation.composition_id.in_(composition_ids)
+    )
+    db.session.execute(
+        delete(DoublingInstrumentation).where(DoublingInstrumentation.instrumentation_id.in_(entry_ids))
+    )
+    ids = db.session.scalars(entry_ids).all()
+    if ids:
+        db.session.execute(delete(CompositionInstrumentation.__table__).where(
+            CompositionInstrumentation.__table__.c.id.in_(ids)
+        ))
+        db.session.execute(delete(Instrumentation.__table__).where(Instrumentation.__table__.c.id.in_(ids)))
+
+
+def insert_composition_instrumentation(rows_by_composition):
+    """
+    Bulk insert {composition_id: build_instrumentation_rows(...)} — one INSERT for the entries,
+    one for their doublings — and refresh the compositions' cached summary / signature.
+    """
+    flat = [(cid, row) for cid, rows in rows_by_composition.items() for row in rows]
+    if not flat:
+        refresh_composition_cache(rows_by_composition)
+        return 0
+
+    entry_ids = db.session.scalars(
+        insert(CompositionInstrumentation).returning(CompositionInstrumentation.id, sort_by_parameter_order=True),
+        [
+            {
+                "composition_id": cid,
+                "instrument_id": row["instrument_id"],
+                "position": row["position"],
+                "concertmaster": row["concertmaster"],
+                "comment": row["comment"],
+            }
+            for cid, row in flat
+        ],
+    ).all()
 
-        match = re.match(r"(\d+)?([a-zA-Z .]+)", abbr)
-        count = int(match.group(1)) if match and match.group(1) else 1
-        pure_abbr = match.group(2).strip() if match else abbr
+    doubling_rows = [
+        {"instrumentation_id": entry_id, "doubling_instrument_id": instrument_id, "separate": separate}
+        for entry_id, (_, row) in zip(entry_ids, flat)
+        for instrument_id, separate in row["doublings"]
+    ]
+    if doubling_rows:
+        db.session.execute(insert(DoublingInstrumentation), doubling_rows)
 
-        print(f"[DEBUG]   Parsed -> Count: {count}, Abbreviation: '{pure_abbr}'")
+    refresh_composition_cache(rows_by_composition)
+    return len(entry_ids)
 
-        instrument = find_instrument_by_abbr(pure_abbr, strict=False)
 
-        if instrument:
-            print(f"[DEBUG]   SUCCESS: Found instrument '{instrument.name}' (ID: {instrument.id}) in database.")
-            grouped[instrument.id].extend([instrument] * count)
-        else:
-            # This is a critical message to watch for
-            print(f"[DEBUG]   WARNING: Instrument NOT FOUND for abbreviation '{pure_abbr}'.")
-            flash(f"Instrument '{abbr}' not recognized", "warning")
-
-    # STEP 5: Log the final grouped structure before creating DB objects
-    print("\n[DEBUG] ---> Finished parsing. Final grouping:")
-    print(f"[DEBUG] {dict(grouped)}")
-
-    # STEP 6: Loop through the groups and log the creation of each DB entry
-    print("[DEBUG] ---> Creating new database entries...")
-    for instrument_id, entries in grouped.items():
-        count = len(entries)
-        for i in range(count):
-            # Create the object but don't add it to the session just yet
-            entry_data = {
-                "composition_id": composition_id,
-                "instrument_id": instrument_id,
-                "position": (i + 1) if count > 1 else None,
-                "concertmaster": (i == 0)
-            }
-            print(f"[DEBUG]   Staging entry for session: {entry_data}")
+def refresh_composition_cache(composition_ids):
+    """Bulk statements skip the after_flush maintenance; recompute summary / signature explicitly."""
+    refresh_instrumentation_cache(
+        db.session.connection(), Composition, CompositionInstrumentation.composition_id, composition_ids
+    )
+
+
+def process_chamber_instrumentation_line(composition_id, line, clear_existing=True):
+    """
+    Replace a composition's instrumentation with the parsed `line`.
+    Parsing uses the in-memory instrument index; the rows are written with bulk statements.
+    Returns the list of unrecognized instrument tokens.
+    """
+    parts = parse_instrumentation_line(line)
+    unknown = [p.token for p in parts if not p.instrument_id]
+
+    if clear_existing:
+        clear_composition_instrumentation([composition_id])
+
+    insert_composition_instrumentation({composition_id: build_instrumentation_rows(parts)})
+
+    # bulk statements bypass the identity map; reload the collection on next access
+    composition = db.session.identity_map.get(db.session.identity_key(Composition, composition_id))
+    if composition is not None:
+        db.session.expire(composition, [
+            "instrumentation_entries", "instrumentation_summary", "instrumentation_signature", "instrumentation_size",
+        ])
 
-            # Now create and add the object
-            entry = CompositionInstrumentation(**entry_data)
-            db.session.add(entry)
+    if has_request_context():
+        for token in unknown:
+            flash(f"Instrument '{token}' not recognized", "warning")
 
-    print("[DEBUG] --- Finished process_chamber_instrumentation_line ---\n")
+    return unknown
@@ -0,0 +1,84 @@
+// static/js/modals/takeover-teacher-bulk.js
+(function () {
+    document.addEventListener("DOMContentLoaded", () => {
+        const modalEl = document.getElementById("bulkTakeoverTeacherModal");
+        if (!modalEl) return;
+
+        const loadingEl = modalEl.querySelector(".js-loading");
+        const errorEl = modalEl.querySelector(".js-error");
+        const summaryEl = modalEl.querySelector(".js-summary");
+        const additionsEl = modalEl.querySelector(".js-additions");
+        const emptyEl = modalEl.querySelector(".js-empty");
+        const submitBtn = modalEl.querySelector(".js-confirm");
+
+        function escapeHtml(value) {
+            const div = document.createElement("div");
+            div.textContent = value ?? "";
+            return div.innerHTML;
+        }
+
+        function resetUI() {
+            if (errorEl) {
+                errorEl.classList.add("d-none");
+                errorEl.textContent = "";
+            }
+            if (summaryEl) summaryEl.classList.add("d-none");
+            if (emptyEl) emptyEl.classList.add("d-none");
+            if (additionsEl) additionsEl.innerHTML = "";
+            if (loadingEl) loadingEl.classList.remove("d-none");
+            if (submitBtn) submitBtn.disabled = true;
+        }
+
+        function renderEnsemble(e) {
+            return `
+        <div class="list-group-item">
+          <div class="fw-semibold">${escapeHtml(e.name)}</div>
+          <div class="text-muted small">+ ${e.teachers.map(t => escapeHtml(t || "—")).join(", ")}</div>
+        </div>
+      `;
+        }
+
+        async function loadPreview() {
+            const token = document.querySelector('meta[name="csrf-token"]')?.getAttribute("content");
+            const body = new FormData();
+            body.append("dry_run", "1");
+
+            const resp = await fetch(modalEl.dataset.previewUrl, {
+                method: "POST",
+                headers: {Accept: "application/json", ...(token ? {"X-CSRFToken": token} : {})},
+                body,
+            });
+            const data = await resp.json().catch(() => ({}));
+            if (!resp.ok || data.ok === false) throw new Error(data.error || `HTTP ${resp.status}`);
+            return data.report;
+        }
+
+        modalEl.addEventListener("shown.bs.modal", async () => {
+            resetUI();
+
+            try {
+                const report = await loadPreview();
+                if (loadingEl) loadingEl.classList.add("d-none");
+
+                if (!report.created) {
+                    if (emptyEl) emptyEl.classList.remove("d-none");
+                    return;
+                }
+
+                if (summaryEl) {
+                    summaryEl.textContent = `${report.source_semester.name} → ${report.target_semester.name}: ` +
+                        `${report.created} přiřazení u ${report.ensembles.length} z ${report.ensemble_count} souborů`;
+                    summaryEl.classList.remove("d-none");
+                }
+                if (additionsEl) additionsEl.innerHTML = report.ensembles.map(renderEnsemble).join("");
+                if (submitBtn) submitBtn.disabled = false;
+            } catch (e) {
+                if (loadingEl) loadingEl.classList.add("d-none");
+                if (errorEl) {
+                    errorEl.classList.remove("d-none");
+                    errorEl.textContent = `Nepodařilo se připravit náhled. (${e.message})`;
+                }
+            }
+        });
+    });
+})();
@@ -0,0 +1,399 @@
+from datetime import datetime
+from sqlalchemy import insert, update, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from models import (
+    db, Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleInstrumentation, EnsembleApplication, EnsembleTeacher,
+    StudentChamberApplication, StudentChamberApplicationPlayers, StudentChamberApplicationStatus,
+    ChamberEnrollmentRequest, ChamberEnrollmentRequestPlayer, Student, Player,
+)
+from models.students import player_fingerprint_for
+from models.archive import ArchivedSemesterError, is_archived
+from models.core import refresh_instrumentation_cache
+from models.ensembles import refresh_player_sort_keys, recompute_hour_donations
+from models.student_status import refresh_student_semester_status
+
+
+# ---------------------------------------------------------
+# REPORT
+# ---------------------------------------------------------
+
+def _result(item_id, status, message=None, ensemble_id=None, related_to=None):
+    """One line of the batch report. status: approved | skipped | error."""
+    return {
+        "id": item_id,
+        "status": status,
+        "message": message,
+        "ensemble_id": ensemble_id,
+        "related_to": related_to,
+    }
+
+
+def summarize_report(report):
+    counts = {"approved": 0, "skipped": 0, "error": 0}
+    for row in report:
+        counts[row["status"]] += 1
+    return counts
+
+
+def _ensemble_name(student, co_players):
+    instruments = []
+    if student.instrument:
+        instruments.append(student.instrument.abbreviation or student.instrument.name)
+    for player in co_players:
+        if player.instrument:
+            instruments.append(player.instrument.abbreviation or player.instrument.name)
+    return f"{student.full_name} ({', '.join(instruments)})" if instruments else student.full_name
+
+
+class _EnsembleDraft:
+    """Everything needed to bulk-insert one ensemble with its slots, players and teachers."""
+
+    def __init__(self, name, semester_id, slots, loose_player_ids=(), teacher_ids=()):
+        self.name = name
+        self.semester_id = semester_id
+        self.slots = slots  # [(instrument_id, player_id or None)], in position order
+        self.loose_player_ids = list(loose_player_ids)  # players without an instrument → no slot
+        self.teacher_ids = list(teacher_ids)
+        self.ensemble_id = None
+
+
+def _insert_ensembles(drafts):
+    """Bulk-create ensembles, semester links, slots, assignments and teacher links for drafts."""
+    if not drafts:
+        return
+
+    ensemble_ids = db.session.scalars(
+        insert(Ensemble).returning(Ensemble.id, sort_by_parameter_order=True),
+        [{"name": d.name, "active": True} for d in drafts],
+    ).all()
+    for draft, ensemble_id in zip(drafts, ensemble_ids):
+        draft.ensemble_id = ensemble_id
+
+    db.session.execute(
+        insert(EnsembleSemester),
+        [{"ensemble_id": d.ensemble_id, "semester_id": d.semester_id} for d in drafts],
+    )
+
+    slot_rows, slot_players = [], []
+    for d in drafts:
+        for position, (instrument_id, player_id) in enumerate(d.slots, start=1):
+            slot_rows.append({"ensemble_id": d.ensemble_id, "instrument_id": instrument_id, "position": position})
+            slot_players.append((d, player_id))
+
+    player_rows = []
+    if slot_rows:
+        slot_ids = db.session.scalars(
+            insert(EnsembleInstrumentation).returning(EnsembleInstrumentation.id, sort_by_parameter_order=True),
+            slot_rows,
+        ).all()
+        player_rows.extend(
+            {
+                "ensemble_id": d.ensemble_id,
+                "semester_id": d.semester_id,
+                "ensemble_instrumentation_id": slot_id,
+                "player_id": player_id,
+            }
+            for slot_id, (d, player_id) in zip(slot_ids, slot_players)
+        )
+        refresh_instrumentation_cache(
+            db.session.connection(), Ensemble, EnsembleInstrumentation.ensemble_id, ensemble_ids
+        )
+
+    player_rows.extend(
+        {"ensemble_id": d.ensemble_id, "semester_id": d.semester_id, "ensemble_instrumentation_id": None,
+         "player_id": player_id}
+        for d in drafts for player_id in d.loose_player_ids
+    )
+    if player_rows:
+        db.session.execute(insert(EnsemblePlayer), player_rows)
+        refresh_player_sort_keys(db.session.connection(), ensemble_ids=ensemble_ids)
+        refresh_student_semester_status(
+            db.session.connection(), ensemble_ids=ensemble_ids, semester_ids={d.semester_id for d in drafts}
+        )
+
+    teacher_rows = [
+        {"ensemble_id": d.ensemble_id, "semester_id": d.semester_id, "teacher_id": teacher_id}
+        for d in drafts for teacher_id in d.teacher_ids
+    ]
+    if teacher_rows:
+        db.session.execute(insert(EnsembleTeacher), teacher_rows)
+        recompute_hour_donations(db.session.connection(), ensemble_ids=ensemble_ids)
+
+
+# ---------------------------------------------------------
+# STUDENT CHAMBER APPLICATIONS
+# ---------------------------------------------------------
+
+PENDING_STATUS_ID = 1  # "Založeno": undecided, as in the approve-batch / reject-all routes
+
+def _load_applications(*criteria):
+    return (
+        StudentChamberApplication.query
+        .options(
+            selectinload(StudentChamberApplication.student).selectinload(Student.player),
+            selectinload(StudentChamberApplication.student).selectinload(Student.instrument),
+            selectinload(StudentChamberApplication.players)
+            .selectinload(StudentChamberApplicationPlayers.player)
+            .selectinload(Player.instrument),
+            selectinload(StudentChamberApplication.ensemble_link),
+        )
+        .filter(*criteria)
+        .order_by(StudentChamberApplication.id)
+        .all()
+    )
+
+
+def _application_error(app):
+    if not app.semester_id:
+        return "Žádost nemá přiřazený semestr."
+    if is_archived(app.semester_id):
+        return str(ArchivedSemesterError())
+    if not app.student.instrument:
+        return f"Žadatel {app.student.full_name} nemá přiřazený nástroj."
+    for link in app.players:
+        if not link.player.instrument:
+            return f"Spoluhráč {link.player.full_name} nemá přiřazený nástroj."
+    return None
+
+
+def approve_applications_batch(application_ids, reviewer, comment=None):
+    """
+    Approve many StudentChamberApplications at once.
+
+    Only pending applications are approved; decided ones are reported as errors. Applications
+    with the same semester and the same set of players (including pending related applications
+    that were not requested explicitly, as in `approve_applications`) share one new ensemble. All ensembles, semester links, slots, assignments, application links
+    and status changes are written with bulk statements and committed once.
+
+    Returns a per-application report (see `_result`).
+    """
+    approved_status = StudentChamberApplicationStatus.query.filter_by(code="approved").first()
+    if not approved_status:
+        raise ValueError("Status 'approved' missing in database")
+
+    requested_ids = list(dict.fromkeys(application_ids))
+    requested = _load_applications(StudentChamberApplication.id.in_(requested_ids))
+    by_id = {a.id: a for a in requested}
+
+    report = {}
+    groups = {}  # (semester_id, player_fingerprint) -> [applications], leader first
+
+    for app_id in requested_ids:
+        app = by_id.get(app_id)
+        if not app:
+            report[app_id] = _result(app_id, "error", "Žádost neexistuje.")
+            continue
+        if app.ensemble_link:
+            report[app_id] = _result(app_id, "skipped", "Žádost je již připojena k souboru.",
+                                     ensemble_id=app.ensemble_link.ensemble_id)
+            continue
+        if app.status_id != PENDING_STATUS_ID:
+            report[app_id] = _result(app_id, "error", "Žádost již byla vyřízena.")
+            continue
+        error = _application_error(app)
+        if error:
+            report[app_id] = _result(app_id, "error", error)
+            continue
+        fingerprint = app.player_fingerprint or player_fingerprint_for(app.all_player_ids)
+        groups.setdefault((app.semester_id, fingerprint), []).append(app)
+
+    # related applications (same players, same semester) are approved along with the group;
+    # one lookup on ix_sca_semester_player_fingerprint
+    if groups:
+        for app in _load_applications(
+            StudentChamberApplication.semester_id.in_({semester_id for semester_id, _ in groups}),
+            StudentChamberApplication.player_fingerprint.in_({fingerprint for _, fingerprint in groups}),
+            StudentChamberApplication.id.notin_(list(by_id)),
+            StudentChamberApplication.status_id == PENDING_STATUS_ID,
+        ):
+            group = groups.get((app.semester_id, app.player_fingerprint))
+            if group is not None and not app.ensemble_link:
+                group.append(app)
+
+    drafts = []
+    for (semester_id, _), apps in groups.items():
+        leader = apps[0]
+        co_players = [link.player for link in leader.players]
+        slots = [(leader.student.instrument_id, leader.student.player.id if leader.student.player else None)]
+        slots += [(p.instrument_id, p.id) for p in co_players]
+        drafts.append((_EnsembleDraft(_ensemble_name(leader.student, co_players), semester_id, slots), apps))
+
+    if not drafts:
+        return [report[i] for i in requested_ids]
+
+    now = datetime.now()
+    try:
+        _insert_ensembles([draft for draft, _ in drafts])
+
+        db.session.execute(
+            insert(EnsembleApplication),
+            [
+                {"ensemble_id": draft.ensemble_id, "application_id": app.id,
+                 "created_by_id": reviewer.id if reviewer else None}
+                for draft, apps in drafts for app in apps
+            ],
+        )
+        db.session.execute(
+            update(StudentChamberApplication)
+            .where(StudentChamberApplication.id.in_([app.id for _, apps in drafts for app in apps]))
+            .values(
+                status_id=approved_status.id,
+                reviewed_at=now,
+                reviewed_by_id=reviewer.id if reviewer else None,
+                review_comment=comment,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        for _, apps in drafts:
+            for app in apps:
+                report[app.id] = _result(app.id, "error", f"Chyba databáze: {e.orig}")
+        return list(report.values())
+
+    for draft, apps in drafts:
+        leader_id = apps[0].id
+        for app in apps:
+            report[app.id] = _result(
+                app.id, "approved", ensemble_id=draft.ensemble_id,
+                related_to=None if app.id == leader_id else leader_id,
+            )
+
+    # requested ids first (in request order), then related applications picked up on the way
+    requested_set = set(requested_ids)
+    return [report[i] for i in requested_ids] + [row for i, row in report.items() if i not in requested_set]
+
+
+# ---------------------------------------------------------
+# CHAMBER ENROLLMENT REQUESTS
+# ---------------------------------------------------------
+
+def _load_enrollment_requests(*criteria):
+    return (
+        ChamberEnrollmentRequest.query
+        .options(
+            selectinload(ChamberEnrollmentRequest.student).selectinload(Student.player),
+            selectinload(ChamberEnrollmentRequest.student).selectinload(Student.instrument),
+            selectinload(ChamberEnrollmentRequest.players)
+            .selectinload(ChamberEnrollmentRequestPlayer.player)
+            .selectinload(Player.instrument),
+        )
+        .filter(*criteria)
+        .order_by(ChamberEnrollmentRequest.id)
+        .all()
+    )
+
+
+def approve_enrollment_requests_batch(criteria, target_semester, reviewer, comment=None):
+    """
+    Approve pending ChamberEnrollmentRequests matching `criteria` into `target_semester`.
+
+    Requests that want to stay in their ensemble get a semester link on it; the rest are
+    grouped by identical player sets and each group gets one new ensemble (slots, players,
+    teachers). Everything is written with bulk statements and committed once.
+
+    Returns a per-request report (see `_result`).
+    """
+    cers = _load_enrollment_requests(*criteria)
+
+    # the bulk inserts below bypass the flush guard
+    if is_archived(target_semester.id):
+        return [_result(cer.id, "error", str(ArchivedSemesterError())) for cer in cers]
+
+    report = {}
+    stay = {}  # cer id -> stay ensemble id
+    groups = {}  # frozenset(player ids) -> [requests]
+
+    for cer in cers:
+        if cer.status != "pending":
+            report[cer.id] = _result(cer.id, "skipped", "Přihláška již byla vyřízena.",
+                                     ensemble_id=cer.result_ensemble_id)
+            continue
+        if cer.wants_to_stay and cer.stay_ensemble_id:
+            stay[cer.id] = cer.stay_ensemble_id
+            continue
+        player_ids = {p.player_id for p in cer.players}
+        if cer.student.player:
+            player_ids.add(cer.student.player.id)
+        groups.setdefault(frozenset(player_ids), []).append(cer)
+
+    drafts = []
+    for group in groups.values():
+        leader = group[0]
+        student = leader.student
+        co_players = [link.player for link in leader.players]
+
+        slots = []
+        if student.player and student.instrument:
+            slots.append((student.instrument_id, student.player.id))
+        slots += [(p.instrument_id, p.id) for p in co_players if p.instrument_id]
+        loose = [p.id for p in co_players if not p.instrument_id]
+        teacher_ids = list(dict.fromkeys(c.teacher_id for c in group if c.teacher_id))
+
+        drafts.append((
+            _EnsembleDraft(_ensemble_name(student, co_players), target_semester.id, slots, loose, teacher_ids),
+            group,
+        ))
+
+    if not drafts and not stay:
+        return list(report.values())
+
+    now = datetime.now()
+    try:
+        if stay:
+            already_linked = set(db.session.scalars(
+                select(EnsembleSemester.ensemble_id).where(
+                    EnsembleSemester.semester_id == target_semester.id,
+                    EnsembleSemester.ensemble_id.in_(set(stay.values())),
+                )
+            ))
+            missing = sorted(set(stay.values()) - already_linked)
+            if missing:
+                db.session.execute(
+                    insert(EnsembleSemester),
+                    [{"ensemble_id": ensemble_id, "semester_id": target_semester.id} for ensemble_id in missing],
+                )
+                refresh_student_semester_status(
+                    db.session.connection(), ensemble_ids=missing, semester_ids=[target_semester.id]
+                )
+
+        _insert_ensembles([draft for draft, _ in drafts])
+
+        result_ensembles = dict(stay)
+        for draft, group in drafts:
+            for cer in group:
+                result_ensembles[cer.id] = draft.ensemble_id
+
+        db.session.execute(
+            update(ChamberEnrollmentRequest),
+            [
+                {
+                    "id": cer_id,
+                    "status": "approved",
+                    "reviewed_by_id": reviewer.id if reviewer else None,
+                    "reviewed_at": now,
+                    "review_comment": comment,
+                    "target_semester_id": target_semester.id,
+                    "result_ensemble_id": ensemble_id,
+                }
+                for cer_id, ensemble_id in result_ensembles.items()
+            ],
+        )
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        for cer_id in [*stay, *(cer.id for _, group in drafts for cer in group)]:
+            report[cer_id] = _result(cer_id, "error", f"Chyba databáze: {e.orig}")
+        return list(report.values())
+
+    for cer_id, ensemble_id in stay.items():
+        report[cer_id] = _result(cer_id, "approved", "Připojeno ke stávajícímu souboru.", ensemble_id=ensemble_id)
+    for draft, group in drafts:
+        leader_id = group[0].id
+        for cer in group:
+            report[cer.id] = _result(cer.id, "approved", ensemble_id=draft.ensemble_id,
+                                     related_to=None if cer.id == leader_id else leader_id)
+
+    return sorted(report.values(), key=lambda row: row["id"])
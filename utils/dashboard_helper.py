@@ -11,10 +11,13 @@ from models import (
     Teacher,
     Instrument,
 )
+from models.archive import semester_model
 
 
 def get_dashboard_data(current_sem):
-    """Compute all dashboard metrics for the given semester ID."""
+    """Compute all dashboard metrics for the given semester ID (archived ones from the archive tables)."""
+    teacher_links = semester_model(EnsembleTeacher, current_sem)
+    seats = semester_model(EnsemblePlayer, current_sem)
 
     # --- Base ensembles query ---
     ens_q = db.session.query(Ensemble).filter(
@@ -34,10 +37,10 @@ def get_dashboard_data(current_sem):
     ).count()
 
     teachers_involved = (
-                            db.session.query(func.count(func.distinct(EnsembleTeacher.teacher_id)))
+                            db.session.query(func.count(func.distinct(teacher_links.teacher_id)))
                             .filter(
-                                EnsembleTeacher.semester_id == current_sem,
-                                EnsembleTeacher.ensemble_id.in_(ens_q.with_entities(Ensemble.id)),
+                                teacher_links.semester_id == current_sem,
+                                teacher_links.ensemble_id.in_(ens_q.with_entities(Ensemble.id)),
                             )
                             .scalar()
                         ) or 0
@@ -46,9 +49,9 @@ def get_dashboard_data(current_sem):
     players_per_ensemble = (
         db.session.query(
             Ensemble.id,
-            func.count(EnsemblePlayer.id).label("cnt")
+            func.count(seats.id).label("cnt")
         )
-        .join(EnsemblePlayer, EnsemblePlayer.ensemble_id == Ensemble.id, isouter=True)
+        .join(seats, (seats.ensemble_id == Ensemble.id) & (seats.semester_id == current_sem), isouter=True)
         .filter(Ensemble.id.in_(ens_q.with_entities(Ensemble.id)))
         .group_by(Ensemble.id)
         .subquery()
@@ -59,10 +62,13 @@ def get_dashboard_data(current_sem):
     student_counts = (
         db.session.query(
             func.sum(case((func.coalesce(Player.student_id, 0) != 0, 1), else_=0)).label("students"),
-            func.count(EnsemblePlayer.id).label("total"),
+            func.count(seats.id).label("total"),
+        )
+        .join(seats, seats.player_id == Player.id)
+        .filter(
+            seats.semester_id == current_sem,
+            seats.ensemble_id.in_(ens_q.with_entities(Ensemble.id)),
         )
-        .join(EnsemblePlayer, EnsemblePlayer.player_id == Player.id)
-        .filter(EnsemblePlayer.ensemble_id.in_(ens_q.with_entities(Ensemble.id)))
         .one_or_none()
     )
     if student_counts and student_counts.total:
@@ -72,7 +78,10 @@ def get_dashboard_data(current_sem):
 
     # === Alerts ===
     ensembles_no_teacher = (
-        ens_q.filter(~Ensemble.teacher_links.any(EnsembleTeacher.semester_id == current_sem))
+        ens_q.filter(~exists().where(
+            teacher_links.ensemble_id == Ensemble.id,
+            teacher_links.semester_id == current_sem,
+        ))
         .order_by(Ensemble.name)
         .limit(10)
         .all()
@@ -106,16 +115,17 @@ def get_dashboard_data(current_sem):
         .join(EnsembleSemester, EnsembleSemester.ensemble_id == Ensemble.id)
         .join(Instrument, Instrument.id == EnsembleInstrumentation.instrument_id)
         .outerjoin(
-            EnsemblePlayer,
-            EnsemblePlayer.ensemble_instrumentation_id == EnsembleInstrumentation.id,
+            seats,
+            (seats.ensemble_instrumentation_id == EnsembleInstrumentation.id) & (seats.semester_id == current_sem),
         )
         .filter(EnsembleSemester.semester_id == current_sem)
         .filter(
             ~exists(
                 select(1)
                 .where(
-                    EnsemblePlayer.ensemble_instrumentation_id == EnsembleInstrumentation.id,
-                    EnsemblePlayer.player_id.isnot(None),
+                    seats.ensemble_instrumentation_id == EnsembleInstrumentation.id,
+                    seats.semester_id == current_sem,
+                    seats.player_id.isnot(None),
                 )
                 .correlate(EnsembleInstrumentation)
             )
@@ -144,12 +154,12 @@ def get_dashboard_data(current_sem):
         db.session.query(
             Teacher.id,
             Teacher.full_name,
-            func.coalesce(func.sum(EnsembleTeacher.hour_donation), 0.0).label("hours"),
+            func.coalesce(func.sum(teacher_links.hour_donation), 0.0).label("hours"),
         )
-        .join(EnsembleTeacher, EnsembleTeacher.teacher_id == Teacher.id)
-        .filter(EnsembleTeacher.semester_id == current_sem)
+        .join(teacher_links, teacher_links.teacher_id == Teacher.id)
+        .filter(teacher_links.semester_id == current_sem)
         .group_by(Teacher.id, Teacher.full_name)
-        .order_by(func.sum(EnsembleTeacher.hour_donation).desc(), Teacher.last_name, Teacher.first_name)
+        .order_by(func.sum(teacher_links.hour_donation).desc(), Teacher.last_name, Teacher.first_name)
         .limit(10)
         .all()
     )
@@ -1,5 +1,7 @@
 import traceback
-from flask import render_template, got_request_exception
+from flask import render_template, got_request_exception, request, jsonify, flash, redirect, url_for
+from models import db
+from models.archive import ArchivedSemesterError
 
 
 def register_error_handlers(app):
@@ -11,6 +13,15 @@ def register_error_handlers(app):
     def forbidden_error(error):
         return render_template("errors/403.html", error=error), 403
 
+    @app.errorhandler(ArchivedSemesterError)
+    def archived_semester_error(error):
+        # raised by the flush guard / ensure_not_archived before anything reached the live tables
+        db.session.rollback()
+        if request.is_json or request.blueprint == "api" or request.accept_mimetypes.best == "application/json":
+            return jsonify({"ok": False, "error": str(error)}), 409
+        flash(str(error), "warning")
+        return redirect(request.referrer or url_for("ensemble.index"))
+
     # Capture full traceback for later use
     last_traceback = {"text": None}
 
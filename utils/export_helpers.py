@@ -1,82 +1,80 @@
-from weasyprint import HTML
 from flask import make_response, render_template, current_app
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from pathlib import Path
-from collections import defaultdict
-from sqlalchemy.orm import selectinload
-from models import db
-from models.ensembles import EnsemblePlayer, EnsembleTeacher
+from sqlalchemy import func, select
+from models import db, Teacher, Department
+from models.ensembles import Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleTeacher
 from models.players import Player
+from models.archive import semester_model
+from utils.filter_helpers import apply_common_filters
 
 
-def build_ensemble_semester_pdf_maps(ensemble_ids: list[int], semester_id: int):
-    """
-    Returns dicts keyed by ensemble_id so templates can render semester-correct counts,
-    teachers, and (optionally) players without leaking other semesters.
-    """
-    if not ensemble_ids:
-        return {
-            "player_links_by_ensemble": {},
-            "student_count_by_ensemble": {},
-            "external_count_by_ensemble": {},
-            "teachers_by_ensemble": {},
-        }
-
-    # --- players in THIS semester only ---
-    eps = (
-        db.session.query(EnsemblePlayer)
-        .filter(
-            EnsemblePlayer.ensemble_id.in_(ensemble_ids),
-            EnsemblePlayer.semester_id == semester_id,
-        )
-        .options(
-            selectinload(EnsemblePlayer.player).selectinload(Player.student),
-        )
-        .all()
+# ------------------------------
+#   TABULAR EXPORT QUERIES
+# ------------------------------
+def ensemble_table_query(semester_id: int, filters: dict):
+    """Rows of the CSV / XLSX ensemble list: name, instrumentation, teachers, student/guest counts, health."""
+    teacher_links = semester_model(EnsembleTeacher, semester_id)
+    seats = semester_model(EnsemblePlayer, semester_id)
+    teacher_names = (
+        select(func.string_agg(Teacher.full_name, ", "))
+        .join(teacher_links, teacher_links.teacher_id == Teacher.id)
+        .where(teacher_links.ensemble_id == Ensemble.id, teacher_links.semester_id == semester_id)
+        .correlate(Ensemble)
+        .scalar_subquery()
     )
 
-    player_links_by_ensemble = defaultdict(list)
-    student_count_by_ensemble = defaultdict(int)
-    external_count_by_ensemble = defaultdict(int)
-
-    for ep in eps:
-        player_links_by_ensemble[ep.ensemble_id].append(ep)
-        if ep.player_id and ep.player:
-            if ep.player.student_id is not None:
-                student_count_by_ensemble[ep.ensemble_id] += 1
-            else:
-                external_count_by_ensemble[ep.ensemble_id] += 1
+    def player_count(students):
+        return (
+            select(func.count(seats.id))
+            .join(Player, Player.id == seats.player_id)
+            .where(
+                seats.ensemble_id == Ensemble.id,
+                seats.semester_id == semester_id,
+                Player.student_id.isnot(None) if students else Player.student_id.is_(None),
+            )
+            .correlate(Ensemble)
+            .scalar_subquery()
+        )
 
-    # --- teachers in THIS semester only ---
-    et_rows = (
-        db.session.query(EnsembleTeacher)
-        .filter(
-            EnsembleTeacher.ensemble_id.in_(ensemble_ids),
-            EnsembleTeacher.semester_id == semester_id,
+    query = db.session.query(
+        Ensemble.name,
+        Ensemble.instrumentation_summary,
+        teacher_names,
+        player_count(students=True),
+        player_count(students=False),
+        Ensemble.health_check_in(semester_id),
+    ).filter(
+        Ensemble.semester_links.any(EnsembleSemester.semester_id == semester_id)
+    )
+    query = apply_common_filters(query, filters, semester_id)
+    return query.order_by(Ensemble.name)
+
+
+def teacher_workload_query(semester_id: int, filters: dict):
+    """Rows of the CSV / XLSX workload export: one per ensemble teacher link of the semester."""
+    teacher_links = semester_model(EnsembleTeacher, semester_id)
+    query = (
+        db.session.query(
+            func.coalesce(Department.name, "Bez katedry"),
+            Teacher.last_name,
+            Teacher.first_name,
+            Ensemble.name,
+            teacher_links.hour_donation,
         )
-        .options(selectinload(EnsembleTeacher.teacher))
-        .all()
+        .select_from(teacher_links)
+        .join(Teacher, Teacher.id == teacher_links.teacher_id)
+        .join(Ensemble, Ensemble.id == teacher_links.ensemble_id)
+        .outerjoin(Department, Department.id == Teacher.department_id)
+        .filter(teacher_links.semester_id == semester_id)
     )
-
-    teachers_by_ensemble = defaultdict(list)
-    for row in et_rows:
-        if row.teacher:
-            teachers_by_ensemble[row.ensemble_id].append(row)
-
-    # ensure keys exist for ensembles with no rows
-    for eid in ensemble_ids:
-        player_links_by_ensemble.setdefault(eid, [])
-        student_count_by_ensemble.setdefault(eid, 0)
-        external_count_by_ensemble.setdefault(eid, 0)
-        teachers_by_ensemble.setdefault(eid, [])
-
-    return {
-        "player_links_by_ensemble": dict(player_links_by_ensemble),
-        "student_count_by_ensemble": dict(student_count_by_ensemble),
-        "external_count_by_ensemble": dict(external_count_by_ensemble),
-        "teachers_by_ensemble": dict(teachers_by_ensemble),
-    }
+    if filters["teacher_ids"]:
+        query = query.filter(Teacher.id.in_(filters["teacher_ids"]))
+    if filters["department_ids"]:
+        query = query.filter(Teacher.department_id.in_(filters["department_ids"]))
+    query = apply_common_filters(query, filters, semester_id)
+    return query.order_by(Department.name, Teacher.last_name, Teacher.first_name, Ensemble.name)
 
 
 # ------------------------------
@@ -99,6 +97,10 @@ def render_pdf(template_name, context, filename_prefix):
     context.setdefault("today", now.date())
 
     # --- render PDF ---
+    # WeasyPrint is imported here, not at module level — it is slow to import
+    # and only export routes need it.
+    from weasyprint import HTML
+
     html = render_template(template_name, **context)
     pdf = HTML(string=html, base_url=str(Path(current_app.root_path).resolve())).write_pdf()
 
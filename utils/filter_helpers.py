@@ -1,5 +1,6 @@
 from sqlalchemy import or_, func, select, exists
 from flask import request
+import unicodedata
 
 from models import (
     Ensemble,
@@ -10,11 +11,28 @@ from models import (
     EnsemblePlayer,
     Teacher,
 )
+from models.archive import semester_model
 
 def norm(expr):
     """Lower + unaccent (Postgres)."""
     return func.lower(func.unaccent(expr))
 
+def search_key(expr):
+    """
+    Lower + unaccent through the IMMUTABLE `f_unaccent` wrapper, so prefix searches
+    can use the expression indexes (ix_*_search_*) created by migration f3a4b5c6d7e8.
+    """
+    return func.f_unaccent(func.lower(expr))
+
+def prefix_pattern(term: str) -> str:
+    """Normalize user input the same way as search_key() and build a LIKE prefix pattern."""
+    term = "".join(
+        c for c in unicodedata.normalize("NFKD", term.lower())
+        if not unicodedata.combining(c)
+    )
+    term = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{term}%"
+
 def get_common_filters():
     return {
         "instrument_ids": request.args.getlist("instrument_id", type=int),
@@ -32,6 +50,9 @@ def apply_common_filters(query, filters, current_semester_id: int):
     search_query = filters["search_query"]
     health_filter = filters["health_filter"]
     incomplete_filter = filters["incomplete_filter"]
+    # an archived semester's teachers and players live in the archive tables
+    teacher_links = semester_model(EnsembleTeacher, current_semester_id)
+    seats = semester_model(EnsemblePlayer, current_semester_id)
 
     # --- Instrument filter ---
     if instrument_ids:
@@ -49,11 +70,11 @@ def apply_common_filters(query, filters, current_semester_id: int):
     # --- Teacher filter ---
     if teacher_ids:
         subq = (
-            select(EnsembleTeacher.id)
+            select(teacher_links.id)
             .where(
-                EnsembleTeacher.ensemble_id == Ensemble.id,
-                EnsembleTeacher.semester_id == current_semester_id,
-                EnsembleTeacher.teacher_id.in_(teacher_ids),
+                teacher_links.ensemble_id == Ensemble.id,
+                teacher_links.semester_id == current_semester_id,
+                teacher_links.teacher_id.in_(teacher_ids),
             )
             .correlate(Ensemble)
             .exists()
@@ -63,11 +84,11 @@ def apply_common_filters(query, filters, current_semester_id: int):
     # --- Department filter ---
     if department_ids:
         subq = (
-            select(EnsembleTeacher.id)
-            .join(Teacher, Teacher.id == EnsembleTeacher.teacher_id)
+            select(teacher_links.id)
+            .join(Teacher, Teacher.id == teacher_links.teacher_id)
             .where(
-                EnsembleTeacher.ensemble_id == Ensemble.id,
-                EnsembleTeacher.semester_id == current_semester_id,
+                teacher_links.ensemble_id == Ensemble.id,
+                teacher_links.semester_id == current_semester_id,
                 Teacher.department_id.in_(department_ids),
             )
             .correlate(Ensemble)
@@ -104,13 +125,13 @@ def apply_common_filters(query, filters, current_semester_id: int):
 
         player_match_exists = exists(
             select(1)
-            .select_from(EnsemblePlayer)
-            .join(Player, Player.id == EnsemblePlayer.player_id)
+            .select_from(seats)
+            .join(Player, Player.id == seats.player_id)
             .outerjoin(Student, Student.id == Player.student_id)
             .where(
-                EnsemblePlayer.ensemble_id == Ensemble.id,
-                EnsemblePlayer.semester_id == current_semester_id,
-                EnsemblePlayer.player_id.isnot(None),
+                seats.ensemble_id == Ensemble.id,
+                seats.semester_id == current_semester_id,
+                seats.player_id.isnot(None),
                 or_(
                     norm(name_lf).ilike(like_needle),
                     norm(name_fl).ilike(like_needle),
@@ -0,0 +1,252 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+# ---------------------------------------------------------
+# TAGS
+#   "ensembles"     any row of the table was written
+#   "ensembles:12"  the row, or a row pointing at it by foreign key (ensemble_players.ensemble_id = 12)
+#   "ensembles:*"   implied by every "ensembles:<id>"; bumped by bulk writes that name no rows
+# A fragment is stored under its key plus the current versions of its tags, so bumping
+# a tag makes every fragment that listed it unreachable; the LRU drops them later.
+# ---------------------------------------------------------
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # full key -> (html, stored_at), least recently used first
+_tag_versions = {}        # tag -> version (memory backend)
+_state = {"store": None}  # SqliteFragmentStore when FRAGMENT_CACHE_BACKEND=sqlite
+
+
+def _expand(tags):
+    expanded = set()
+    for tag in tags:
+        expanded.add(tag)
+        if ":" in tag:
+            expanded.add(tag.split(":", 1)[0] + ":*")
+    return sorted(expanded)
+
+
+def _versions(tags):
+    store = _state["store"]
+    if store is not None:
+        known = store.versions(tags)
+    else:
+        known = _tag_versions
+    return tuple(known.get(tag, 0) for tag in tags)
+
+
+def invalidate_tags(*tags):
+    """Bump the given tags now (writes outside a session; session writes are picked up on commit)."""
+    tags = set(tags)
+    if not tags:
+        return
+    store = _state["store"]
+    if store is not None:
+        store.bump(tags)
+        return
+    with _lock:
+        for tag in tags:
+            _tag_versions[tag] = _tag_versions.get(tag, 0) + 1
+
+
+# ---------------------------------------------------------
+# SHARED STORE — one SQLite file for the workers of a host
+# ---------------------------------------------------------
+
+class SqliteFragmentStore:
+    """Tag versions and rendered fragments in a local SQLite file, shared by the worker processes."""
+
+    CLEANUP_PROBABILITY = 0.01  # share of saves that also drop expired fragments
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS fragment_tags (tag TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fragments (key TEXT PRIMARY KEY, html TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def versions(self, tags):
+        with self._connect() as conn:
+            return dict(conn.execute(
+                f"SELECT tag, version FROM fragment_tags WHERE tag IN ({','.join('?' * len(tags))})", tags
+            ).fetchall())
+
+    def bump(self, tags):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO fragment_tags (tag, version) VALUES (?, 1) "
+                "ON CONFLICT(tag) DO UPDATE SET version = version + 1",
+                [(tag,) for tag in tags],
+            )
+
+    def load(self, key, ttl):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT html FROM fragments WHERE key = ? AND stored_at > ?", (key, time.time() - ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, key, html, ttl):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fragments (key, html, stored_at) VALUES (?, ?, ?)", (key, html, time.time())
+            )
+            if random.random() < self.CLEANUP_PROBABILITY:
+                conn.execute("DELETE FROM fragments WHERE stored_at <= ?", (time.time() - ttl,))
+
+
+# ---------------------------------------------------------
+# JINJA WRAPPER
+# ---------------------------------------------------------
+
+def cache_fragment(name, *key, tags=(), holes=None, caller=None):
+    """
+    Jinja call-block wrapper caching the rendered body:
+
+        {% call cache_fragment("ensemble_row", ensemble.id, semester_id, tags=["ensembles:%d" % ensemble.id]) %}
+            ...
+        {% endcall %}
+
+    `key` must cover everything else the body depends on (semester, role, ...). `holes` maps
+    placeholders rendered in the body to per-request values, substituted (escaped) after the
+    lookup, so e.g. a `next=` URL does not split the cache. FRAGMENT_CACHE_TTL (seconds)
+    bounds staleness for writes made by other processes; 0 disables the cache.
+    """
+    ttl = current_app.config.get("FRAGMENT_CACHE_TTL", 60)
+    if not ttl:
+        html = str(caller())
+    else:
+        tags = _expand(tags)
+        full_key = repr((name, key, tags, _versions(tags)))
+        html = _lookup(full_key, ttl)
+        if html is None:
+            html = str(caller())
+            _store(full_key, html, ttl)
+
+    for placeholder, value in (holes or {}).items():
+        html = html.replace(placeholder, str(escape(value)))
+    return Markup(html)
+
+
+def _lookup(full_key, ttl):
+    with _lock:
+        entry = _entries.get(full_key)
+        if entry is not None:
+            if time.monotonic() - entry[1] < ttl:
+                _entries.move_to_end(full_key)
+                return entry[0]
+            del _entries[full_key]
+
+    store = _state["store"]
+    if store is not None:
+        html = store.load(full_key, ttl)
+        if html is not None:
+            _remember(full_key, html)
+        return html
+    return None
+
+
+def _store(full_key, html, ttl):
+    _remember(full_key, html)
+    store = _state["store"]
+    if store is not None:
+        store.save(full_key, html, ttl)
+
+
+def _remember(full_key, html):
+    max_entries = current_app.config.get("FRAGMENT_CACHE_MAX_ENTRIES", 2000)
+    with _lock:
+        _entries[full_key] = (html, time.monotonic())
+        _entries.move_to_end(full_key)
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+
+
+def init_fragment_cache(app):
+    """Expose cache_fragment to templates and set up the configured backend ("memory" or "sqlite")."""
+    app.jinja_env.globals["cache_fragment"] = cache_fragment
+
+    backend = app.config.get("FRAGMENT_CACHE_BACKEND", "memory")
+    if backend == "sqlite":
+        path = app.config.get("FRAGMENT_CACHE_SQLITE_PATH") or os.path.join(app.instance_path, "fragments.sqlite3")
+        _state["store"] = SqliteFragmentStore(path)
+    elif backend != "memory":
+        app.logger.warning("Unknown FRAGMENT_CACHE_BACKEND=%r, using process memory.", backend)
+    return _state["store"]
+
+
+# ---------------------------------------------------------
+# INVALIDATION — tags of written rows are collected per session and bumped on commit,
+# so a render cannot cache data older than the versions it was keyed with
+# ---------------------------------------------------------
+
+def _pending(session):
+    return session.info.setdefault("fragment_tags", set())
+
+
+def _row_tags(obj):
+    state = sa_inspect(obj)
+    mapper = state.mapper
+    tags = {table.name for table in mapper.tables}
+    # loaded primary key values, not state.identity (new rows get it only after after_flush)
+    # and without attribute access (no SQL for expired attributes of deleted rows)
+    pk = [state.dict.get(mapper.get_property_by_column(column).key) for column in mapper.primary_key]
+    if len(pk) == 1 and pk[0] is not None:
+        tags.update(f"{table.name}:{pk[0]}" for table in mapper.tables)
+
+    for prop in mapper.column_attrs:
+        for column in prop.columns:
+            for fk in getattr(column, "foreign_keys", ()):
+                # old and new value: a moved row touches both parents
+                values = state.attrs[prop.key].history.sum() or [state.dict.get(prop.key)]
+                tags.update(f"{fk.column.table.name}:{value}" for value in values if value is not None)
+    return tags
+
+
+def mark_tables_written(session, *tables):
+    """For Core statements (no ORM events): every fragment tagged with these tables or their rows expires on commit."""
+    pending = _pending(session)
+    for table in tables:
+        pending.update((table.name, f"{table.name}:*"))
+        pending.update(f"{fk.column.table.name}:*" for fk in table.foreign_keys)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_rows(session, flush_context):
+    pending = _pending(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        pending.update(_row_tags(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            mark_tables_written(orm_execute_state.session, *mapper.tables)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session):
+    tags = session.info.pop("fragment_tags", None)
+    if tags:
+        invalidate_tags(*tags)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_on_rollback(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("fragment_tags", None)
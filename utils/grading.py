@@ -0,0 +1,141 @@
+from datetime import date
+from sqlalchemy import update, select
+from sqlalchemy.orm import joinedload
+from models import db, StudentSubjectEnrollment, EnsemblePlayer, Player, Student
+from models.archive import semester_model
+from models.student_status import refresh_student_semester_status
+
+CLASSIFICATIONS = tuple(StudentSubjectEnrollment.classification.type.enums)
+CLASSIFICATION_BASES = tuple(StudentSubjectEnrollment.classification_basis.type.enums)
+
+CLASSIFICATION_LABELS = {"Z": "Zápočet", "N": "Neprospěl"}
+BASIS_LABELS = {
+    "exam": "Zkouška",
+    "request": "Žádost",
+    "performed_live": "Veřejné vystoupení",
+}
+
+
+def ensemble_enrollment_ids(ensemble_id, semester_id):
+    """Enrollments (in the semester) of students playing in the ensemble in that semester."""
+    enrollment = semester_model(StudentSubjectEnrollment, semester_id)
+    links = semester_model(EnsemblePlayer, semester_id)
+    return (
+        select(enrollment.id)
+        .join(Player, Player.student_id == enrollment.student_id)
+        .join(links, links.player_id == Player.id)
+        .where(
+            links.ensemble_id == ensemble_id,
+            links.semester_id == semester_id,
+            enrollment.semester_id == semester_id,
+        )
+    )
+
+
+def subject_enrollment_ids(subject_id, semester_id):
+    enrollment = semester_model(StudentSubjectEnrollment, semester_id)
+    return select(enrollment.id).where(
+        enrollment.subject_id == subject_id,
+        enrollment.semester_id == semester_id,
+    )
+
+
+def load_grading_grid(scope, semester_id):
+    """Enrollments of a scope (select of enrollment ids) with student and subject, ordered for the grid."""
+    enrollment = semester_model(StudentSubjectEnrollment, semester_id)
+    return (
+        enrollment.query
+        .join(Student, Student.id == enrollment.student_id)
+        .options(joinedload(enrollment.student), joinedload(enrollment.subject))
+        .filter(enrollment.id.in_(scope))
+        .order_by(Student.last_name, Student.first_name, enrollment.subject_id)
+        .all()
+    )
+
+
+def _parse_entry(entry):
+    """(values, error) for one grid cell: {classification, basis, date}; an empty classification clears."""
+    if not isinstance(entry, dict):
+        return None, "Neplatný záznam."
+
+    classification = str(entry.get("classification") or "").strip() or None
+    basis = str(entry.get("basis") or entry.get("classification_basis") or "").strip() or None
+
+    if classification is None:
+        return {"classification": None, "classification_basis": None, "classification_date": None}, None
+    if classification not in CLASSIFICATIONS:
+        return None, f"Neznámá klasifikace „{classification}“."
+    if basis is not None and basis not in CLASSIFICATION_BASES:
+        return None, f"Neznámý typ klasifikace „{basis}“."
+
+    raw_date = str(entry.get("date") or entry.get("classification_date") or "").strip()
+    try:
+        classified_on = date.fromisoformat(raw_date) if raw_date else date.today()
+    except ValueError:
+        return None, f"Neplatné datum „{raw_date}“."
+
+    return {
+        "classification": classification,
+        "classification_basis": basis,
+        "classification_date": classified_on,
+    }, None
+
+
+def grades_from_payload(payload):
+    """(grades, error) from a JSON body: "grades" must be an object {enrollment_id: entry}."""
+    grades = payload.get("grades") if isinstance(payload, dict) else None
+    if not isinstance(grades, dict):
+        return None, "Chybí klasifikace nebo nemá správný formát."
+    return grades, None
+
+
+def apply_grades(grades, scope):
+    """
+    Validate {enrollment_id: {classification, basis, date}} (see grades_from_payload) against the enrollments of
+    `scope` (a select of enrollment ids) in one prefetch, then write every row with a single
+    executemany UPDATE. Nothing is written when any entry is invalid; archived semesters
+    are read-only, so callers reject them before.
+    Returns (updated_count, errors) where errors is {enrollment_id: message}. The caller commits.
+    """
+    errors = {}
+    parsed = {}
+    for raw_id, entry in grades.items():
+        try:
+            enrollment_id = int(raw_id)
+        except (TypeError, ValueError):
+            errors[str(raw_id)] = "Neplatné ID zápisu."
+            continue
+        values, error = _parse_entry(entry)
+        if error:
+            errors[str(enrollment_id)] = error
+        else:
+            parsed[enrollment_id] = values
+
+    allowed = {}
+    if parsed:
+        allowed = {
+            enrollment_id: (student_id, semester_id)
+            for enrollment_id, student_id, semester_id in db.session.execute(
+                select(
+                    StudentSubjectEnrollment.id, StudentSubjectEnrollment.student_id,
+                    StudentSubjectEnrollment.semester_id,
+                ).where(
+                    StudentSubjectEnrollment.id.in_(list(parsed)),
+                    StudentSubjectEnrollment.id.in_(scope),
+                )
+            )
+        }
+        for enrollment_id in parsed.keys() - allowed.keys():
+            errors[str(enrollment_id)] = "Zápis nepatří do klasifikovaného souboru / předmětu."
+
+    if errors or not parsed:
+        return 0, errors
+
+    rows = [{"id": enrollment_id, **values} for enrollment_id, values in parsed.items()]
+    db.session.execute(update(StudentSubjectEnrollment), rows)
+    refresh_student_semester_status(
+        db.session.connection(),
+        student_ids={student_id for student_id, _ in allowed.values()},
+        semester_ids={semester_id for _, semester_id in allowed.values()},
+    )
+    return len(rows), errors
@@ -2,6 +2,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
 from models import Semester, db, AcademicYear, StudentSubjectEnrollment, Subject, Instrument, Student, Player, Teacher, \
     Department
+from models.archive import is_archived
 import re
 import click
 
@@ -227,6 +228,9 @@ def status_allows_enrollment(status: str) -> bool:
 
 
 def student_subject_enrollment(student_id: int, subject_id: int, semester_id: str):
+    # archived semesters are read-only: their enrollments live in the archive table
+    if is_archived(int(semester_id)):
+        return None
     sse = (StudentSubjectEnrollment.query
            .filter_by(student_id=student_id,
                       subject_id=subject_id,
@@ -0,0 +1,217 @@
+import json
+from contextlib import contextmanager
+from typing import NamedTuple
+from sqlalchemy import event, select, func, text
+from models import db, Ensemble, EnsembleSemester, EnsembleTeacher, EnsembleInstrumentation
+from utils.dashboard_helper import get_dashboard_data
+from utils.export_helpers import ensemble_table_query, teacher_workload_query
+from utils.read_models import filtered_ensemble_ids, load_ensemble_rows
+from utils.filter_helpers import apply_common_filters
+
+# label -> callable(semester_id) running the query the way the app does
+HOT_QUERIES = {}
+
+
+def hot_query(label):
+    def register(fn):
+        HOT_QUERIES[label] = fn
+        return fn
+    return register
+
+
+def empty_filters(**overrides):
+    """The get_common_filters() shape without a request: nothing selected."""
+    filters = {
+        "instrument_ids": [],
+        "teacher_ids": [],
+        "department_ids": [],
+        "search_query": "",
+        "health_filter": "",
+        "incomplete_filter": "",
+    }
+    filters.update(overrides)
+    return filters
+
+
+def _semester_ensembles(semester_id):
+    return db.session.query(Ensemble).filter(
+        Ensemble.semester_links.any(EnsembleSemester.semester_id == semester_id)
+    )
+
+
+def _sample_filters(semester_id):
+    """A teacher + instrument + search combination that exists in the semester, so every EXISTS branch runs."""
+    teacher_id = db.session.scalar(
+        select(EnsembleTeacher.teacher_id)
+        .where(EnsembleTeacher.semester_id == semester_id, EnsembleTeacher.teacher_id.isnot(None))
+        .limit(1)
+    )
+    instrument_id = db.session.scalar(
+        select(EnsembleInstrumentation.instrument_id)
+        .join(EnsembleSemester, EnsembleSemester.ensemble_id == EnsembleInstrumentation.ensemble_id)
+        .where(EnsembleSemester.semester_id == semester_id)
+        .limit(1)
+    )
+    return empty_filters(
+        teacher_ids=[teacher_id] if teacher_id else [],
+        instrument_ids=[instrument_id] if instrument_id else [],
+        search_query="no",
+        incomplete_filter="1",
+    )
+
+
+@hot_query("ensemble list (apply_common_filters, no filters)")
+def _ensemble_list(semester_id):
+    apply_common_filters(_semester_ensembles(semester_id), empty_filters(), semester_id).order_by(Ensemble.name).all()
+
+
+@hot_query("ensemble list (apply_common_filters, teacher + instrument + search)")
+def _ensemble_list_filtered(semester_id):
+    filters = _sample_filters(semester_id)
+    apply_common_filters(_semester_ensembles(semester_id), filters, semester_id).order_by(Ensemble.name).all()
+
+
+@hot_query("dashboard (get_dashboard_data)")
+def _dashboard(semester_id):
+    get_dashboard_data(semester_id)
+
+
+@hot_query("ensemble export (CSV / XLSX)")
+def _ensemble_export(semester_id):
+    ensemble_table_query(semester_id, empty_filters()).all()
+
+
+@hot_query("workload export (CSV / XLSX)")
+def _workload_export(semester_id):
+    teacher_workload_query(semester_id, empty_filters()).all()
+
+
+@hot_query("PDF exports (load_ensemble_rows)")
+def _pdf_rows(semester_id):
+    load_ensemble_rows(semester_id, filtered_ensemble_ids(semester_id, empty_filters()))
+
+
+class SeqScan(NamedTuple):
+    relation: str
+    table_rows: int       # planner estimate (pg_class.reltuples)
+    actual_rows: int      # rows returned, over all loops
+    removed_rows: int     # rows read and thrown away by the filter, over all loops
+    filter: str
+
+
+class StatementPlan(NamedTuple):
+    sql: str
+    execution_ms: float
+    shared_hit: int
+    shared_read: int
+    seq_scans: list       # [SeqScan] on tables above the size threshold
+
+
+class HotQueryReport(NamedTuple):
+    label: str
+    statements: list      # [StatementPlan]
+
+    @property
+    def flagged(self):
+        return [s for s in self.statements if s.seq_scans]
+
+
+@contextmanager
+def record_statements(engine):
+    """Collect (sql, parameters) of every SELECT the engine sends while the block runs."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+def _explain(connection, statement, parameters):
+    raw = connection.exec_driver_sql(
+        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+    ).scalar()
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]
+
+
+def _table_sizes(connection, relations):
+    if not relations:
+        return {}
+    return dict(connection.execute(
+        text("SELECT relname, reltuples::bigint FROM pg_class WHERE relkind = 'r' AND relname = ANY(:names)"),
+        {"names": list(relations)},
+    ).all())
+
+
+def explain_statement(connection, statement, parameters, min_rows):
+    """EXPLAIN ANALYZE one statement; sequential scans of tables with >= min_rows rows are flagged."""
+    result = _explain(connection, statement, parameters)
+    plan = result["Plan"]
+    scans = [n for n in _plan_nodes(plan) if n.get("Node Type") == "Seq Scan"]
+    sizes = _table_sizes(connection, {n["Relation Name"] for n in scans})
+
+    flagged = []
+    for node in scans:
+        table_rows = sizes.get(node["Relation Name"], 0)
+        if table_rows < min_rows:
+            continue
+        loops = node.get("Actual Loops", 1)
+        flagged.append(SeqScan(
+            relation=node["Relation Name"],
+            table_rows=table_rows,
+            actual_rows=int(node.get("Actual Rows", 0) * loops),
+            removed_rows=int(node.get("Rows Removed by Filter", 0) * loops),
+            filter=node.get("Filter", ""),
+        ))
+
+    return StatementPlan(
+        sql=statement,
+        execution_ms=result.get("Execution Time", 0.0),
+        shared_hit=plan.get("Shared Hit Blocks", 0),
+        shared_read=plan.get("Shared Read Blocks", 0),
+        seq_scans=flagged,
+    )
+
+
+def default_report_semester_id():
+    """The semester with the most ensembles: the realistic worst case."""
+    return db.session.scalar(
+        select(EnsembleSemester.semester_id)
+        .group_by(EnsembleSemester.semester_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+
+
+def run_index_report(semester_id, min_rows=1000):
+    """
+    Run every registered hot query for the semester, capture the SQL it issues, then
+    EXPLAIN (ANALYZE, BUFFERS) each distinct statement. Read-only; the caller rolls back.
+    Returns [HotQueryReport].
+    """
+    reports = []
+    for label, run in HOT_QUERIES.items():
+        with record_statements(db.engine) as captured:
+            run(semester_id)
+        db.session.expunge_all()
+
+        seen, plans = set(), []
+        connection = db.session.connection()
+        for statement, parameters in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            plans.append(explain_statement(connection, statement, parameters, min_rows))
+        reports.append(HotQueryReport(label, plans))
+    return reports
@@ -0,0 +1,295 @@
+import csv
+import json
+import unicodedata
+from itertools import chain
+from sqlalchemy import insert, select
+from models import db, Composer, Composition
+from orchestration_parser import (
+    get_instrument_index, parse_instrumentation_line, build_instrumentation_rows,
+    insert_composition_instrumentation,
+)
+
+
+# Accepted column names (Czech headers of the old catalogue exports work too)
+FIELD_ALIASES = {
+    "name": ("name", "nazev", "title"),
+    "composer": ("composer", "skladatel"),
+    "composer_last_name": ("composer_last_name", "last_name", "prijmeni"),
+    "composer_first_name": ("composer_first_name", "first_name", "jmeno"),
+    "year": ("year", "rok"),
+    "durata": ("durata", "duration"),
+    "type": ("type", "typ"),
+    "description": ("description", "popis"),
+    "instrumentation": ("instrumentation", "instrumentace", "obsazeni"),
+}
+COMPOSITION_TYPES = {"chamber", "orchestral"}
+
+
+def _key(value):
+    """Case/accent/whitespace-insensitive key for matching composers and composition names."""
+    value = "".join(
+        c for c in unicodedata.normalize("NFKD", value or "")
+        if not unicodedata.combining(c)
+    )
+    return " ".join(value.lower().split())
+
+
+def _field(record, name):
+    for alias in FIELD_ALIASES[name]:
+        value = record.get(alias)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+class CatalogueLineError(Exception):
+    """A catalogue line that could not be decoded; yielded in place of its record."""
+
+
+def iter_catalogue(stream, fmt):
+    """
+    Yield (line_no, record dict) from a text stream.
+    csv: header row + rows (`,` or `;` delimited); jsonl: one object per line;
+    json: a list of objects (loaded at once).
+    Undecodable lines yield a CatalogueLineError instead of the record, so the import goes on.
+    """
+    if fmt == "csv":
+        header = stream.readline()
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        reader = csv.DictReader(chain([header], stream), delimiter=delimiter)
+        for line_no, row in enumerate(reader, start=2):
+            yield line_no, {(k or "").strip().lower(): v for k, v in row.items()}
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, CatalogueLineError(f"neplatný JSON: {e.msg} (sloupec {e.colno})")
+    elif fmt == "json":
+        try:
+            records = json.load(stream)
+        except json.JSONDecodeError as e:
+            yield e.lineno, CatalogueLineError(f"neplatný JSON: {e.msg} (sloupec {e.colno})")
+            return
+        if not isinstance(records, list):
+            yield 1, CatalogueLineError("soubor JSON musí obsahovat seznam záznamů")
+            return
+        for line_no, record in enumerate(records, start=1):
+            yield line_no, record
+    else:
+        raise ValueError(f"Unsupported catalogue format: {fmt}")
+
+
+def detect_format(filename):
+    lower = (filename or "").lower()
+    if lower.endswith(".jsonl") or lower.endswith(".ndjson"):
+        return "jsonl"
+    if lower.endswith(".json"):
+        return "json"
+    return "csv"
+
+
+class LibraryImportReport:
+    def __init__(self):
+        self.read = 0
+        self.created_composers = 0
+        self.created_compositions = 0
+        self.created_entries = 0
+        self.duplicates = 0
+        self.errors = []  # [(line_no, message)]
+        self.unknown_instruments = {}  # token -> occurrences
+
+    def error(self, line_no, message):
+        self.errors.append((line_no, message))
+
+    def as_dict(self):
+        return {
+            "read": self.read,
+            "created_composers": self.created_composers,
+            "created_compositions": self.created_compositions,
+            "created_entries": self.created_entries,
+            "duplicates": self.duplicates,
+            "errors": [{"line": line_no, "message": message} for line_no, message in self.errors],
+            "unknown_instruments": self.unknown_instruments,
+        }
+
+
+class LibraryImporter:
+    """
+    Streams catalogue records into composers / compositions / instrumentation in batches.
+
+    Existing composers and (name, composer_id) pairs are prefetched once; each batch is
+    written with one INSERT per table and committed (dry run rolls everything back at the end).
+    """
+
+    def __init__(self, batch_size=500, create_composers=True, dry_run=False, on_progress=None):
+        self.batch_size = batch_size
+        self.create_composers = create_composers
+        self.dry_run = dry_run
+        self.on_progress = on_progress
+        self.report = LibraryImportReport()
+
+        self.index = get_instrument_index()
+        self.composers = {
+            (_key(last), _key(first)): cid
+            for cid, last, first in db.session.execute(
+                select(Composer.id, Composer.last_name, Composer.first_name)
+            )
+        }
+        self.existing = {
+            (_key(name), composer_id)
+            for name, composer_id in db.session.execute(select(Composition.name, Composition.composer_id))
+        }
+
+    # --- record validation ---
+
+    def _composer_names(self, record):
+        last = _field(record, "composer_last_name")
+        first = _field(record, "composer_first_name")
+        if not last:
+            # "Dvořák Antonín" (the app's own full_name order) or "Dvořák, Antonín"
+            full = _field(record, "composer")
+            if "," in full:
+                last, _, first = (p.strip() for p in full.partition(","))
+            else:
+                last, _, first = full.partition(" ")
+        return last.strip(), first.strip()
+
+    def _parse(self, line_no, record):
+        name = _field(record, "name")
+        if not name:
+            raise ValueError("chybí název skladby")
+
+        last, first = self._composer_names(record)
+        if not last:
+            raise ValueError("chybí skladatel")
+
+        try:
+            durata = float(_field(record, "durata").replace(",", "."))
+        except ValueError:
+            raise ValueError("neplatná nebo chybějící durata")
+
+        year = _field(record, "year")
+        try:
+            year = int(year) if year else None
+        except ValueError:
+            raise ValueError(f"neplatný rok '{year}'")
+
+        comp_type = _field(record, "type").lower() or "chamber"
+        if comp_type not in COMPOSITION_TYPES:
+            raise ValueError(f"neznámý typ '{comp_type}'")
+
+        return {
+            "line_no": line_no,
+            "name": name,
+            "composer": (last, first),
+            "year": year,
+            "durata": durata,
+            "type": comp_type,
+            "description": _field(record, "description") or None,
+            "instrumentation": _field(record, "instrumentation"),
+        }
+
+    # --- batch writing ---
+
+    def _resolve_composers(self, items):
+        missing = {}
+        for item in items:
+            last, first = item["composer"]
+            key = (_key(last), _key(first))
+            if key not in self.composers:
+                missing.setdefault(key, (last, first))
+
+        if missing and self.create_composers:
+            ids = db.session.scalars(
+                insert(Composer).returning(Composer.id, sort_by_parameter_order=True),
+                [{"last_name": last, "first_name": first} for last, first in missing.values()],
+            ).all()
+            self.composers.update(zip(missing.keys(), ids))
+            self.report.created_composers += len(ids)
+
+        resolved = []
+        for item in items:
+            last, first = item["composer"]
+            composer_id = self.composers.get((_key(last), _key(first)))
+            if not composer_id:
+                full_name = f"{last} {first}".strip()
+                self.report.error(item["line_no"], f"skladatel '{full_name}' neexistuje")
+                continue
+            item["composer_id"] = composer_id
+            resolved.append(item)
+        return resolved
+
+    def _flush_batch(self, items):
+        items = self._resolve_composers(items)
+
+        fresh = []
+        for item in items:
+            key = (_key(item["name"]), item["composer_id"])
+            if key in self.existing:
+                self.report.duplicates += 1
+                continue
+            self.existing.add(key)
+            fresh.append(item)
+
+        if fresh:
+            composition_ids = db.session.scalars(
+                insert(Composition).returning(Composition.id, sort_by_parameter_order=True),
+                [
+                    {k: item[k] for k in ("name", "composer_id", "year", "durata", "type", "description")}
+                    for item in fresh
+                ],
+            ).all()
+
+            rows_by_composition = {}
+            for composition_id, item in zip(composition_ids, fresh):
+                parts = parse_instrumentation_line(item["instrumentation"], index=self.index)
+                for part in parts:
+                    if not part.instrument_id:
+                        self.report.unknown_instruments[part.token] = \
+                            self.report.unknown_instruments.get(part.token, 0) + 1
+                rows_by_composition[composition_id] = build_instrumentation_rows(parts)
+
+            self.report.created_entries += insert_composition_instrumentation(rows_by_composition)
+            self.report.created_compositions += len(composition_ids)
+
+        # dry run keeps one transaction open (later batches may reference new composers)
+        if not self.dry_run:
+            db.session.commit()
+
+        if self.on_progress:
+            self.on_progress(self.report)
+
+    def run(self, records):
+        batch = []
+        for line_no, record in records:
+            self.report.read += 1
+            if isinstance(record, CatalogueLineError):
+                self.report.error(line_no, str(record))
+                continue
+            if not isinstance(record, dict):
+                self.report.error(line_no, "záznam není objekt")
+                continue
+            try:
+                batch.append(self._parse(line_no, record))
+            except (ValueError, AttributeError) as e:
+                self.report.error(line_no, str(e))
+
+            if len(batch) >= self.batch_size:
+                self._flush_batch(batch)
+                batch = []
+
+        if batch:
+            self._flush_batch(batch)
+
+        if self.dry_run:
+            db.session.rollback()
+
+        return self.report
+
+
+def import_library(stream, fmt="csv", **options):
+    """Import a catalogue from a text stream; returns a LibraryImportReport."""
+    return LibraryImporter(**options).run(iter_catalogue(stream, fmt))
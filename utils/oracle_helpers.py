@@ -0,0 +1,72 @@
+import os
+import threading
+from sqlalchemy import event
+from models import db
+
+_oracle_lock = threading.Lock()
+_oracle_state = {"initialized": None}  # None = not attempted yet, True/False = result
+
+
+def oracle_configured(app) -> bool:
+    """Cheap check (no driver load): Oracle bind configured and ORACLE_DRIVER points to a directory."""
+    if "oracle" not in (app.config.get("SQLALCHEMY_BINDS") or {}):
+        app.logger.warning("Oracle disabled: ORACLE_DB_* env vars not set.")
+        return False
+
+    lib_dir = os.environ.get("ORACLE_DRIVER")  # path to Instant Client dir
+    if not lib_dir:
+        app.logger.warning("Oracle disabled: ORACLE_DRIVER not set (thin mode only).")
+        return False
+
+    if not os.path.isdir(lib_dir):
+        app.logger.warning("Oracle disabled: ORACLE_DRIVER is not a directory: %s", lib_dir)
+        return False
+
+    return True
+
+
+def init_oracle_client(app) -> bool:
+    """
+    Try to enable python-oracledb Thick mode. If it fails, keep app running.
+    Safe to call repeatedly — the Instant Client is loaded at most once per process.
+    """
+    if _oracle_state["initialized"] is not None:
+        return _oracle_state["initialized"]
+
+    with _oracle_lock:
+        if _oracle_state["initialized"] is not None:
+            return _oracle_state["initialized"]
+
+        if not oracle_configured(app):
+            _oracle_state["initialized"] = False
+            return False
+
+        lib_dir = os.environ.get("ORACLE_DRIVER")
+        try:
+            import oracledb
+
+            oracledb.init_oracle_client(lib_dir=lib_dir)
+            app.logger.info("Oracle enabled (thick mode). lib_dir=%s", lib_dir)
+            _oracle_state["initialized"] = True
+        except Exception as e:
+            app.logger.warning("Oracle disabled: init_oracle_client failed: %s", e)
+            _oracle_state["initialized"] = False
+
+        return _oracle_state["initialized"]
+
+
+def install_lazy_oracle_init(app):
+    """
+    Defer Thick mode initialization until the Oracle bind opens its first connection.
+    Thick mode must be enabled before any connection exists, so we hook the pool's
+    `do_connect` instead of initializing at boot.
+    """
+    with app.app_context():
+        engine = db.engines.get("oracle")
+
+    if engine is None:
+        return
+
+    @event.listens_for(engine, "do_connect")
+    def _ensure_thick_mode(dialect, conn_rec, cargs, cparams):
+        init_oracle_client(app)
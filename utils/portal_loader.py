@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import defaultdict
+from typing import NamedTuple
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+from models import (
+    Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleTeacher, Player, Student, Teacher, Instrument,
+)
+from models.archive import semester_model
+
+
+class PortalEnsemble(NamedTuple):
+    ensemble: Ensemble
+    players: list        # EnsemblePlayer (or its archive twin) with player, player.student and player.instrument loaded
+    teachers: list       # EnsembleTeacher (or its archive twin) with teacher loaded
+    hour_donation: float | None = None  # the viewing teacher's share (teacher portal)
+
+
+# ---------------------------------------------------------
+# LOADER — a fixed number of queries regardless of ensemble count;
+# archived semesters are read from the archive tables (semester_model)
+# ---------------------------------------------------------
+
+def _players_by_ensemble(ensemble_ids, semester_id):
+    links_model = semester_model(EnsemblePlayer, semester_id)
+    links = (
+        links_model.query
+        .filter(links_model.ensemble_id.in_(ensemble_ids), links_model.semester_id == semester_id)
+        .options(
+            joinedload(links_model.player).joinedload(Player.student),
+            joinedload(links_model.player).joinedload(Player.instrument),
+        )
+        .order_by(links_model.ensemble_id, links_model.player_sort_key, links_model.id)
+        .all()
+    )
+    result = defaultdict(list)
+    for link in links:
+        result[link.ensemble_id].append(link)
+    return result
+
+
+def _teachers_by_ensemble(ensemble_ids, semester_id):
+    links_model = semester_model(EnsembleTeacher, semester_id)
+    links = (
+        links_model.query
+        .filter(links_model.ensemble_id.in_(ensemble_ids), links_model.semester_id == semester_id)
+        .options(joinedload(links_model.teacher))
+        .order_by(links_model.ensemble_id, links_model.id)
+        .all()
+    )
+    result = defaultdict(list)
+    for link in links:
+        result[link.ensemble_id].append(link)
+    return result
+
+
+def load_student_portal(student, semester_id):
+    """The student's ensembles in the semester with co-players and teachers: 3 queries."""
+    if not semester_id or not student.player:
+        return []
+
+    links_model = semester_model(EnsemblePlayer, semester_id)
+    ensembles = (
+        Ensemble.query
+        .join(links_model, links_model.ensemble_id == Ensemble.id)
+        .join(EnsembleSemester, EnsembleSemester.ensemble_id == Ensemble.id)
+        .filter(
+            links_model.player_id == student.player.id,
+            links_model.semester_id == semester_id,
+            EnsembleSemester.semester_id == semester_id,
+        )
+        .distinct()
+        .order_by(Ensemble.name.asc())
+        .all()
+    )
+    if not ensembles:
+        return []
+
+    ids = [e.id for e in ensembles]
+    players = _players_by_ensemble(ids, semester_id)
+    teachers = _teachers_by_ensemble(ids, semester_id)
+    return [PortalEnsemble(e, players[e.id], teachers[e.id]) for e in ensembles]
+
+
+def load_teacher_portal(teacher, semester_id):
+    """Ensembles the teacher is assigned to in the semester, with players and co-teachers: 3 queries."""
+    if not semester_id:
+        return []
+
+    links_model = semester_model(EnsembleTeacher, semester_id)
+    own_links = (
+        links_model.query
+        .filter_by(teacher_id=teacher.id, semester_id=semester_id)
+        .options(joinedload(links_model.ensemble))
+        .order_by(links_model.id)
+        .all()
+    )
+    if not own_links:
+        return []
+
+    ids = [link.ensemble_id for link in own_links]
+    players = _players_by_ensemble(ids, semester_id)
+    teachers = _teachers_by_ensemble(ids, semester_id)
+    return [
+        PortalEnsemble(link.ensemble, players[link.ensemble_id], teachers[link.ensemble_id], link.hour_donation)
+        for link in own_links
+    ]
+
+
+# ---------------------------------------------------------
+# RENDERED FRAGMENT CACHE — per (portal, user, semester)
+# ---------------------------------------------------------
+
+_fragment_lock = threading.Lock()
+_fragment_cache = {}  # key -> (rendered value, stored_at)
+_fragment_state = {"generation": 0}  # bumped on invalidation; renders started earlier are not stored
+PORTAL_FRAGMENT_MAX_ENTRIES = 5000
+
+# writes to these invalidate every cached portal fragment
+PORTAL_DEPENDENCIES = (
+    Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleTeacher, Player, Student, Teacher, Instrument,
+)
+
+
+def cached_fragment(key, render):
+    """
+    Return the cached render() result (HTML, or a tuple carrying it) for `key`,
+    or call render() and cache it.
+    PORTAL_FRAGMENT_TTL (seconds) bounds staleness for writes made by other processes;
+    0 disables the cache.
+    """
+    ttl = current_app.config.get("PORTAL_FRAGMENT_TTL", 60)
+    if not ttl:
+        return render()
+
+    entry = _fragment_cache.get(key)
+    if entry is not None and time.monotonic() - entry[1] < ttl:
+        return entry[0]
+
+    generation = _fragment_state["generation"]
+    html = render()
+    with _fragment_lock:
+        if generation != _fragment_state["generation"]:
+            return html
+        if len(_fragment_cache) >= PORTAL_FRAGMENT_MAX_ENTRIES:
+            _fragment_cache.clear()
+        _fragment_cache[key] = (html, time.monotonic())
+    return html
+
+
+def invalidate_portal_fragments():
+    with _fragment_lock:
+        _fragment_state["generation"] += 1
+        _fragment_cache.clear()
+
+
+# Writes are collected per session and invalidate on commit: a render running between flush and
+# commit (or after a rollback) would otherwise re-cache the old data for the whole TTL.
+_PORTAL_WRITTEN_KEY = "portal_fragments_stale"
+
+
+def mark_portal_written(session):
+    """For Core statements on session.connection() (no ORM events): portal fragments expire on commit."""
+    session.info[_PORTAL_WRITTEN_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_assignment_writes(session, flush_context):
+    if any(isinstance(obj, PORTAL_DEPENDENCIES) for obj in (*session.new, *session.dirty, *session.deleted)):
+        mark_portal_written(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_assignment_writes(orm_execute_state):
+    # bulk insert/update/delete statements (assignment API, batch approval) skip after_flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, PORTAL_DEPENDENCIES):
+            mark_portal_written(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop(_PORTAL_WRITTEN_KEY, False):
+        invalidate_portal_fragments()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_on_rollback(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_PORTAL_WRITTEN_KEY, None)
@@ -0,0 +1,278 @@
+from collections import defaultdict
+from typing import NamedTuple
+from sqlalchemy import select
+from models import (
+    db, Ensemble, EnsembleSemester, EnsemblePlayer, EnsembleTeacher, EnsembleRepertoire, EnsembleInstrumentation,
+    Instrument, Player, Student, Teacher, Department, Composition, Composer,
+)
+from models.archive import semester_model
+from models.core import format_instrument_counts
+from utils.filter_helpers import apply_common_filters
+
+# the labels of Ensemble.health_check_in's SQL expression (list filter, exports)
+HEALTH_MIN_PLAYERS = "Soubor nesplňuje kritérium minima hráčů."
+HEALTH_OK = "OK"
+HEALTH_GUESTS = "Soubor obsahuje vysoké procento hostů."
+
+
+def _health(assigned, students):
+    if assigned <= 2:
+        return HEALTH_MIN_PLAYERS
+    return HEALTH_OK if students * 100.0 / assigned > 50 else HEALTH_GUESTS
+
+
+# ---------------------------------------------------------
+# ROWS — read-only stand-ins for the ORM objects the export templates render
+# (same attribute names; no __dict__, no identity map, nothing to flush)
+# ---------------------------------------------------------
+
+class InstrumentRow(NamedTuple):
+    id: int
+    name: str
+    abbreviation: str | None
+
+
+class PlayerRow(NamedTuple):
+    id: int
+    first_name: str
+    last_name: str
+    full_name: str
+    student_id: int | None
+    instrument: InstrumentRow | None
+
+
+class SlotRow(NamedTuple):
+    id: int
+    instrument: InstrumentRow | None
+
+
+class SeatRow(NamedTuple):
+    player: PlayerRow | None
+    ensemble_instrumentation: SlotRow | None   # mirrors EnsemblePlayer.ensemble_instrumentation
+
+    @property
+    def player_id(self):
+        return self.player.id if self.player else None
+
+
+class TeacherLinkRow(NamedTuple):
+    teacher_id: int
+    first_name: str
+    last_name: str
+    full_name: str
+    department_id: int | None
+    department: str | None
+    hour_donation: float | None
+
+
+class RepertoireRow(NamedTuple):
+    composition_id: int
+    name: str
+    composer: str | None
+
+
+class EnsembleRow(NamedTuple):
+    id: int
+    name: str
+    instrumentation: str
+    slot_instrument_ids: list
+    complete: bool
+    health: str
+    student_count: int
+    guest_count: int
+    seats: list          # [SeatRow] in player order
+    teachers: list       # [TeacherLinkRow]
+    repertoire: list     # [RepertoireRow]; only filled when asked for
+
+    def player_links_for_semester(self, semester_id=None):
+        return self.seats
+
+
+class DepartmentRow(NamedTuple):
+    name: str
+
+
+class WorkloadRow(NamedTuple):
+    ensemble: EnsembleRow
+    hour_donation: float | None
+
+
+class TeacherRow(NamedTuple):
+    id: int
+    first_name: str
+    last_name: str
+    full_name: str
+    department_id: int | None
+    department: DepartmentRow | None
+    pdf_rows: list       # [WorkloadRow] ordered by ensemble id
+
+
+# ---------------------------------------------------------
+# LOAD — column-only selects, a fixed number per call; archived semesters read the archive tables
+# ---------------------------------------------------------
+
+def filtered_ensemble_ids(semester_id, filters=None):
+    """Ids of the semester's ensembles passing the list filters (all without filters), ordered by name."""
+    query = db.session.query(Ensemble.id).filter(
+        Ensemble.semester_links.any(EnsembleSemester.semester_id == semester_id)
+    )
+    if filters:
+        query = apply_common_filters(query, filters, semester_id)
+    return [ensemble_id for (ensemble_id,) in query.order_by(Ensemble.name)]
+
+
+def load_ensemble_rows(semester_id, ensemble_ids, with_repertoire=False):
+    """EnsembleRows of the given ensembles in the given semester, in the order of `ensemble_ids`."""
+    ensemble_ids = list(ensemble_ids)
+    if not ensemble_ids:
+        return []
+
+    slots = defaultdict(dict)          # ensemble_id -> {slot id: SlotRow}
+    summary_parts = defaultdict(list)  # ensemble_id -> [(abbreviation, weight, position)]
+    for ensemble_id, slot_id, position, instrument_id, name, abbreviation, weight in db.session.execute(
+        select(
+            EnsembleInstrumentation.ensemble_id, EnsembleInstrumentation.id, EnsembleInstrumentation.position,
+            Instrument.id, Instrument.name, Instrument.abbreviation, Instrument.weight,
+        )
+        .join(Instrument, Instrument.id == EnsembleInstrumentation.instrument_id)
+        .where(EnsembleInstrumentation.ensemble_id.in_(ensemble_ids))
+    ):
+        slots[ensemble_id][slot_id] = SlotRow(slot_id, InstrumentRow(instrument_id, name, abbreviation))
+        summary_parts[ensemble_id].append((abbreviation or name, weight, position))
+
+    seat_model = semester_model(EnsemblePlayer, semester_id)
+    seats = defaultdict(list)
+    for ensemble_id, slot_id, player_id, first, last, student_id, student_first, student_last, \
+            instrument_id, instrument_name, instrument_abbreviation in db.session.execute(
+        select(
+            seat_model.ensemble_id, seat_model.ensemble_instrumentation_id,
+            Player.id, Player.first_name, Player.last_name, Player.student_id,
+            Student.first_name, Student.last_name,
+            Instrument.id, Instrument.name, Instrument.abbreviation,
+        )
+        .outerjoin(Player, Player.id == seat_model.player_id)
+        .outerjoin(Student, Student.id == Player.student_id)
+        .outerjoin(Instrument, Instrument.id == Player.instrument_id)
+        .where(seat_model.ensemble_id.in_(ensemble_ids), seat_model.semester_id == semester_id)
+        .order_by(seat_model.ensemble_id, seat_model.player_sort_key, seat_model.id)
+    ):
+        player = None
+        if player_id is not None:
+            # as Player.full_name: the student's name wins for student players
+            full_name = f"{student_last} {student_first}" if student_id else f"{last} {first}"
+            instrument = (
+                InstrumentRow(instrument_id, instrument_name, instrument_abbreviation) if instrument_id else None
+            )
+            player = PlayerRow(player_id, first, last, full_name, student_id, instrument)
+        seats[ensemble_id].append(SeatRow(player, slots[ensemble_id].get(slot_id)))
+
+    teacher_model = semester_model(EnsembleTeacher, semester_id)
+    teachers = defaultdict(list)
+    for ensemble_id, *link in db.session.execute(
+        select(
+            teacher_model.ensemble_id,
+            Teacher.id, Teacher.first_name, Teacher.last_name, Teacher.full_name,
+            Teacher.department_id, Department.name, teacher_model.hour_donation,
+        )
+        .join(Teacher, Teacher.id == teacher_model.teacher_id)
+        .outerjoin(Department, Department.id == Teacher.department_id)
+        .where(teacher_model.ensemble_id.in_(ensemble_ids), teacher_model.semester_id == semester_id)
+        .order_by(teacher_model.ensemble_id, teacher_model.id)
+    ):
+        teachers[ensemble_id].append(TeacherLinkRow(*link))
+
+    repertoire = defaultdict(list)
+    if with_repertoire:
+        repertoire_model = semester_model(EnsembleRepertoire, semester_id)
+        for ensemble_id, composition_id, name, composer_last, composer_first in db.session.execute(
+            select(
+                repertoire_model.ensemble_id, Composition.id, Composition.name,
+                Composer.last_name, Composer.first_name,
+            )
+            .join(Composition, Composition.id == repertoire_model.composition_id)
+            .outerjoin(Composer, Composer.id == Composition.composer_id)
+            .where(repertoire_model.ensemble_id.in_(ensemble_ids), repertoire_model.semester_id == semester_id)
+            .order_by(repertoire_model.ensemble_id, repertoire_model.id)
+        ):
+            composer = f"{composer_last} {composer_first}" if composer_last is not None else None
+            repertoire[ensemble_id].append(RepertoireRow(composition_id, name, composer))
+
+    heads = {
+        ensemble_id: (name, summary)
+        for ensemble_id, name, summary in db.session.execute(
+            select(Ensemble.id, Ensemble.name, Ensemble.instrumentation_summary)
+            .where(Ensemble.id.in_(ensemble_ids))
+        )
+    }
+
+    rows = []
+    for ensemble_id in ensemble_ids:
+        if ensemble_id not in heads:
+            continue
+        name, summary = heads[ensemble_id]
+        ensemble_seats = seats[ensemble_id]
+        assigned = [s for s in ensemble_seats if s.player]
+        students = sum(1 for s in assigned if s.player.student_id is not None)
+        filled_slots = {s.ensemble_instrumentation.id for s in assigned if s.ensemble_instrumentation}
+        rows.append(EnsembleRow(
+            id=ensemble_id,
+            name=name,
+            # as Ensemble.instrumentation: the cached summary, else computed from the entries
+            instrumentation=summary if summary is not None else format_instrument_counts(summary_parts[ensemble_id]),
+            slot_instrument_ids=sorted({slot.instrument.id for slot in slots[ensemble_id].values()}),
+            # as Ensemble.is_complete_in's SQL expression: no slot left without a player
+            complete=all(slot_id in filled_slots for slot_id in slots[ensemble_id]),
+            health=_health(len(assigned), students),
+            student_count=students,
+            guest_count=len(assigned) - students,
+            seats=ensemble_seats,
+            teachers=teachers[ensemble_id],
+            repertoire=repertoire[ensemble_id],
+        ))
+    return rows
+
+
+def teacher_rows(ensembles, filters=None):
+    """
+    TeacherRows of the teachers linked to `ensembles` (EnsembleRows), each with its links as
+    pdf_rows. Honours the teacher / department filters; unordered, callers sort.
+    """
+    teacher_ids = filters["teacher_ids"] if filters else None
+    department_ids = filters["department_ids"] if filters else None
+
+    rows = defaultdict(list)
+    people = {}
+    for ensemble in ensembles:
+        for link in ensemble.teachers:
+            if teacher_ids and link.teacher_id not in teacher_ids:
+                continue
+            if department_ids and link.department_id not in department_ids:
+                continue
+            people[link.teacher_id] = link
+            rows[link.teacher_id].append(WorkloadRow(ensemble, link.hour_donation))
+
+    return [
+        TeacherRow(
+            link.teacher_id, link.first_name, link.last_name, link.full_name, link.department_id,
+            DepartmentRow(link.department) if link.department else None,
+            sorted(rows[teacher_id], key=lambda row: row.ensemble.id),
+        )
+        for teacher_id, link in people.items()
+    ]
+
+
+def teacher_name_key(teacher):
+    return teacher.last_name or "", teacher.first_name or ""
+
+
+def teacher_department_key(teacher):
+    """Department id (no department last), then name."""
+    return (teacher.department_id is None, teacher.department_id or 0) + teacher_name_key(teacher)
+
+
+def semester_teacher_ensemble_ids(semester_id):
+    """Ids of the ensembles with a teacher link in the semester."""
+    teacher_model = semester_model(EnsembleTeacher, semester_id)
+    return db.session.execute(
+        select(teacher_model.ensemble_id).where(teacher_model.semester_id == semester_id).distinct()
+    ).scalars().all()
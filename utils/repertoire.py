@@ -0,0 +1,173 @@
+from math import ceil
+from typing import NamedTuple
+from sqlalchemy import select, func, case, and_, or_
+from sqlalchemy.orm import joinedload
+from models import db, Composition, Composer, CompositionInstrumentation
+from models.core import parse_instrumentation_signature
+
+
+MATCH_EXACT = "exact"
+MATCH_SUBSET = "subset"        # the composition needs only part of the ensemble
+MATCH_SUPERSET = "superset"    # the composition needs a few more players than the ensemble has
+
+MATCH_KINDS = (MATCH_EXACT, MATCH_SUBSET, MATCH_SUPERSET)
+MATCH_LABELS = {
+    MATCH_EXACT: "Přesná shoda",
+    MATCH_SUBSET: "Menší obsazení",
+    MATCH_SUPERSET: "Větší obsazení",
+}
+
+
+class RepertoireMatch(NamedTuple):
+    kind: str
+    missing: dict  # instrument_id -> players the ensemble lacks
+    extra: dict    # instrument_id -> ensemble players without a part
+
+    @property
+    def distance(self):
+        return sum(self.missing.values()) + sum(self.extra.values())
+
+
+class RepertoirePage:
+    """Minimal stand-in for Flask-SQLAlchemy's Pagination over a ranked id list."""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = ceil(total / per_page) if total else 0
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+
+def compare_instrumentation(ensemble_counts, composition_counts, tolerance=0):
+    """
+    Compare two instrument multisets ({instrument_id: count}).
+    Returns a RepertoireMatch, or None when the difference is outside the tolerance
+    or goes both ways (the composition needs instruments the ensemble lacks AND leaves players idle).
+    """
+    missing = {
+        iid: n - ensemble_counts.get(iid, 0)
+        for iid, n in composition_counts.items()
+        if n > ensemble_counts.get(iid, 0)
+    }
+    extra = {
+        iid: n - composition_counts.get(iid, 0)
+        for iid, n in ensemble_counts.items()
+        if n > composition_counts.get(iid, 0)
+    }
+
+    if not missing and not extra:
+        return RepertoireMatch(MATCH_EXACT, missing, extra)
+    if not missing and sum(extra.values()) <= tolerance:
+        return RepertoireMatch(MATCH_SUBSET, missing, extra)
+    if not extra and sum(missing.values()) <= tolerance:
+        return RepertoireMatch(MATCH_SUPERSET, missing, extra)
+    return None
+
+
+def _shared_parts(ensemble_counts, in_band):
+    """
+    Per composition in the size band: parts it shares with the ensemble, i.e. the sum over
+    instruments of least(composition count, ensemble count). Instruments the ensemble lacks
+    are filtered out before grouping, so they add nothing.
+    """
+    parts = (
+        select(
+            CompositionInstrumentation.composition_id,
+            CompositionInstrumentation.instrument_id,
+            func.count().label("n"),
+        )
+        .join(Composition, Composition.id == CompositionInstrumentation.composition_id)
+        .where(in_band, CompositionInstrumentation.instrument_id.in_(list(ensemble_counts)))
+        .group_by(CompositionInstrumentation.composition_id, CompositionInstrumentation.instrument_id)
+        .subquery()
+    )
+    ensemble_n = case(ensemble_counts, value=parts.c.instrument_id, else_=0)
+    return (
+        select(parts.c.composition_id, func.sum(func.least(parts.c.n, ensemble_n)).label("n"))
+        .group_by(parts.c.composition_id)
+        .subquery()
+    )
+
+
+def match_compositions(ensemble, tolerance=1, kinds=MATCH_KINDS, q="", instrument_filter=(), page=1, per_page=25):
+    """
+    Compositions whose instrumentation fits the ensemble's slots, ranked by distance
+    (exact matches first), then composer and name. Returns a RepertoirePage of
+    (Composition, RepertoireMatch) pairs.
+
+    Exact-only lookups hit the signature index; otherwise compositions in the
+    instrumentation_size band [size - tolerance, size + tolerance] are compared in SQL
+    (missing = composition size - shared parts, extra = ensemble size - shared parts),
+    so filtering, ranking and paging happen in the database and only the page is loaded.
+    """
+    if not ensemble.instrumentation_signature:
+        return RepertoirePage([], page, per_page, 0)
+    ensemble_counts = parse_instrumentation_signature(ensemble.instrumentation_signature)
+    size = sum(ensemble_counts.values())
+
+    stmt = select(Composition.id).join(Composer)
+    order_by = [Composer.last_name, Composition.name]
+    if set(kinds) == {MATCH_EXACT}:
+        stmt = stmt.where(Composition.instrumentation_signature == ensemble.instrumentation_signature)
+    else:
+        low = size - tolerance if MATCH_SUBSET in kinds else size
+        high = size + tolerance if MATCH_SUPERSET in kinds else size
+        in_band = Composition.instrumentation_size.between(max(low, 1), high)
+
+        shared = _shared_parts(ensemble_counts, in_band)
+        common = func.coalesce(shared.c.n, 0)
+        missing = Composition.instrumentation_size - common
+        extra = size - common
+
+        # the conditions of compare_instrumentation()
+        accepted = []
+        if MATCH_EXACT in kinds:
+            accepted.append(and_(missing == 0, extra == 0))
+        if MATCH_SUBSET in kinds:
+            accepted.append(and_(missing == 0, extra.between(1, tolerance)))
+        if MATCH_SUPERSET in kinds:
+            accepted.append(and_(extra == 0, missing.between(1, tolerance)))
+
+        stmt = (
+            stmt.outerjoin(shared, shared.c.composition_id == Composition.id)
+            .where(in_band, or_(*accepted))
+        )
+        order_by.insert(0, missing + extra)
+
+    if q:
+        ilike = f"%{q}%"
+        stmt = stmt.where(db.or_(
+            Composition.name.ilike(ilike),
+            Composer.first_name.ilike(ilike),
+            Composer.last_name.ilike(ilike),
+        ))
+
+    if instrument_filter:
+        stmt = stmt.where(Composition.instrumentation_entries.any(
+            CompositionInstrumentation.instrument_id.in_(instrument_filter)
+        ))
+
+    total = db.session.scalar(select(func.count()).select_from(stmt.subquery()))
+    page_ids = db.session.scalars(
+        stmt.order_by(*order_by, Composition.id).limit(per_page).offset((page - 1) * per_page)
+    ).all()
+
+    compositions = {
+        c.id: c
+        for c in Composition.query.options(joinedload(Composition.composer)).filter(Composition.id.in_(page_ids))
+    } if page_ids else {}
+
+    items = []
+    for composition_id in page_ids:
+        composition = compositions.get(composition_id)
+        if composition is not None:
+            match = compare_instrumentation(
+                ensemble_counts, parse_instrumentation_signature(composition.instrumentation_signature), tolerance
+            )
+            items.append((composition, match))
+    return RepertoirePage(items, page, per_page, total)
@@ -0,0 +1,87 @@
+from datetime import date
+from sqlalchemy import delete, insert, select
+from models import db, Semester, SemesterArchive, SemesterSnapshot
+from models.archive import ARCHIVE_MODELS, is_archived
+from utils.portal_loader import mark_portal_written
+from utils.fragment_cache import mark_tables_written
+from utils.semesters import get_semester_timeline
+
+
+class SemesterArchiveError(Exception):
+    pass
+
+
+# ---------------------------------------------------------
+# MOVE
+# ---------------------------------------------------------
+
+def _move(connection, source, target, semester_id):
+    """One statement: WITH moved AS (DELETE ... RETURNING *) INSERT INTO target SELECT * FROM moved."""
+    names = [c.name for c in target.__table__.columns]
+    moved = (
+        delete(source.__table__)
+        .where(source.__table__.c.semester_id == semester_id)
+        .returning(*(source.__table__.c[name] for name in names))
+        .cte("moved")
+    )
+    stmt = insert(target.__table__).from_select(names, select(*(moved.c[name] for name in names)))
+    return connection.execute(stmt).rowcount
+
+
+def archive_semester(semester):
+    """
+    Move the semester's assignment rows into the archive tables and mark it archived.
+    Only semesters that already ended and are not the current one can be archived.
+    Returns {live table name: rows moved}. The caller commits.
+    """
+    if is_archived(semester.id):
+        raise SemesterArchiveError(f"Semestr {semester.name} je již archivován.")
+    if not semester.end_date or semester.end_date >= date.today():
+        raise SemesterArchiveError(f"Semestr {semester.name} ještě neskončil.")
+    if get_semester_timeline().current(date.today()) == semester.id:
+        raise SemesterArchiveError(f"Semestr {semester.name} je aktuální semestr.")
+
+    connection = db.session.connection()
+    counts = {
+        source.__tablename__: _move(connection, source, target, semester.id)
+        for source, target in ARCHIVE_MODELS.items()
+    }
+    db.session.add(SemesterArchive(semester_id=semester.id, row_counts=counts))
+    db.session.flush()
+    mark_portal_written(db.session)
+    mark_tables_written(db.session, *(source.__table__ for source in ARCHIVE_MODELS))
+    return counts
+
+
+def restore_semester(semester):
+    """
+    Move an archived semester's rows back into the live tables and drop its snapshot, which
+    would go stale once the semester is editable again. The caller commits.
+    """
+    archive = db.session.get(SemesterArchive, semester.id)
+    if archive is None:
+        raise SemesterArchiveError(f"Semestr {semester.name} není archivován.")
+
+    connection = db.session.connection()
+    counts = {
+        source.__tablename__: _move(connection, target, source, semester.id)
+        for source, target in ARCHIVE_MODELS.items()
+    }
+    db.session.delete(archive)
+    db.session.execute(delete(SemesterSnapshot).where(SemesterSnapshot.semester_id == semester.id))
+    db.session.flush()
+    mark_portal_written(db.session)
+    mark_tables_written(db.session, *(source.__table__ for source in ARCHIVE_MODELS))
+    return counts
+
+
+def archivable_semesters():
+    """Ended, not current and not yet archived semesters, oldest first."""
+    current_id = get_semester_timeline().current(date.today())
+    query = Semester.query.filter(
+        Semester.end_date < date.today(),
+        Semester.id.notin_(select(SemesterArchive.semester_id)),
+    )
+    if current_id:
+        query = query.filter(Semester.id != current_id)
+    return query.order_by(Semester.start_date).all()
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from sqlalchemy.orm import joinedload
+from models import db
+from models.core import Instrument
+from models.ensembles import EnsembleSemester, EnsemblePlayer
+from models.players import Player
+from models.students import StudentSubjectEnrollment
+from models.archive import semester_model
+
+
+def _semester_payload(semester):
+    return None if not semester else {"id": semester.id, "name": semester.name}
+
+
+def _player_payload(player, active_student_ids):
+    instr = player.instrument
+    return {
+        "player_id": player.id,
+        "full_name": player.full_name,
+        "is_guest": player.is_guest,
+        "student_id": player.student_id,
+
+        "instrument": None if not instr else {
+            "id": instr.id,
+            "name": instr.name,
+            "name_en": instr.name_en,
+            "abbr": instr.abbreviation,
+            "normalized_abbr": instr.normalized_abbr,
+            "section": None if not instr.instrument_section else {
+                "id": instr.instrument_section.id,
+                "name": instr.instrument_section.name,
+            },
+            "group": None if not instr.instrument_group else {
+                "id": instr.instrument_group.id,
+                "name": instr.instrument_group.name,
+            },
+        },
+
+        "has_active_subject_in_upcoming_semester": bool(
+            player.student_id and player.student_id in active_student_ids
+        ),
+    }
+
+
+def load_semester_move_info(ensemble_ids, current_semester, upcoming_semester):
+    """
+    Move-info payloads ({ensemble_id: payload}) for many ensembles at once:
+    semester links, players and upcoming enrollments are each one set-based query,
+    however many ensembles are asked for. Archived semesters are read from the archive tables.
+    """
+    ensemble_ids = list(dict.fromkeys(ensemble_ids))
+    current = _semester_payload(current_semester)
+
+    if not upcoming_semester:
+        return {
+            ensemble_id: {
+                "ensemble_id": ensemble_id,
+                "current_semester": current,
+                "upcoming_semester": None,
+                "players": [],
+                "message": "No upcoming semester found.",
+            }
+            for ensemble_id in ensemble_ids
+        }
+
+    linked_ids = set()
+    if ensemble_ids:
+        linked_ids = {
+            r[0] for r in (
+                db.session.query(EnsembleSemester.ensemble_id)
+                .filter(
+                    EnsembleSemester.ensemble_id.in_(ensemble_ids),
+                    EnsembleSemester.semester_id == current_semester.id,
+                )
+                .distinct()
+            )
+        }
+
+    players_by_ensemble = defaultdict(list)
+    if linked_ids:
+        seats = semester_model(EnsemblePlayer, current_semester.id)
+        rows = (
+            db.session.query(seats.ensemble_id, Player)
+            .join(Player, seats.player_id == Player.id)
+            .options(
+                joinedload(Player.instrument).joinedload(Instrument.instrument_section),
+                joinedload(Player.instrument).joinedload(Instrument.instrument_group),
+            )
+            .filter(
+                seats.ensemble_id.in_(linked_ids),
+                seats.semester_id == current_semester.id,
+            )
+            .order_by(seats.ensemble_id, Player.last_name.asc(), Player.first_name.asc())
+            .all()
+        )
+        for ensemble_id, player in rows:
+            players_by_ensemble[ensemble_id].append(player)
+
+    # "has any subject enrollment in upcoming semester", for every student in the batch
+    student_ids = {p.student_id for players in players_by_ensemble.values() for p in players if p.student_id}
+    active_student_ids = set()
+    if student_ids:
+        enrollments = semester_model(StudentSubjectEnrollment, upcoming_semester.id)
+        active_student_ids = {
+            r[0] for r in (
+                db.session.query(enrollments.student_id)
+                .filter(
+                    enrollments.semester_id == upcoming_semester.id,
+                    enrollments.student_id.in_(student_ids),
+                )
+                .distinct()
+            )
+        }
+
+    upcoming = _semester_payload(upcoming_semester)
+    return {
+        ensemble_id: {
+            "ensemble_id": ensemble_id,
+            "current_semester": current,
+            "upcoming_semester": upcoming,
+            "ensemble_is_in_current_semester": ensemble_id in linked_ids,
+            "players": [_player_payload(p, active_student_ids) for p in players_by_ensemble[ensemble_id]],
+        }
+        for ensemble_id in ensemble_ids
+    }
+
+
+def carry_over_warnings(payload):
+    """Counts the rollover page shows per row: students without a subject next semester, guests."""
+    players = payload.get("players") or []
+    return {
+        "students_without_subject": sum(
+            1 for p in players if p["student_id"] and not p["has_active_subject_in_upcoming_semester"]
+        ),
+        "guests": sum(1 for p in players if p["is_guest"]),
+    }
@@ -0,0 +1,195 @@
+import unicodedata
+from datetime import datetime
+from models import db, SemesterSnapshot
+from models.archive import is_archived
+from utils.read_models import (
+    EnsembleRow, SeatRow, SlotRow, PlayerRow, InstrumentRow, TeacherLinkRow, RepertoireRow,
+    filtered_ensemble_ids, load_ensemble_rows, teacher_rows,
+)
+
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+# ---------------------------------------------------------
+# BUILD — the read models of every ensemble of the semester, as JSON
+# ---------------------------------------------------------
+
+def _dump_instrumented(row):
+    """A PlayerRow / SlotRow as a dict, with its InstrumentRow nested as a dict too."""
+    if row is None:
+        return None
+    return {**row._asdict(), "instrument": row.instrument._asdict() if row.instrument else None}
+
+
+def _dump_ensemble(ensemble):
+    return {
+        "id": ensemble.id,
+        "name": ensemble.name,
+        "instrumentation": ensemble.instrumentation,
+        "slot_instrument_ids": ensemble.slot_instrument_ids,
+        "complete": ensemble.complete,
+        "health": ensemble.health,
+        "student_count": ensemble.student_count,
+        "guest_count": ensemble.guest_count,
+        "seats": [
+            {
+                "slot": _dump_instrumented(seat.ensemble_instrumentation),
+                "player": _dump_instrumented(seat.player),
+            }
+            for seat in ensemble.seats
+        ],
+        "teachers": [link._asdict() for link in ensemble.teachers],
+        "repertoire": [item._asdict() for item in ensemble.repertoire],
+    }
+
+
+def build_semester_snapshot(semester_id):
+    """The resolved state of a semester as a JSON-serializable dict (see SemesterSnapshotView)."""
+    ensembles = load_ensemble_rows(semester_id, filtered_ensemble_ids(semester_id), with_repertoire=True)
+    return {
+        "version": SNAPSHOT_VERSION,
+        "semester_id": semester_id,
+        "ensembles": [_dump_ensemble(e) for e in ensembles],
+    }
+
+
+def snapshot_semester(semester, replace=False):
+    """
+    Store the snapshot of an archived semester. Only archived semesters are read-only, so
+    nothing can change under their snapshot. Returns the SemesterSnapshot; the caller commits.
+    """
+    if not is_archived(semester.id):
+        raise SnapshotError(f"Semestr {semester.name} není archivován (flask archive-semester).")
+
+    existing = db.session.get(SemesterSnapshot, semester.id)
+    if existing is not None and not replace:
+        raise SnapshotError(f"Semestr {semester.name} už má snapshot (použijte --replace).")
+
+    payload = build_semester_snapshot(semester.id)
+    if existing is None:
+        existing = SemesterSnapshot(semester_id=semester.id)
+        db.session.add(existing)
+    existing.version = SNAPSHOT_VERSION
+    existing.payload = payload
+    existing.created_at = datetime.utcnow()
+    db.session.flush()
+    return existing
+
+
+# ---------------------------------------------------------
+# READ — back into the read models the live exports render
+# ---------------------------------------------------------
+
+def _read_instrument(data):
+    return InstrumentRow(**data) if data else None
+
+
+def _read_ensemble(data):
+    seats = []
+    for seat in data["seats"]:
+        slot, player = seat["slot"], seat["player"]
+        seats.append(SeatRow(
+            player=PlayerRow(**{**player, "instrument": _read_instrument(player["instrument"])}) if player else None,
+            ensemble_instrumentation=SlotRow(slot["id"], _read_instrument(slot["instrument"])) if slot else None,
+        ))
+    return EnsembleRow(
+        data["id"], data["name"], data["instrumentation"], data["slot_instrument_ids"], data["complete"],
+        data["health"], data["student_count"], data["guest_count"], seats,
+        [TeacherLinkRow(**link) for link in data["teachers"]],
+        [RepertoireRow(**item) for item in data["repertoire"]],
+    )
+
+
+def _fold(text):
+    """Lower-case and strip accents, like the SQL search (unaccent + lower)."""
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", (text or "").lower()) if not unicodedata.combining(c)
+    )
+
+
+class SemesterSnapshotView:
+    """Read side of a SemesterSnapshot: filtering mirrors utils.filter_helpers.apply_common_filters."""
+
+    def __init__(self, snapshot):
+        self.semester_id = snapshot.semester_id
+        self.created_at = snapshot.created_at
+        self.ensembles = [_read_ensemble(e) for e in snapshot.payload["ensembles"]]
+
+    def _matches(self, ensemble, filters):
+        if filters["instrument_ids"] and not set(filters["instrument_ids"]) & set(ensemble.slot_instrument_ids):
+            return False
+        if filters["teacher_ids"] and not any(t.teacher_id in filters["teacher_ids"] for t in ensemble.teachers):
+            return False
+        if filters["department_ids"] and not any(
+            t.department_id in filters["department_ids"] for t in ensemble.teachers
+        ):
+            return False
+        if filters["incomplete_filter"] in ("1", "0") and ensemble.complete == (filters["incomplete_filter"] == "1"):
+            return False
+        if filters["health_filter"] and ensemble.health != filters["health_filter"]:
+            return False
+        if filters["search_query"]:
+            needle = _fold(filters["search_query"])
+            names = [ensemble.name] + [
+                name
+                for seat in ensemble.seats if seat.player
+                for name in (
+                    seat.player.full_name,
+                    " ".join(reversed(seat.player.full_name.split(" ", 1))),
+                )
+            ]
+            if not any(needle in _fold(name) for name in names):
+                return False
+        return True
+
+    def filter_ensembles(self, filters):
+        """Ensembles passing the list filters, ordered by name."""
+        return [e for e in self.ensembles if self._matches(e, filters)]
+
+    @staticmethod
+    def sort_ensembles(ensembles, sort_by, descending=False):
+        """The ensemble list's sort options (name, teacher, health, complete); ties keep the name order."""
+        if sort_by == "teacher":
+            # the first teacher's last name; ensembles without a teacher last, like NULLs in SQL
+            def key(e):
+                return (not e.teachers, _fold(e.teachers[0].last_name) if e.teachers else "")
+        elif sort_by == "health":
+            def key(e):
+                return e.health
+        elif sort_by == "complete":
+            def key(e):
+                return e.complete
+        else:
+            def key(e):
+                return _fold(e.name)
+        return sorted(ensembles, key=key, reverse=descending)
+
+    def workload_rows(self, filters):
+        """Rows of the CSV / XLSX workload export, as utils.export_helpers.teacher_workload_query."""
+        rows = [
+            (link.department, link.last_name, link.first_name, ensemble.name, link.hour_donation)
+            for ensemble in self.filter_ensembles(filters)
+            for link in ensemble.teachers
+            if (not filters["teacher_ids"] or link.teacher_id in filters["teacher_ids"])
+            and (not filters["department_ids"] or link.department_id in filters["department_ids"])
+        ]
+        rows.sort(key=lambda r: (r[0] is None, _fold(r[0]), _fold(r[1]), _fold(r[2]), _fold(r[3])))
+        return [("Bez katedry" if department is None else department, *rest) for department, *rest in rows]
+
+    def teachers(self, filters):
+        """TeacherRows with their filtered ensembles as pdf_rows, for the by-teacher and hours PDFs."""
+        return teacher_rows(self.filter_ensembles(filters), filters)
+
+
+def load_semester_snapshot(semester_id):
+    """SemesterSnapshotView of the semester, or None when it has no (current-version) snapshot or is not archived."""
+    if not semester_id:
+        return None
+    snapshot = db.session.get(SemesterSnapshot, semester_id)
+    if snapshot is None or snapshot.version != SNAPSHOT_VERSION or not is_archived(semester_id):
+        return None
+    return SemesterSnapshotView(snapshot)
@@ -1,19 +1,156 @@
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import NamedTuple
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from models import Semester, db, AcademicYear
 import re
 
 
-def get_current_or_upcoming_semester():
-    now = datetime.utcnow()  # safer if DB is UTC
-    current = Semester.query.filter(
-        Semester.start_date <= now,
-        Semester.end_date >= now
-    ).first()
-    if current:
-        return current
-
-    return (Semester.query
-            .filter(Semester.start_date > now)
-            .order_by(Semester.start_date.asc())
-            .first())
+class SemesterSpan(NamedTuple):
+    id: int
+    start_date: date
+    end_date: date | None
+
+
+class SemesterTimeline:
+    """
+    All semesters sorted by start date, answering current / previous / upcoming /
+    containing-date lookups by bisect instead of a query per call.
+    Lookups return semester ids; use `db.session.get(Semester, id)` for the ORM row.
+    """
+
+    def __init__(self, spans):
+        self._by_start = sorted((s for s in spans if s.start_date), key=lambda s: (s.start_date, s.id))
+        self._starts = [s.start_date for s in self._by_start]
+        self._by_end = sorted((s for s in spans if s.end_date), key=lambda s: (s.end_date, s.id))
+        self._ends = [s.end_date for s in self._by_end]
+        self._by_id = {s.id: s for s in spans}
+
+    def get(self, semester_id):
+        return self._by_id.get(semester_id)
+
+    def containing(self, day):
+        """Latest-starting semester with start_date <= day <= end_date."""
+        idx = bisect_right(self._starts, day) - 1
+        while idx >= 0:
+            span = self._by_start[idx]
+            if span.end_date and span.end_date >= day:
+                return span.id
+            idx -= 1
+        return None
+
+    def latest_started(self, day):
+        idx = bisect_right(self._starts, day) - 1
+        return self._by_start[idx].id if idx >= 0 else None
+
+    def first(self):
+        return self._by_start[0].id if self._by_start else None
+
+    def current(self, day):
+        """Semester containing `day`; between semesters the most recently started; else the first one."""
+        return self.containing(day) or self.latest_started(day) or self.first()
+
+    def upcoming_after(self, day):
+        """First semester starting strictly after `day`."""
+        idx = bisect_right(self._starts, day)
+        return self._by_start[idx].id if idx < len(self._by_start) else None
+
+    def next_after(self, semester_id):
+        """First semester starting after the given semester ends."""
+        span = self._by_id.get(semester_id)
+        if not span or not span.end_date:
+            return None
+        return self.upcoming_after(span.end_date)
+
+    def previous_before(self, semester_id):
+        """Semester with the latest end_date strictly before the given semester starts."""
+        span = self._by_id.get(semester_id)
+        if not span or not span.start_date:
+            return None
+        idx = bisect_left(self._ends, span.start_date) - 1
+        return self._by_end[idx].id if idx >= 0 else None
+
+
+_timeline_lock = threading.Lock()
+_timeline_cache = {"timeline": None, "loaded_at": 0.0, "generation": 0}
+
+
+def get_semester_timeline() -> SemesterTimeline:
+    """
+    Process-wide timeline, rebuilt after a Semester row is written in this process.
+    SEMESTER_TIMELINE_TTL (seconds) bounds staleness for writes made by other
+    processes (e.g. `flask oracle-student-update`).
+    """
+    ttl = current_app.config.get("SEMESTER_TIMELINE_TTL", 300)
+    timeline = _timeline_cache["timeline"]
+    if timeline is not None and time.monotonic() - _timeline_cache["loaded_at"] < ttl:
+        return timeline
+
+    with _timeline_lock:
+        timeline = _timeline_cache["timeline"]
+        if timeline is not None and time.monotonic() - _timeline_cache["loaded_at"] < ttl:
+            return timeline
+
+        generation = _timeline_cache["generation"]
+        rows = db.session.query(Semester.id, Semester.start_date, Semester.end_date).all()
+        timeline = SemesterTimeline([SemesterSpan(*row) for row in rows])
+        # a commit that landed while loading may not be in `rows`; serve it but don't cache it
+        if _timeline_cache["generation"] == generation:
+            _timeline_cache["timeline"] = timeline
+            _timeline_cache["loaded_at"] = time.monotonic()
+        return timeline
 
+
+def invalidate_semester_timeline():
+    _timeline_cache["generation"] += 1
+    _timeline_cache["timeline"] = None
+
+
+_SEMESTER_WRITTEN_KEY = "semester_timeline_stale"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_semester_writes(session, flush_context):
+    if any(isinstance(obj, Semester) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_SEMESTER_WRITTEN_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_semester_commit(session):
+    # only committed rows may reach the cache; other requests must not rebuild from uncommitted ones
+    if session.info.pop(_SEMESTER_WRITTEN_KEY, False):
+        invalidate_semester_timeline()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_semester_writes_on_rollback(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_SEMESTER_WRITTEN_KEY, None)
+
+
+def _semester_or_none(semester_id):
+    return db.session.get(Semester, semester_id) if semester_id else None
+
+
+def get_next_semester(semester):
+    """Semester following `semester` (first one starting after it ends)."""
+    if not semester:
+        return None
+    return _semester_or_none(get_semester_timeline().next_after(semester.id))
+
+
+def get_previous_semester(semester):
+    """Semester immediately preceding `semester` (latest one ending before it starts)."""
+    if not semester:
+        return None
+    return _semester_or_none(get_semester_timeline().previous_before(semester.id))
+
+
+def get_current_or_upcoming_semester():
+    today = date.today()
+    timeline = get_semester_timeline()
+    return _semester_or_none(timeline.containing(today) or timeline.upcoming_after(today))
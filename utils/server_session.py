@@ -0,0 +1,243 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import Signer, BadSignature
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from werkzeug.datastructures import CallbackDict
+from models import db, ServerSession
+
+
+def _utcnow():
+    # naive UTC, matching the DateTime columns used across the models
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Dict-like session whose payload lives in a store; only `sid` goes to the cookie."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+# ---------------------------------------------------------
+# STORES
+# ---------------------------------------------------------
+
+class SqlAlchemySessionStore:
+    """Sessions in the main Postgres database (`server_sessions` table)."""
+
+    def load(self, sid):
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(ServerSession.data).where(
+                    ServerSession.id == sid,
+                    ServerSession.expires_at > _utcnow(),
+                )
+            ).scalar()
+
+    def save(self, sid, data, expires_at):
+        stmt = pg_insert(ServerSession.__table__).values(id=sid, data=data, expires_at=expires_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ServerSession.id],
+            set_={"data": stmt.excluded.data, "expires_at": stmt.excluded.expires_at},
+        )
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(delete(ServerSession).where(ServerSession.id == sid))
+
+    def cleanup(self):
+        with db.engine.begin() as conn:
+            return conn.execute(delete(ServerSession).where(ServerSession.expires_at <= _utcnow())).rowcount
+
+
+class SqliteSessionStore:
+    """Sessions in a local SQLite file — for single-host deployments without extra DB load."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS server_sessions ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_server_sessions_expires_at ON server_sessions (expires_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def load(self, sid):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM server_sessions WHERE id = ? AND expires_at > ?",
+                (sid, _utcnow().isoformat()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, sid, data, expires_at):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO server_sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (sid, data, expires_at.isoformat()),
+            )
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM server_sessions WHERE id = ?", (sid,))
+
+    def cleanup(self):
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM server_sessions WHERE expires_at <= ?", (_utcnow().isoformat(),)
+            ).rowcount
+
+
+# ---------------------------------------------------------
+# SESSION INTERFACE
+# ---------------------------------------------------------
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps only a signed opaque session id in the cookie. The store is written
+    (and the cookie re-sent) only when the session was actually modified.
+    Expired rows are purged by a background thread at most every `cleanup_interval` seconds.
+    """
+    serializer = session_json_serializer
+    salt = "server-side-session"
+
+    def __init__(self, store, cleanup_interval=600):
+        self.store = store
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = time.monotonic()
+        self._cleanup_lock = threading.Lock()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+
+            if sid:
+                data = self.store.load(sid)
+                if data is not None:
+                    try:
+                        return ServerSideSession(self.serializer.loads(data), sid=sid)
+                    except ValueError:
+                        pass
+
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        if not session.modified:
+            return
+
+        expires = self.get_expiration_time(app, session)
+        store_expires = (
+            expires.astimezone(timezone.utc).replace(tzinfo=None) if expires
+            else _utcnow() + app.config["SESSION_STORE_TTL"]
+        )
+        self.store.save(session.sid, self.serializer.dumps(dict(session)), store_expires)
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=expires,
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+        self._maybe_cleanup(app)
+
+    def _maybe_cleanup(self, app):
+        if time.monotonic() - self._last_cleanup < self.cleanup_interval:
+            return
+        if not self._cleanup_lock.acquire(blocking=False):
+            return
+        self._last_cleanup = time.monotonic()
+
+        def run():
+            try:
+                with app.app_context():
+                    removed = self.store.cleanup()
+                app.logger.info("Session cleanup: removed %s expired session(s).", removed)
+            except Exception as e:
+                app.logger.warning("Session cleanup failed: %s", e)
+            finally:
+                self._cleanup_lock.release()
+
+        threading.Thread(target=run, name="session-cleanup", daemon=True).start()
+
+
+def init_session_backend(app):
+    """Install the configured session backend ("cookie" keeps Flask's signed-cookie sessions)."""
+    backend = app.config.get("SESSION_BACKEND", "cookie")
+
+    if backend == "sqlalchemy":
+        store = SqlAlchemySessionStore()
+    elif backend == "sqlite":
+        path = app.config.get("SESSION_SQLITE_PATH") or os.path.join(app.instance_path, "sessions.sqlite3")
+        store = SqliteSessionStore(path)
+    else:
+        if backend != "cookie":
+            app.logger.warning("Unknown SESSION_BACKEND=%r, using signed cookies.", backend)
+        return None
+
+    app.session_interface = ServerSideSessionInterface(
+        store,
+        cleanup_interval=app.config.get("SESSION_CLEANUP_INTERVAL", 600),
+    )
+    app.logger.info("Server-side sessions enabled (backend=%s).", backend)
+    return store
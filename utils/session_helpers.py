@@ -1,6 +1,7 @@
 from flask import session
 from datetime import date
-from models import Semester
+from models import Semester, db
+from utils.semesters import get_semester_timeline, get_previous_semester
 
 
 # ---------------------------------------------------------
@@ -10,31 +11,19 @@ from models import Semester
 def get_or_set_current_semester():
     sid = session.get("semester_id")
     if sid:
-        current = Semester.query.get(sid)
+        # identity map: repeated calls within one request don't hit the DB again
+        current = db.session.get(Semester, sid)
         if current:
             return current
 
-    today = date.today()
+    # 1. Ideal match: the semester that contains today's date
+    # 2. Fallback: between semesters, the most recently started one
+    # 3. Ultimate fallback: no past/current semesters exist, the very first upcoming one
+    current_id = get_semester_timeline().current(date.today())
 
-    # 1. Ideal Match: Look for the semester that strictly contains today's date
-    current = Semester.query.filter(
-        Semester.start_date <= today,
-        Semester.end_date >= today
-    ).first()
-
-    # 2. Fallback: If we are exactly between semesters, grab the most recently started one
-    if not current:
-        current = Semester.query.filter(
-            Semester.start_date <= today
-        ).order_by(Semester.start_date.desc()).first()
-
-    # 3. Ultimate Fallback: If no past/current semesters exist, get the very first upcoming one
-    if not current:
-        current = Semester.query.order_by(Semester.start_date.asc()).first()
-
-    if current:
-        session["semester_id"] = current.id
-        return current
+    if current_id:
+        session["semester_id"] = current_id
+        return db.session.get(Semester, current_id)
 
     return None
 
@@ -52,42 +41,9 @@ def get_or_set_current_semester_id():
 def get_or_set_previous_semester():
     """
     Returns the semester object immediately preceding the current semester.
-    Maintains the get_or_set naming convention.
+    Resolved from the in-memory semester timeline; nothing is stored in the session.
     """
-    current_id = get_or_set_current_semester_id()
-    if not current_id:
-        return None
-
-    current = Semester.query.get(current_id)
-    if not current or not current.start_date:
-        return None
-
-    # Check cache first
-    cached_id = session.get("previous_semester_id")
-    if cached_id:
-        previous = Semester.query.get(cached_id)
-        # Ensure it actually precedes the current one
-        if previous and previous.end_date and previous.end_date < current.start_date:
-            return previous
-        else:
-            session.pop("previous_semester_id", None)
-
-    # Database query fallback
-    previous = (
-        Semester.query
-        .filter(
-            Semester.end_date.isnot(None),
-            Semester.end_date < current.start_date
-        )
-        .order_by(Semester.end_date.desc())
-        .first()
-    )
-
-    if previous:
-        session["previous_semester_id"] = previous.id
-        return previous
-
-    return None
+    return get_previous_semester(get_or_set_current_semester())
 
 
 def get_or_set_previous_semester_id():
@@ -104,31 +60,11 @@ def get_upcoming_semester():
     """
     Fetches the next chronological semester starting after today.
     """
-    today = date.today()
-
-    cached_id = session.get("upcoming_semester_id")
-    if cached_id:
-        upcoming = Semester.query.get(cached_id)
-        if upcoming and upcoming.start_date and upcoming.start_date > today:
-            return upcoming
-        else:
-            session.pop("upcoming_semester_id", None)
-
-    upcoming = (
-        Semester.query
-        .filter(Semester.start_date > today)
-        .order_by(Semester.start_date.asc())
-        .first()
-    )
-
-    if upcoming:
-        session["upcoming_semester_id"] = upcoming.id
-        return upcoming
-
-    return None
+    upcoming_id = get_semester_timeline().upcoming_after(date.today())
+    return db.session.get(Semester, upcoming_id) if upcoming_id else None
 
 
 def get_upcoming_semester_id():
     """Returns the ID of the upcoming semester."""
-    upcoming = get_upcoming_semester()
-    return upcoming.id if upcoming else None
\ No newline at end of file
+    return get_semester_timeline().upcoming_after(date.today())
+
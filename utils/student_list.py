@@ -0,0 +1,75 @@
+from collections import defaultdict
+from typing import NamedTuple
+from sqlalchemy import and_
+from sqlalchemy.orm import contains_eager
+from models import db, Ensemble, EnsemblePlayer, EnsembleSemester, Player, StudentSubjectEnrollment, Subject
+from models.archive import semester_model
+
+
+class StudentListRow(NamedTuple):
+    enrollments: list   # StudentSubjectEnrollment (or its archive twin) in the semester, subject loaded, ordered by subject weight/name
+    ensembles: list     # (ensemble_id, name) the student plays in that semester
+    erasmus: bool
+
+    @property
+    def subjects(self):
+        return [e.subject for e in self.enrollments]
+
+    @property
+    def classified(self):
+        return [e for e in self.enrollments if e.classification]
+
+
+EMPTY_ROW = StudentListRow([], [], False)
+
+
+def load_student_list_rows(students, semester_id):
+    """
+    Per-student semester data for a page of the student list: {student_id: StudentListRow}.
+    One query for enrollments (with subjects and the Erasmus flag) and one for ensembles,
+    instead of the session-dependent Student properties per row; archived semesters read
+    the archive tables.
+    """
+    student_ids = [s.id for s in students]
+    if not student_ids or not semester_id:
+        return {}
+
+    enrollment_model = semester_model(StudentSubjectEnrollment, semester_id)
+    seats = semester_model(EnsemblePlayer, semester_id)
+
+    enrollments = defaultdict(list)
+    for enrollment in (
+        enrollment_model.query
+        .join(Subject, Subject.id == enrollment_model.subject_id)
+        .options(contains_eager(enrollment_model.subject))
+        .filter(
+            enrollment_model.student_id.in_(student_ids),
+            enrollment_model.semester_id == semester_id,
+        )
+        .order_by(Subject.weight.asc().nullslast(), Subject.name.asc())
+    ):
+        enrollments[enrollment.student_id].append(enrollment)
+
+    ensembles = defaultdict(list)
+    for student_id, ensemble_id, name in (
+        db.session.query(Player.student_id, Ensemble.id, Ensemble.name)
+        .join(seats, seats.player_id == Player.id)
+        .join(Ensemble, Ensemble.id == seats.ensemble_id)
+        .join(EnsembleSemester, and_(
+            EnsembleSemester.ensemble_id == Ensemble.id,
+            EnsembleSemester.semester_id == semester_id,
+        ))
+        .filter(Player.student_id.in_(student_ids), seats.semester_id == semester_id)
+        .distinct()
+        .order_by(Player.student_id, Ensemble.name)
+    ):
+        ensembles[student_id].append((ensemble_id, name))
+
+    return {
+        student_id: StudentListRow(
+            enrollments[student_id],
+            ensembles[student_id],
+            any(e.erasmus for e in enrollments[student_id]),
+        )
+        for student_id in student_ids
+    }
@@ -0,0 +1,81 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from flask import Response, stream_with_context
+
+EXPORT_FORMATS = ("csv", "xlsx")
+YIELD_PER = 500
+CHUNK_SIZE = 64 * 1024
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def xlsx_available():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _filename(prefix, fmt):
+    now = datetime.now(ZoneInfo("Europe/Prague"))
+    return f"{prefix}_{now:%Y%m%d_%H%M}.{fmt}"
+
+
+def _attachment_headers(filename):
+    return {"Content-Disposition": f"attachment; filename={filename}; filename*=UTF-8''{filename}"}
+
+
+def _csv_chunks(header, rows):
+    """UTF-8 with BOM and ";" so Czech Excel opens it directly; flushed every ~64 kB."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _xlsx_chunks(header, rows, sheet_title):
+    """
+    openpyxl write-only workbook: rows go straight to a temp file, the zip is assembled
+    on save into another temp file, which is then streamed — memory stays flat.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(list(header))
+    for row in rows:
+        sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as fh:
+        workbook.save(fh)
+        fh.seek(0)
+        while chunk := fh.read(CHUNK_SIZE):
+            yield chunk
+
+
+def tabular_response(fmt, filename_prefix, header, rows, sheet_title="Export"):
+    """
+    Streaming CSV / XLSX download of `rows` (any iterable of sequences, typically a
+    Query with yield_per). The generator runs inside the request context.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    filename = _filename(filename_prefix, fmt)
+    if fmt == "csv":
+        body, mimetype = _csv_chunks(header, rows), "text/csv; charset=utf-8"
+    else:
+        body, mimetype = _xlsx_chunks(header, rows, sheet_title), XLSX_MIMETYPE
+
+    return Response(stream_with_context(body), mimetype=mimetype, headers=_attachment_headers(filename))
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from sqlalchemy import select, exists, and_, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+from models import db, Ensemble, EnsembleSemester, EnsembleTeacher, Teacher
+from models.ensembles import recompute_hour_donations
+from models.archive import ensure_not_archived, semester_model
+from utils.portal_loader import mark_portal_written
+from utils.fragment_cache import mark_tables_written
+
+
+class TeacherCarryOverReport:
+    def __init__(self, source_semester, target_semester, dry_run):
+        self.source_semester = source_semester
+        self.target_semester = target_semester
+        self.dry_run = dry_run
+        self.ensemble_count = 0
+        self.created = 0
+        self.additions = defaultdict(list)  # (ensemble_id, ensemble name) -> [teacher full name]
+
+    def as_dict(self):
+        return {
+            "dry_run": self.dry_run,
+            "source_semester": {"id": self.source_semester.id, "name": self.source_semester.name},
+            "target_semester": {"id": self.target_semester.id, "name": self.target_semester.name},
+            "ensemble_count": self.ensemble_count,
+            "created": self.created,
+            "ensembles": [
+                {"ensemble_id": ensemble_id, "name": name, "teachers": teachers}
+                for (ensemble_id, name), teachers in self.additions.items()
+            ],
+        }
+
+
+def continuing_ensemble_ids(target_semester, query=None):
+    """Ids of ensembles linked to the target semester (optionally narrowed by an Ensemble query)."""
+    query = query if query is not None else db.session.query(Ensemble)
+    return [
+        r[0] for r in (
+            query.with_entities(Ensemble.id)
+            .filter(Ensemble.semester_links.any(EnsembleSemester.semester_id == target_semester.id))
+            .order_by(Ensemble.id)
+        )
+    ]
+
+
+def _source_links(source_semester_id, target_semester_id, ensemble_ids):
+    """
+    Source-semester links whose (ensemble, teacher) is not yet in the target semester; an
+    archived source semester is read from the archive table.
+    """
+    source = semester_model(EnsembleTeacher, source_semester_id)
+    target = aliased(EnsembleTeacher)
+    return (
+        select(source.ensemble_id, source.teacher_id)
+        .where(
+            source.semester_id == source_semester_id,
+            source.ensemble_id.in_(ensemble_ids),
+            source.teacher_id.isnot(None),
+            ~exists().where(and_(
+                target.ensemble_id == source.ensemble_id,
+                target.teacher_id == source.teacher_id,
+                target.semester_id == target_semester_id,
+            )),
+        )
+    )
+
+
+def carry_over_teachers(source_semester, target_semester, ensemble_ids, dry_run=False):
+    """
+    Copy teacher links of `ensemble_ids` from the source to the target semester with one
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING, then re-split hour donations of the touched
+    ensembles. The dry run only reports the diff. The caller commits.
+    Raises ArchivedSemesterError when the target semester is archived.
+    """
+    ensure_not_archived(target_semester.id)
+    report = TeacherCarryOverReport(source_semester, target_semester, dry_run)
+    ensemble_ids = list(ensemble_ids)
+    report.ensemble_count = len(ensemble_ids)
+    if not ensemble_ids:
+        return report
+
+    pending = _source_links(source_semester.id, target_semester.id, ensemble_ids).subquery()
+    if dry_run:
+        rows = db.session.execute(
+            select(pending.c.ensemble_id, pending.c.teacher_id)
+        ).all()
+    else:
+        stmt = (
+            pg_insert(EnsembleTeacher.__table__)
+            .from_select(
+                ["ensemble_id", "teacher_id", "semester_id"],
+                select(pending.c.ensemble_id, pending.c.teacher_id, literal(target_semester.id)),
+            )
+            .on_conflict_do_nothing(constraint="uq_ensemble_teacher_semester")
+            .returning(EnsembleTeacher.__table__.c.ensemble_id, EnsembleTeacher.__table__.c.teacher_id)
+        )
+        rows = db.session.connection().execute(stmt).all()
+        recompute_hour_donations(
+            db.session.connection(), semester_id=target_semester.id, ensemble_ids={e for e, _ in rows}
+        )
+        if rows:
+            mark_portal_written(db.session)
+            mark_tables_written(db.session, EnsembleTeacher.__table__)
+
+    report.created = len(rows)
+    if rows:
+        names = dict(db.session.execute(
+            select(Ensemble.id, Ensemble.name).where(Ensemble.id.in_({e for e, _ in rows}))
+        ).all())
+        teachers = {t.id: t.full_name for t in Teacher.query.filter(Teacher.id.in_({t for _, t in rows}))}
+        for ensemble_id, teacher_id in sorted(rows, key=lambda r: (names.get(r[0]) or "", r[1])):
+            report.additions[(ensemble_id, names.get(ensemble_id))].append(teachers.get(teacher_id))
+
+    return report